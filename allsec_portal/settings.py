@@ -42,8 +42,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # /api/pwa/health/ – odpowiedź bez sesji i bazy, musi być pierwsze
+    'core.middleware.HealthCheckMiddleware',
     'django.middleware.security.SecurityMiddleware',
     "whitenoise.middleware.WhiteNoiseMiddleware",
+    'core.compression.PwaCompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -54,6 +57,9 @@ MIDDLEWARE = [
 
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+
+    # profilowanie wybranych widoków – ostatnie, żeby profil obejmował sam widok
+    'core.profiling.ProfilingMiddleware',
 ]
 
 
@@ -90,9 +96,69 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # testy na pliku, nie w pamięci – wątki w testach współbieżności dostają
+        # własne połączenia (PRAGMA, BEGIN IMMEDIATE) jak workery na produkcji
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# PostgreSQL (opcjonalnie): w local_settings ustaw DB_BACKEND = "postgres"
+# i nadpisz POSTGRES. Wymaga pakietu psycopg (psycopg[binary], dla puli: psycopg[pool]).
+# Dane ze starej bazy SQLite: manage.py copy_sqlite_to_postgres
+DB_BACKEND = "sqlite"
+
+POSTGRES = {
+    "NAME": "allsec",
+    "USER": "allsec",
+    "PASSWORD": "",
+    "HOST": "localhost",
+    "PORT": "5432",
+    # połączenia trwałe (s); przy POOL musi być 0
+    "CONN_MAX_AGE": 60,
+    "CONN_HEALTH_CHECKS": True,
+    # pula połączeń Django 5.1+ (psycopg_pool): False, True albo dict, np. {"min_size": 2, "max_size": 8}
+    "POOL": False,
+}
+
+# Testy: domyślnie SQLite (DATABASES['default']['TEST']). Na PostgreSQL tylko na żądanie:
+# manage.py test --backend postgres (albo ALLSEC_TEST_BACKEND=postgres) – jednorazowa
+# baza test_<NAME> na tym serwerze, tworzona i usuwana przez Django (core/test_runner.py).
+TEST_POSTGRES = {
+    "NAME": "allsec",
+    "USER": "postgres",
+    "PASSWORD": "",
+    "HOST": "localhost",
+    "PORT": "5432",
+}
+
+TEST_RUNNER = "core.test_runner.AllsecTestRunner"
+
+# SQLite – PRAGMA ustawiane przy każdym połączeniu (core/db.py).
+# W local_settings można nadpisać pojedyncze klucze (None = nie ustawiaj).
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "busy_timeout": 5000,       # ms
+    "synchronous": "NORMAL",    # w WAL bez ryzyka uszkodzenia bazy po awarii
+    "cache_size": -20000,       # KiB
+    "mmap_size": 134217728,     # bajty
+    "temp_store": "MEMORY",
+}
+
+# Transakcje zapisu (atomic) jako BEGIN IMMEDIATE – blokada zapisu od początku
+# transakcji zamiast "database is locked" przy próbie eskalacji z odczytu.
+SQLITE_TRANSACTION_MODE = "IMMEDIATE"
+
+# Ponawianie zapisów PWA przy "database is locked" (core/db.py: retry_on_lock).
+# BUSY_TIMEOUT zastępuje w tych widokach busy_timeout z SQLITE_PRAGMAS – musi być
+# dużo krótszy niż DEADLINE, inaczej jedno czekanie na blokadę zjada cały limit.
+DB_WRITE_RETRY = {
+    "DEADLINE": 3.0,      # s – łączny czas ponowień (od startu pierwszej próby)
+    "BUSY_TIMEOUT": 200,  # ms – czekanie SQLite na blokadę w jednej próbie
+    "BASE_DELAY": 0.05,   # s – backoff wykładniczy z pełnym jitterem
+    "MAX_DELAY": 0.5,     # s
+    "RETRY_AFTER": 5,     # s – nagłówek Retry-After w odpowiedzi 503
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -137,7 +203,22 @@ STATICFILES_DIRS = [
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
 # WhiteNoise – serwowanie statyk z poziomu aplikacji
-STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
+# Django 5.1+ nie czyta już STATICFILES_STORAGE – storage ustawiamy przez STORAGES.
+# Manifest (staticfiles.json) jest też źródłem listy precache Service Workera PWA.
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+    },
+}
+
+# pliki statyczne cache'owane przez Service Worker PWA (wzorce fnmatch, core/pwa_assets.py)
+PWA_PRECACHE = [
+    "css/main.css",
+    "pwa/*.js",
+]
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -148,8 +229,121 @@ LOGIN_URL = "login"
 LOGIN_REDIRECT_URL = "core:dashboard"
 LOGOUT_REDIRECT_URL = "login"
 
+# Profilowanie requestów (cProfile + SQL) – podgląd w /admin/profile/
+# Szczegóły opcji: core/profiling.py
+PROFILING = {
+    "ENABLED": False,        # próbkowanie losowe
+    "SAMPLE_RATE": 0.0,      # np. 0.01 = 1% requestów wybranych widoków
+    "ALLOW_SUPERUSER_FLAG": True,
+    "VIEWS": [
+        "core:dashboard",
+        "core:maintenance_protocol_edit",
+        "core:api_pwa_*",
+    ],
+    "TOP_N": 40,
+    "MAX_SQL": 500,
+    "DIR": BASE_DIR / "profiles",
+    "MAX_FILES": 200,
+}
+
+# Katalog obiektów w PWA (api/pwa/catalog/dump/)
+# SCOPE "assigned": technik dostaje pełne dane tylko obiektów ze swoich zleceń
+# (otwartych + z terminem w oknie DAYS_BACK..DAYS_AHEAD), pozostałe jako skrót
+# (nazwa/adres) – szczegóły PWA pobiera na żądanie. SCOPE "all" = pełny katalog.
+# Biuro (is_office) zawsze dostaje pełny katalog.
+PWA_CATALOG = {
+    "SCOPE": "assigned",
+    "DAYS_AHEAD": 30,
+    "DAYS_BACK": 30,
+    # skompresowany katalog trzymany w cache per (zakres, wersja katalogu, kodowanie)
+    "CACHE_TIMEOUT": 3600,
+}
+
+# Sesje: "db" (domyślne Django), "cached_db" (odczyt z cache "sessions", zapis też do bazy)
+# albo "signed_cookies" (sesja w podpisanym ciasteczku, zero zapytań – ale wylogowanie
+# nie unieważnia skopiowanego ciasteczka, a sesja ma limit ~4 KB).
+# Cache "sessions" jest plikowy – wspólny dla wszystkich workerów na serwerze
+# (LocMem w każdym procesie osobno = po wylogowaniu inny worker widziałby starą sesję).
+SESSION_STRATEGY = "cached_db"
+SESSION_STRATEGY_ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+
+# Cache "default" – plikowy, wspólny dla wszystkich workerów na serwerze (LocMem
+# w każdym procesie osobno = po zapisie w jednym workerze pozostałe serwowałyby
+# stare dane). VERSION podbij ręcznie, gdy zmienia się format trzymanych wartości.
+# Klucze danych aplikacji są dodatkowo wersjonowane przestrzeniami nazw: core/cache.py.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache" / "default",
+        "KEY_PREFIX": "allsec",
+        "VERSION": 1,
+        "TIMEOUT": 600,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    "sessions": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache" / "sessions",
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
+SESSION_CACHE_ALIAS = "sessions"
+
+# Cache-aside dla widoków core (core/cache.py: get_or_set)
+# EARLY_REFRESH – ułamek TIMEOUT przed wygaśnięciem, od którego jeden proces
+# przelicza wartość w tle żądania, a pozostałe dostają jeszcze starą.
+# LOCK_WAIT – ile (s) żądanie czeka na wynik innego procesu, gdy w cache nic nie ma.
+CORE_CACHE = {
+    "ALIAS": "default",
+    "TIMEOUT": 600,
+    "EARLY_REFRESH": 0.1,
+    "LOCK_TIMEOUT": 30,
+    "LOCK_WAIT": 2.0,
+}
+
+# Kompresja odpowiedzi /api/pwa/ (brotli, zapasowo gzip) – szczegóły: core/compression.py
+PWA_COMPRESSION = {
+    "ENABLED": True,
+    "MIN_SIZE": 200,
+    "BROTLI_QUALITY": 5,
+    "GZIP_LEVEL": 6,
+}
+
 # --- Nadpiski środowiskowe (nie w repo) ---
 try:
     from .local_settings import *
 except ImportError:
-    pass
\ No newline at end of file
+    pass
+
+# --- Ustawienia zależne od nadpisek ---
+if "SESSION_ENGINE" not in globals():
+    SESSION_ENGINE = SESSION_STRATEGY_ENGINES[SESSION_STRATEGY]
+
+
+def _postgres_database(conf):
+    db = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": conf["NAME"],
+        "USER": conf.get("USER", ""),
+        "PASSWORD": conf.get("PASSWORD", ""),
+        "HOST": conf.get("HOST", ""),
+        "PORT": conf.get("PORT", ""),
+        "CONN_MAX_AGE": conf.get("CONN_MAX_AGE", 0),
+        "CONN_HEALTH_CHECKS": conf.get("CONN_HEALTH_CHECKS", False),
+        "OPTIONS": dict(conf.get("OPTIONS", {})),
+    }
+    if conf.get("POOL"):
+        db["OPTIONS"]["pool"] = conf["POOL"]
+        db["CONN_MAX_AGE"] = 0
+    return db
+
+
+if DB_BACKEND == "postgres":
+    DATABASES["default"] = _postgres_database(POSTGRES)
+
+for _db in DATABASES.values():
+    if _db.get("ENGINE") == "django.db.backends.sqlite3" and SQLITE_TRANSACTION_MODE:
+        _db.setdefault("OPTIONS", {}).setdefault("transaction_mode", SQLITE_TRANSACTION_MODE)
\ No newline at end of file
@@ -17,8 +17,14 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 from core.views import RoleBasedLoginView
+from core import views_profiling
 
 urlpatterns = [
+    # profile requestów (tylko superuser) – przed admin.site.urls
+    path("admin/profile/", admin.site.admin_view(views_profiling.profile_list), name="admin_profile_list"),
+    path("admin/profile/porownaj/", admin.site.admin_view(views_profiling.profile_compare), name="admin_profile_compare"),
+    path("admin/profile/<str:profile_id>/", admin.site.admin_view(views_profiling.profile_detail), name="admin_profile_detail"),
+
     path("admin/", admin.site.urls),
     path("", include("core.urls")),
 
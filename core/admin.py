@@ -13,6 +13,7 @@ from .models import (
     System,
     Job,
     WorkOrder,
+    WorkOrderEvent,
     ServiceReport,
     ServiceReportItem,
     MaintenanceProtocol, 
@@ -301,6 +302,22 @@ class WorkOrderAdmin(NoBulkDeleteMixin, SuperuserDeleteOnlyMixin, admin.ModelAdm
     )
     date_hierarchy = "planned_date"
     # już nie używamy filter_horizontal = ("systems",)
+    actions = ["mark_completed"]
+
+    def save_model(self, request, obj, form, change):
+        # zmiana statusu trafia do WorkOrderEvent z autorem i źródłem
+        obj.status_actor = request.user
+        obj.status_source = WorkOrderEvent.Source.ADMIN
+        super().save_model(request, obj, form, change)
+
+    @admin.action(description="Oznacz zaznaczone jako zakończone")
+    def mark_completed(self, request, queryset):
+        changed = queryset.set_status(
+            WorkOrder.Status.COMPLETED,
+            actor=request.user,
+            source=WorkOrderEvent.Source.ADMIN,
+        )
+        self.message_user(request, f"Zakończono zleceń: {changed}.")
 
 @admin.register(ServiceReport)
 class ServiceReportAdmin(admin.ModelAdmin):
@@ -0,0 +1,381 @@
+"""
+Analityka: miesięczne sumy per (serwisant, typ zlecenia, zarządca obiektu).
+
+- MonthlySummary – gotowe liczby miesiąca; strona analityki czyta tylko ją.
+- MonthlySummaryDirty – miesiące do przeliczenia, znaczone sygnałami
+  (core/signals.py) w tej samej transakcji co zmiana zlecenia, zdarzenia,
+  protokołu albo pozycji.
+- refresh_dirty() przelicza tylko oznaczone miesiące (komenda
+  refresh_monthly_summaries, przycisk na stronie), rebuild() – wszystko.
+
+Miesiąc zawsze liczony jest w całości od nowa z danych źródłowych (DELETE +
+bulk_create), więc powtórne przeliczenie niczego nie dubluje.
+
+Definicje:
+- zakończone: zlecenia COMPLETED wg closed_at,
+- oczekiwanie na materiał: zdarzenia wyjścia z WAITING_FOR_PARTS
+  (WorkOrderEvent.duration_seconds), w miesiącu zakończenia oczekiwania,
+- przychód: zatwierdzone protokoły serwisowe wg report_date (items_net_total).
+Klucz (serwisant, typ, zarządca) to bieżące wartości zlecenia i obiektu.
+
+Miesiące sprzed granicy retencji (RetentionMark, przesuwany przez
+core/retention.py dopiero po faktycznym usunięciu danych) nie są przeliczane –
+zostają w MonthlySummary jako jedyny ślad zarchiwizowanych danych.
+"""
+
+import time as _time
+from collections import defaultdict
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import (
+    MonthlySummary,
+    MonthlySummaryDirty,
+    ServiceReport,
+    WorkOrder,
+    WorkOrderEvent,
+)
+from .retention import frozen_before
+
+
+DEFAULT_ANALYTICS = {
+    # ile ostatnich miesięcy pokazuje strona analityki domyślnie
+    "MONTHS": 12,
+}
+
+MONTH_CHOICES = (3, 6, 12, 24)
+
+
+def get_analytics_settings() -> dict:
+    conf = dict(DEFAULT_ANALYTICS)
+    conf.update(getattr(settings, "CORE_ANALYTICS", {}) or {})
+    return conf
+
+
+# --- Miesiące ---
+
+def month_start(value):
+    """Pierwszy dzień miesiąca dla date/datetime (aware -> czas lokalny); None -> None."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        value = value.date()
+    return value.replace(day=1)
+
+
+def add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _aware(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def mark_dirty(*values) -> None:
+    """Oznacza miesiące podanych dat do przeliczenia (jedno INSERT ... ON CONFLICT)."""
+    months = {month_start(v) for v in values if v is not None}
+    if not months:
+        return
+    frozen = frozen_before()
+    if frozen:
+        # sprzed granicy retencji sumy są zamrożone (źródła usunięte/zarchiwizowane)
+        months = {m for m in months if m >= frozen}
+        if not months:
+            return
+    # update_conflicts odświeża marked_at – refresh_dirty nie zdejmie znacznika
+    # miesiąca oznaczonego ponownie w trakcie przeliczania
+    MonthlySummaryDirty.objects.bulk_create(
+        [MonthlySummaryDirty(month=m) for m in months],
+        update_conflicts=True,
+        unique_fields=["month"],
+        update_fields=["marked_at"],
+    )
+
+
+def mark_work_orders_dirty(work_orders) -> None:
+    """
+    Oznacza wszystkie miesiące, w których liczą się podane zlecenia
+    (queryset) – po zmianie klucza: serwisanta, typu, obiektu lub zarządcy.
+    """
+    months = set()
+    months.update(
+        work_orders.filter(status=WorkOrder.Status.COMPLETED, closed_at__isnull=False)
+        .annotate(month=TruncMonth("closed_at"))
+        .order_by()
+        .values_list("month", flat=True)
+        .distinct()
+    )
+    months.update(
+        ServiceReport.objects.filter(work_order__in=work_orders, report_date__isnull=False)
+        .annotate(month=TruncMonth("report_date"))
+        .order_by()
+        .values_list("month", flat=True)
+        .distinct()
+    )
+    months.update(
+        WorkOrderEvent.objects.filter(work_order__in=work_orders)
+        .annotate(month=TruncMonth("created_at"))
+        .order_by()
+        .values_list("month", flat=True)
+        .distinct()
+    )
+    mark_dirty(*months)
+
+
+# --- Przeliczanie ---
+
+def _metrics():
+    return {
+        "closed_count": 0,
+        "waiting_parts_count": 0,
+        "waiting_parts_seconds": 0,
+        "reports_count": 0,
+        "net_total": Decimal("0.00"),
+    }
+
+
+def compute(start: date | None = None, end: date | None = None) -> dict:
+    """
+    Sumy dla miesięcy z zakresu [start, end) (None = bez ograniczenia):
+    {(month, technician_id, work_type, manager_id): {metryka: wartość}}.
+    Trzy zapytania niezależnie od długości zakresu.
+    """
+    rows = defaultdict(_metrics)
+
+    # zakończone zlecenia
+    closed = WorkOrder.objects.filter(status=WorkOrder.Status.COMPLETED, closed_at__isnull=False)
+    if start:
+        closed = closed.filter(closed_at__gte=_aware(start))
+    if end:
+        closed = closed.filter(closed_at__lt=_aware(end))
+    closed = (
+        closed.annotate(month=TruncMonth("closed_at"))
+        .order_by()
+        .values("month", "assigned_to", "work_type", "site__manager")
+        .annotate(n=Count("pk"))
+    )
+    for r in closed:
+        key = (month_start(r["month"]), r["assigned_to"], r["work_type"], r["site__manager"])
+        rows[key]["closed_count"] += r["n"]
+
+    # przychód z zatwierdzonych protokołów
+    reports = ServiceReport.objects.filter(status=ServiceReport.Status.FINAL, report_date__isnull=False)
+    if start:
+        reports = reports.filter(report_date__gte=start)
+    if end:
+        reports = reports.filter(report_date__lt=end)
+    reports = (
+        reports.annotate(month=TruncMonth("report_date"))
+        .order_by()
+        .values("month", "work_order__assigned_to", "work_order__work_type", "work_order__site__manager")
+        .annotate(n=Count("pk"), net=Sum("items_net_total"))
+    )
+    for r in reports:
+        key = (
+            month_start(r["month"]),
+            r["work_order__assigned_to"],
+            r["work_order__work_type"],
+            r["work_order__site__manager"],
+        )
+        rows[key]["reports_count"] += r["n"]
+        rows[key]["net_total"] += r["net"] or Decimal("0.00")
+
+    # oczekiwanie na materiał – czas zapisany w zdarzeniu wyjścia ze statusu
+    waiting = WorkOrderEvent.objects.filter(
+        old_status=WorkOrder.Status.WAITING_FOR_PARTS,
+        duration_seconds__isnull=False,
+    )
+    if start:
+        waiting = waiting.filter(created_at__gte=_aware(start))
+    if end:
+        waiting = waiting.filter(created_at__lt=_aware(end))
+    waiting = (
+        waiting.annotate(month=TruncMonth("created_at"))
+        .order_by()
+        .values("month", "work_order__assigned_to", "work_order__work_type", "work_order__site__manager")
+        .annotate(n=Count("pk"), seconds=Sum("duration_seconds"))
+    )
+    for r in waiting:
+        key = (
+            month_start(r["month"]),
+            r["work_order__assigned_to"],
+            r["work_order__work_type"],
+            r["work_order__site__manager"],
+        )
+        rows[key]["waiting_parts_count"] += r["n"]
+        rows[key]["waiting_parts_seconds"] += r["seconds"]
+
+    return rows
+
+
+def _save(rows: dict, start: date | None, end: date | None) -> int:
+    existing = MonthlySummary.objects.all()
+    if start:
+        existing = existing.filter(month__gte=start)
+    if end:
+        existing = existing.filter(month__lt=end)
+    existing.delete()
+    MonthlySummary.objects.bulk_create(
+        [
+            MonthlySummary(
+                month=month,
+                technician_id=technician,
+                work_type=work_type,
+                manager_id=manager,
+                **metrics,
+            )
+            for (month, technician, work_type, manager), metrics in rows.items()
+        ],
+        batch_size=500,
+    )
+    return len(rows)
+
+
+def refresh_month(month: date) -> int:
+    """Przelicza jeden miesiąc (nie zamrożony retencją). Zwraca liczbę wierszy sum."""
+    month = month_start(month)
+    frozen = frozen_before()
+    if frozen and month < frozen:
+        raise ValueError(f"Miesiąc {month:%m-%Y} jest sprzed granicy retencji ({frozen:%m-%Y}).")
+    end = add_months(month, 1)
+    with transaction.atomic():
+        return _save(compute(month, end), month, end)
+
+
+def refresh_dirty() -> list:
+    """Przelicza oznaczone miesiące (każdy w osobnej transakcji). Zwraca listę miesięcy."""
+    frozen = frozen_before()
+    if frozen:
+        MonthlySummaryDirty.objects.filter(month__lt=frozen).delete()
+    done = []
+    for month, marked_at in MonthlySummaryDirty.objects.order_by("month").values_list("month", "marked_at"):
+        with transaction.atomic():
+            refresh_month(month)
+            # znacznik zostaje, jeśli ktoś oznaczył miesiąc ponownie w międzyczasie
+            MonthlySummaryDirty.objects.filter(month=month, marked_at=marked_at).delete()
+        done.append(month)
+    return done
+
+
+def rebuild() -> dict:
+    """
+    Przelicza od zera wszystkie miesiące od granicy retencji (jedna
+    transakcja); wcześniejsze zostają – ich źródeł już nie ma.
+    """
+    started = _time.monotonic()
+    frozen = frozen_before()
+    with transaction.atomic():
+        MonthlySummaryDirty.objects.all().delete()
+        rows = compute(frozen, None)
+        count = _save(rows, frozen, None)
+    return {
+        "months": len({key[0] for key in rows}),
+        "rows": count,
+        "seconds": _time.monotonic() - started,
+    }
+
+
+# --- Odczyt dla strony analityki (tylko MonthlySummary) ---
+
+def _person(first, last, username):
+    return f"{first or ''} {last or ''}".strip() or username or "Nieprzypisane"
+
+
+TECHNICIAN_FIELDS = ("technician", "technician__first_name", "technician__last_name", "technician__username")
+
+
+def dashboard(start: date, manager_id: int | None = None) -> dict:
+    """
+    Tabele strony analityki od miesiąca start do bieżącego:
+    zakończone zlecenia (serwisant × typ), oczekiwanie na materiał per
+    serwisant, przychód netto (zarządca × miesiąc).
+    """
+    summaries = MonthlySummary.objects.filter(month__gte=start)
+    if manager_id:
+        summaries = summaries.filter(manager_id=manager_id)
+    months = []
+    month = start
+    current = month_start(timezone.localdate())
+    while month <= current:
+        months.append(month)
+        month = add_months(month, 1)
+    work_types = WorkOrder.WorkOrderType.choices
+
+    # zakończone zlecenia: serwisant × typ zlecenia
+    closed = {}
+    for r in (
+        summaries.filter(closed_count__gt=0)
+        .values(*TECHNICIAN_FIELDS, "work_type")
+        .annotate(n=Sum("closed_count"))
+        .order_by()
+    ):
+        row = closed.setdefault(r["technician"], {
+            "label": _person(r["technician__first_name"], r["technician__last_name"], r["technician__username"]),
+            "by_type": dict.fromkeys((code for code, _ in work_types), 0),
+            "total": 0,
+        })
+        row["by_type"][r["work_type"]] += r["n"]
+        row["total"] += r["n"]
+    closed_rows = sorted(closed.values(), key=lambda row: (-row["total"], row["label"]))
+    for row in closed_rows:
+        row["cells"] = [row["by_type"][code] for code, _ in work_types]
+
+    # oczekiwanie na materiał per serwisant
+    waiting_rows = []
+    for r in (
+        summaries.filter(waiting_parts_count__gt=0)
+        .values(*TECHNICIAN_FIELDS)
+        .annotate(n=Sum("waiting_parts_count"), seconds=Sum("waiting_parts_seconds"))
+        .order_by("-seconds")
+    ):
+        waiting_rows.append({
+            "label": _person(r["technician__first_name"], r["technician__last_name"], r["technician__username"]),
+            "count": r["n"],
+            "total_days": r["seconds"] / 86400,
+            "avg_days": r["seconds"] / r["n"] / 86400,
+        })
+
+    # przychód netto: zarządca × miesiąc
+    revenue = {}
+    month_totals = dict.fromkeys(months, Decimal("0.00"))
+    for r in (
+        summaries.filter(reports_count__gt=0)
+        .values("manager", "manager__short_name", "month")
+        .annotate(net=Sum("net_total"), n=Sum("reports_count"))
+        .order_by()
+    ):
+        row = revenue.setdefault(r["manager"], {
+            "label": r["manager__short_name"] or "Bez zarządcy",
+            "by_month": dict.fromkeys(months, Decimal("0.00")),
+            "reports": 0,
+            "total": Decimal("0.00"),
+        })
+        if r["month"] in row["by_month"]:
+            row["by_month"][r["month"]] += r["net"]
+            month_totals[r["month"]] += r["net"]
+        row["reports"] += r["n"]
+        row["total"] += r["net"]
+    revenue_rows = sorted(revenue.values(), key=lambda row: (-row["total"], row["label"]))
+    for row in revenue_rows:
+        row["cells"] = [row["by_month"][m] for m in months]
+
+    return {
+        "months": months,
+        "work_types": [label for _, label in work_types],
+        "closed_rows": closed_rows,
+        "waiting_rows": waiting_rows,
+        "revenue_rows": revenue_rows,
+        "revenue_month_totals": [month_totals[m] for m in months],
+        "revenue_total": sum(month_totals.values(), Decimal("0.00")),
+        "pending_months": MonthlySummaryDirty.objects.count(),
+        "refreshed_at": MonthlySummary.objects.aggregate(at=Max("updated_at"))["at"],
+    }
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .cache import connect_invalidation
+        from .db import PRAGMAS_DISPATCH_UID, configure_sqlite_connection
+        from .signals import connect_monthly_summaries, connect_service_report_totals
+
+        connection_created.connect(configure_sqlite_connection, dispatch_uid=PRAGMAS_DISPATCH_UID)
+        connect_invalidation()
+        connect_service_report_totals()
+        connect_monthly_summaries()
@@ -0,0 +1,261 @@
+"""
+Cache danych aplikacji (cache "default" – plikowy, wspólny dla workerów).
+
+- Klucze są wersjonowane przestrzeniami nazw ("sites", "workorders",
+  "servicereport:12", ...). Zapis/usunięcie modelu podbija wersję jego
+  przestrzeni (sygnały podpięte w CoreConfig.ready) – stare wpisy przestają
+  być czytane i wygasają same, bez kasowania po wzorcu (FileBasedCache go nie ma).
+- fragment_version() daje wersję do klucza {% cache %} z updated_at obiektu
+  i jego dzieci – niezmieniony protokół/obiekt renderuje się z cache.
+- get_or_set() to cache-aside z ochroną przed "stampede": od EARLY_REFRESH
+  przed wygaśnięciem jeden proces (blokada cache.add) przelicza wartość,
+  pozostałe dostają jeszcze starą; gdy wpisu nie ma wcale, reszta czeka
+  do LOCK_WAIT na wynik zamiast liczyć to samo równolegle.
+
+Zmiany z pominięciem sygnałów (bulk_update, QuerySet.update, surowy SQL)
+muszą same wywołać bump() – inaczej dane odświeżą się dopiero po TIMEOUT.
+"""
+
+import hashlib
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CORE_CACHE = {
+    "ALIAS": "default",
+    "TIMEOUT": 600,
+    "EARLY_REFRESH": 0.1,
+    "LOCK_TIMEOUT": 30,
+    "LOCK_WAIT": 2.0,
+}
+
+# co ile sekund czekający proces sprawdza, czy wartość już jest
+LOCK_POLL = 0.05
+
+
+def get_cache_settings() -> dict:
+    conf = dict(DEFAULT_CORE_CACHE)
+    conf.update(getattr(settings, "CORE_CACHE", {}) or {})
+    return conf
+
+
+def _cache():
+    return caches[get_cache_settings()["ALIAS"]]
+
+
+def _ns_key(namespace: str) -> str:
+    return f"ns:{namespace}"
+
+
+def namespace_versions(namespaces) -> list:
+    """Aktualne wersje przestrzeni nazw (jedno get_many)."""
+    namespaces = list(namespaces)
+    if not namespaces:
+        return []
+
+    c = _cache()
+    keys = [_ns_key(ns) for ns in namespaces]
+    found = c.get_many(keys)
+
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            # startujemy od znacznika czasu, nie od 1: po wyrzuceniu klucza wersji
+            # z cache (MAX_ENTRIES) stare wpisy z wersją 1.. nie wrócą do obiegu
+            c.add(key, time.time_ns(), None)
+            version = c.get(key)
+        versions.append(version)
+    return versions
+
+
+def bump(*namespaces) -> None:
+    """Unieważnia wszystkie wpisy zależne od podanych przestrzeni nazw."""
+    c = _cache()
+    for ns in namespaces:
+        key = _ns_key(ns)
+        try:
+            # w FileBasedCache incr to get+set – przy wyścigu dwa procesy ustawią
+            # tę samą nową wersję, ale i tak różną od poprzedniej, o to chodzi
+            c.incr(key)
+        except ValueError:
+            c.set(key, time.time_ns(), None)
+
+
+def bump_on_commit(*namespaces) -> None:
+    """
+    bump() po zatwierdzeniu transakcji. Wcześniej inny request mógłby
+    przeliczyć wartość ze starych danych i zapisać ją pod nową wersją.
+    """
+    transaction.on_commit(lambda: bump(*namespaces))
+
+
+def make_key(name: str, *parts, namespaces=()) -> str:
+    versions = ".".join(str(v) for v in namespace_versions(namespaces))
+    return ":".join([name, versions, *(str(p) for p in parts)])
+
+
+def get_or_set(name: str, producer, *parts, namespaces=(), timeout=None):
+    """
+    Cache-aside: wartość spod (name, parts) w aktualnych wersjach namespaces,
+    a gdy jej nie ma lub zbliża się wygaśnięcie – producer() (bez argumentów).
+    Wartość musi się dać spiklować (listy/słowniki, bajty, instancje modeli).
+    """
+    conf = get_cache_settings()
+    c = _cache()
+    timeout = conf["TIMEOUT"] if timeout is None else timeout
+    key = make_key(name, *parts, namespaces=namespaces)
+    lock_key = f"{key}:lock"
+
+    entry = c.get(key)
+    if entry is not None:
+        refresh_at, value = entry
+        if time.time() < refresh_at or not c.add(lock_key, 1, conf["LOCK_TIMEOUT"]):
+            return value
+        # wcześniejsze odświeżenie – reszta dalej dostaje starą wartość
+        return _produce_and_store(c, key, lock_key, producer, timeout, conf)
+
+    if c.add(lock_key, 1, conf["LOCK_TIMEOUT"]):
+        return _produce_and_store(c, key, lock_key, producer, timeout, conf)
+
+    # ktoś inny już liczy – czekamy na jego wynik
+    deadline = time.monotonic() + conf["LOCK_WAIT"]
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL)
+        entry = c.get(key)
+        if entry is not None:
+            return entry[1]
+
+    logger.info("cache: nie doczekano się wartości %s – liczę równolegle", name)
+    return _produce_and_store(c, key, None, producer, timeout, conf)
+
+
+def _produce_and_store(c, key, lock_key, producer, timeout, conf):
+    try:
+        value = producer()
+        refresh_at = time.time() + timeout * (1 - conf["EARLY_REFRESH"])
+        c.set(key, (refresh_at, value), timeout)
+        return value
+    finally:
+        if lock_key:
+            c.delete(lock_key)
+
+
+# --- Wersje fragmentów szablonów ({% cache %}) ---
+
+def fragment_version(*parts) -> str:
+    """
+    Wersja do klucza {% cache %}: dla instancji modelu jej updated_at, dla
+    querysetu (dzieci) liczba wierszy + max(updated_at) – jedno zapytanie
+    na queryset. Liczba łapie usunięcia, których max(updated_at) nie widzi.
+    Inne wartości (np. wynik własnego aggregate()) wchodzą jako str().
+
+    Zmiany przez bulk_update/update() muszą same ustawić updated_at.
+    """
+    from django.db.models import Count, Max, QuerySet
+
+    tokens = []
+    for part in parts:
+        if isinstance(part, QuerySet):
+            agg = part.order_by().aggregate(n=Count("pk"), last=Max("updated_at"))
+            last = agg["last"].timestamp() if agg["last"] else 0
+            tokens.append(f"{agg['n']}-{last}")
+        elif hasattr(part, "updated_at"):
+            tokens.append(f"{part.pk}-{part.updated_at.timestamp()}")
+        else:
+            tokens.append(str(part))
+    return hashlib.sha1("|".join(tokens).encode()).hexdigest()[:16]
+
+
+# --- Unieważnianie przez sygnały ---
+
+def _model_namespaces(instance) -> tuple:
+    from django.contrib.auth import get_user_model
+
+    from .models import (
+        Entity,
+        MaintenanceCheckItem,
+        MaintenanceProtocol,
+        MaintenanceSection,
+        Manager,
+        ServiceReport,
+        ServiceReportItem,
+        Site,
+        System,
+        WorkOrder,
+    )
+
+    if isinstance(instance, Site):
+        return ("sites",)
+    if isinstance(instance, System):
+        return ("systems",)
+    if isinstance(instance, WorkOrder):
+        return ("workorders",)
+    if isinstance(instance, Manager):
+        return ("managers",)
+    if isinstance(instance, Entity):
+        return ("entities",)
+    if isinstance(instance, get_user_model()):
+        return ("users",)
+    # wydruki (PDF) – per dokument
+    if isinstance(instance, ServiceReport):
+        return (f"servicereport:{instance.pk}",)
+    if isinstance(instance, ServiceReportItem):
+        return (f"servicereport:{instance.report_id}",)
+    if isinstance(instance, MaintenanceProtocol):
+        return (f"maintenanceprotocol:{instance.pk}",)
+    if isinstance(instance, MaintenanceSection):
+        return (f"maintenanceprotocol:{instance.protocol_id}",)
+    if isinstance(instance, MaintenanceCheckItem):
+        # formsety ustawiają instance.section – wtedy bez dodatkowego zapytania
+        if MaintenanceCheckItem.section.is_cached(instance):
+            protocol_id = instance.section.protocol_id
+        else:
+            protocol_id = (
+                MaintenanceSection.objects.filter(pk=instance.section_id)
+                .values_list("protocol_id", flat=True)
+                .first()
+            )
+        return (f"maintenanceprotocol:{protocol_id}",) if protocol_id else ()
+    return ()
+
+
+def invalidate_instance(sender, instance, **kwargs) -> None:
+    if kwargs.get("raw"):
+        # loaddata – sygnał przy ładowaniu fixture, relacje mogą jeszcze nie istnieć
+        return
+    namespaces = _model_namespaces(instance)
+    if namespaces:
+        bump_on_commit(*namespaces)
+
+
+def connect_invalidation() -> None:
+    from django.contrib.auth import get_user_model
+    from django.db.models.signals import post_delete, post_save
+
+    from . import models
+
+    senders = (
+        models.Site,
+        models.System,
+        models.WorkOrder,
+        models.Manager,
+        models.Entity,
+        get_user_model(),
+        models.ServiceReport,
+        models.ServiceReportItem,
+        models.MaintenanceProtocol,
+        models.MaintenanceSection,
+        models.MaintenanceCheckItem,
+    )
+    for sender in senders:
+        uid = f"core_cache_{sender._meta.label_lower}"
+        post_save.connect(invalidate_instance, sender=sender, dispatch_uid=f"{uid}_save")
+        post_delete.connect(invalidate_instance, sender=sender, dispatch_uid=f"{uid}_delete")
@@ -0,0 +1,168 @@
+"""
+Kompresja odpowiedzi API PWA (brotli, zapasowo gzip).
+
+- PwaCompressionMiddleware kompresuje odpowiedzi JSON spod /api/pwa/
+  (także strumieniowe – paczka po paczce),
+- compressed_blob() buduje skompresowane ciało z generatora bajtów bez
+  trzymania nieskompresowanej całości w pamięci; katalog PWA trzyma taki
+  blob w cache per (zakres, odcisk wersji, kodowanie).
+
+Brotli jest opcjonalny – bez pakietu zostaje gzip.
+"""
+
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - zależne od środowiska
+    brotli = None
+
+
+DEFAULT_PWA_COMPRESSION = {
+    "ENABLED": True,
+    # mniejszych odpowiedzi nie opłaca się kompresować
+    "MIN_SIZE": 200,
+    "PATH_PREFIXES": ("/api/pwa/",),
+    # brotli 0–11: 5 to dobry kompromis CPU/rozmiar dla dynamicznych odpowiedzi
+    "BROTLI_QUALITY": 5,
+    "GZIP_LEVEL": 6,
+}
+
+
+def get_compression_settings() -> dict:
+    conf = dict(DEFAULT_PWA_COMPRESSION)
+    conf.update(getattr(settings, "PWA_COMPRESSION", {}) or {})
+    return conf
+
+
+def _accepted_encodings(header: str) -> dict:
+    accepted = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        m = re.search(r"q=([0-9.]+)", params)
+        if m:
+            try:
+                q = float(m.group(1))
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    return accepted
+
+
+def choose_encoding(request) -> str:
+    """'br', 'gzip' albo '' (bez kompresji) wg nagłówka Accept-Encoding."""
+    accepted = _accepted_encodings(request.headers.get("Accept-Encoding", ""))
+    wildcard = accepted.get("*", 0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return ""
+
+
+class _Compressor:
+    def __init__(self, encoding: str, conf: dict):
+        self.encoding = encoding
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=conf["BROTLI_QUALITY"])
+        elif encoding == "gzip":
+            # wbits=31 -> nagłówek i stopka gzip
+            self._obj = zlib.compressobj(conf["GZIP_LEVEL"], zlib.DEFLATED, 31)
+        else:
+            raise ValueError(f"Nieznane kodowanie: {encoding!r}")
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._obj.process(data)
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        if self.encoding == "br":
+            return self._obj.flush()
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._obj.finish()
+        return self._obj.flush()
+
+
+def compress_bytes(data: bytes, encoding: str, conf: dict = None) -> bytes:
+    comp = _Compressor(encoding, conf or get_compression_settings())
+    return comp.compress(data) + comp.finish()
+
+
+def compressed_blob(chunks, encoding: str, conf: dict = None) -> bytes:
+    """Kompresuje strumień bajtów do jednego bloba (w pamięci tylko wynik skompresowany)."""
+    comp = _Compressor(encoding, conf or get_compression_settings())
+    out = [comp.compress(chunk) for chunk in chunks]
+    out.append(comp.finish())
+    return b"".join(out)
+
+
+def _compress_stream(chunks, comp: _Compressor):
+    for chunk in chunks:
+        data = comp.compress(chunk)
+        # flush po każdej paczce – klient dostaje dane na bieżąco, a nie dopiero na końcu
+        data += comp.flush()
+        if data:
+            yield data
+    yield comp.finish()
+
+
+class PwaCompressionMiddleware:
+    """
+    Kompresja odpowiedzi spod /api/pwa/ (GZipMiddleware Django działa na całą
+    stronę i nie zna brotli). Odpowiedzi z ustawionym Content-Encoding
+    (np. blob katalogu z cache) zostawiamy bez zmian.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        conf = get_compression_settings()
+        if not conf["ENABLED"] or not request.path.startswith(tuple(conf["PATH_PREFIXES"])):
+            return response
+        if response.has_header("Content-Encoding") or response.status_code != 200:
+            return response
+        if not response.get("Content-Type", "").startswith("application/json"):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        encoding = choose_encoding(request)
+        if not encoding:
+            return response
+
+        if response.streaming:
+            if getattr(response, "is_async", False):
+                return response
+            response.streaming_content = _compress_stream(response.streaming_content, _Compressor(encoding, conf))
+            del response["Content-Length"]
+        else:
+            if len(response.content) < conf["MIN_SIZE"]:
+                return response
+            compressed = compress_bytes(response.content, encoding, conf)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+
+        # ETag opisuje wersję nieskompresowaną – po kompresji może być tylko słaby
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+
+        response["Content-Encoding"] = encoding
+        return response
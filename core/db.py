@@ -0,0 +1,211 @@
+"""
+Warstwa bazy danych dla core.
+
+SQLite: przy każdym nowym połączeniu ustawiamy PRAGMA z settings.SQLITE_PRAGMAS
+(WAL, busy_timeout, synchronous, cache_size, mmap_size, temp_store).
+Transakcje zapisu (atomic) startują jako BEGIN IMMEDIATE – patrz
+SQLITE_TRANSACTION_MODE w settings.py.
+
+Widoki zapisujące dane z PWA owijamy w @retry_on_lock(): na czas widoku krótki
+busy_timeout (DB_WRITE_RETRY["BUSY_TIMEOUT"]), przy "database is locked"/"busy"
+ponawiamy transakcję z losowym opóźnieniem, a po przekroczeniu limitu czasu
+oddajemy 503 + Retry-After (outbox w PWA odczeka i spróbuje ponownie).
+"""
+
+import contextlib
+import functools
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.http import JsonResponse
+
+
+logger = logging.getLogger(__name__)
+
+
+# kolejność ma znaczenie: busy_timeout przed journal_mode (zmiana trybu wymaga blokady)
+PRAGMA_ORDER = ("busy_timeout", "journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store")
+
+
+# handler connection_created (CoreConfig.ready); sqlite_stress --no-tuning odłącza go na czas testu
+PRAGMAS_DISPATCH_UID = "core_sqlite_pragmas"
+
+
+def get_sqlite_pragmas() -> dict:
+    """PRAGMA z settings.SQLITE_PRAGMAS (wartości i opis – settings.py)."""
+    pragmas = dict(getattr(settings, "SQLITE_PRAGMAS", {}) or {})
+    # None w local_settings = nie ustawiaj danej PRAGMA
+    return {k: v for k, v in pragmas.items() if v is not None}
+
+
+def apply_sqlite_pragmas(cursor, pragmas: dict) -> None:
+    """Ustawia PRAGMA na kursorze (Django albo gołe sqlite3)."""
+    ordered = [k for k in PRAGMA_ORDER if k in pragmas]
+    ordered += [k for k in pragmas if k not in PRAGMA_ORDER]
+
+    for name in ordered:
+        if not str(name).replace("_", "").isalnum():
+            raise ValueError(f"Niepoprawna nazwa PRAGMA: {name!r}")
+        value = pragmas[name]
+        if not str(value).lstrip("-").replace("_", "").isalnum():
+            raise ValueError(f"Niepoprawna wartość PRAGMA {name}: {value!r}")
+        cursor.execute(f"PRAGMA {name}={value}")
+
+
+def configure_sqlite_connection(sender, connection, **kwargs):
+    """Handler sygnału connection_created – tylko dla SQLite."""
+    if connection.vendor != "sqlite":
+        return
+
+    with connection.cursor() as cursor:
+        apply_sqlite_pragmas(cursor, get_sqlite_pragmas())
+
+
+# ==========================
+#  RETRY PRZY BLOKADZIE ZAPISU
+# ==========================
+
+LOCK_ERROR_MARKERS = (
+    "database is locked",
+    "database table is locked",
+    "database is busy",
+    "deadlock detected",
+    "could not serialize access",
+    "could not obtain lock",
+)
+
+_contention_lock = threading.Lock()
+_contention = {
+    "contended": 0,   # requesty, które trafiły na blokadę co najmniej raz
+    "retries": 0,     # łączna liczba ponowień
+    "recovered": 0,   # requesty, które po ponowieniu się udały
+    "gave_up": 0,     # requesty zakończone 503
+    "by_view": {},
+}
+
+
+def get_write_retry_settings() -> dict:
+    """Parametry ponowień z settings.DB_WRITE_RETRY (wartości i opis – settings.py)."""
+    return dict(settings.DB_WRITE_RETRY)
+
+
+@contextlib.contextmanager
+def _busy_timeout(ms):
+    """
+    Krótszy busy_timeout SQLite na czas widoku z retry_on_lock. Z globalnym
+    (SQLITE_PRAGMAS, kilka sekund) BEGIN IMMEDIATE czekałby na blokadę dłużej
+    niż cały DEADLINE i ponowienia nigdy by nie ruszyły.
+    """
+    if not ms or connection.vendor != "sqlite":
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA busy_timeout")
+        previous = cursor.fetchone()[0]
+        cursor.execute(f"PRAGMA busy_timeout={int(ms)}")
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA busy_timeout={int(previous)}")
+
+
+def is_lock_error(exc: Exception) -> bool:
+    msg = str(exc).lower()
+    return any(marker in msg for marker in LOCK_ERROR_MARKERS)
+
+
+def _record_contention(view_name: str, key: str, n: int = 1) -> None:
+    with _contention_lock:
+        _contention[key] += n
+        per_view = _contention["by_view"].setdefault(
+            view_name, {"contended": 0, "retries": 0, "recovered": 0, "gave_up": 0}
+        )
+        per_view[key] += n
+
+
+def contention_stats() -> dict:
+    """Liczniki kontencji zapisu w tym procesie (od startu workera)."""
+    with _contention_lock:
+        return {
+            **{k: v for k, v in _contention.items() if k != "by_view"},
+            "by_view": {name: dict(v) for name, v in _contention["by_view"].items()},
+        }
+
+
+def db_busy_response(retry_after: int) -> JsonResponse:
+    response = JsonResponse(
+        {
+            "ok": False,
+            "error": "db_busy",
+            "message": "Serwer jest chwilowo zajęty zapisem. Spróbuj ponownie.",
+            "retry_after": retry_after,
+        },
+        status=503,
+    )
+    response["Retry-After"] = str(retry_after)
+    return response
+
+
+def retry_on_lock(view_func=None, *, deadline=None):
+    """
+    Dekorator widoku zapisu: cały widok w transaction.atomic(), a przy błędzie
+    blokady bazy – ponowienie z losowym opóźnieniem aż do `deadline` sekund.
+    Po przekroczeniu limitu zwraca 503 z nagłówkiem Retry-After.
+    """
+
+    def decorator(func):
+        view_name = func.__name__
+
+        @functools.wraps(func)
+        def wrapper(request, *args, **kwargs):
+            started = time.monotonic()
+            conf = get_write_retry_settings()
+            limit = conf["DEADLINE"] if deadline is None else deadline
+            attempt = 0
+
+            # w zewnętrznej transakcji nie da się bezpiecznie ponowić – zostawiamy
+            # wyjątek i globalny busy_timeout
+            nested = connection.in_atomic_block
+            busy_timeout = None if nested else conf["BUSY_TIMEOUT"]
+
+            while True:
+                try:
+                    with _busy_timeout(busy_timeout), transaction.atomic():
+                        response = func(request, *args, **kwargs)
+                except OperationalError as exc:
+                    if nested or not is_lock_error(exc):
+                        raise
+
+                    if attempt == 0:
+                        _record_contention(view_name, "contended")
+
+                    delay = random.uniform(0, min(conf["MAX_DELAY"], conf["BASE_DELAY"] * (2 ** attempt)))
+                    elapsed = time.monotonic() - started
+                    if elapsed + delay > limit:
+                        _record_contention(view_name, "gave_up")
+                        logger.warning(
+                            "DB write contention: %s gave up after %d retries (%.2fs): %s",
+                            view_name, attempt, elapsed, exc,
+                        )
+                        return db_busy_response(int(conf["RETRY_AFTER"]))
+
+                    attempt += 1
+                    _record_contention(view_name, "retries")
+                    logger.info("DB write contention: %s retry #%d in %.3fs", view_name, attempt, delay)
+                    time.sleep(delay)
+                    continue
+
+                if attempt:
+                    _record_contention(view_name, "recovered")
+                return response
+
+        return wrapper
+
+    if view_func is not None:
+        return decorator(view_func)
+    return decorator
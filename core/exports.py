@@ -0,0 +1,540 @@
+"""
+Eksport danych do CSV/XLSX strumieniowo (StreamingHttpResponse / plik).
+
+- Wiersze idą z .values(...).iterator() – bez instancji modeli i bez
+  trzymania całego wyniku w pamięci; etykiety choices z gotowych słowników.
+- CSV: pod polskiego Excela (średnik, przecinek dziesiętny, BOM UTF-8).
+- XLSX: minimalny SpreadsheetML pisany ręcznie do zipfile na strumieniu bez
+  seek (deskryptory danych ZIP) – bez openpyxl, pamięć stała niezależnie
+  od liczby wierszy. Pierwsze bajty wychodzą zanim baza zwróci pierwszy wiersz.
+
+Zbiory danych: DATASETS (nazwa -> Dataset), filtry jak na listach w portalu.
+"""
+
+import csv
+import re
+import zipfile
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import F
+from django.http import QueryDict
+from django.utils import timezone
+
+from .filters import filter_workorders
+from .models import (
+    MaintenanceCheckItem,
+    MaintenanceProtocol,
+    MaintenanceSection,
+    ServiceReport,
+    ServiceReportItem,
+    WorkOrder,
+)
+
+
+DEFAULT_EXPORTS = {
+    # wierszy na porcję z bazy (iterator) i na jeden zapis do strumienia
+    "CHUNK_SIZE": 2000,
+    "CSV_DELIMITER": ";",
+    "CSV_DECIMAL_COMMA": True,
+    "XLSX_COMPRESSLEVEL": 6,
+}
+
+FORMATS = ("csv", "xlsx")
+
+
+def get_export_settings() -> dict:
+    conf = dict(DEFAULT_EXPORTS)
+    conf.update(getattr(settings, "CORE_EXPORTS", {}) or {})
+    return conf
+
+
+# --- Zbiory danych ---
+
+@dataclass(frozen=True)
+class Dataset:
+    title: str          # nazwa arkusza / prefiks pliku
+    header: tuple
+    queryset: Callable  # (params: QueryDict) -> QuerySet z .values()
+    row: Callable       # (dict z .values()) -> tuple
+
+
+def _local_dt(value):
+    return timezone.localtime(value).replace(tzinfo=None) if value else None
+
+
+def _person(first, last, username):
+    return f"{first or ''} {last or ''}".strip() or (username or "")
+
+
+def _int_param(params, name):
+    try:
+        return int(params.get(name, ""))
+    except (TypeError, ValueError):
+        return None
+
+
+def _date_param(params, name):
+    try:
+        return date.fromisoformat(params.get(name, ""))
+    except (TypeError, ValueError):
+        return None
+
+
+# Zlecenia – filtry jak na liście zleceń (+ typ)
+
+WORKORDER_TYPES = dict(WorkOrder.WorkOrderType.choices)
+WORKORDER_STATUSES = dict(WorkOrder.Status.choices)
+
+
+def _workorders_queryset(params):
+    qs = WorkOrder.objects.order_by("-created_at", "-id")
+    qs, _ = filter_workorders(params, qs, include_type=True, include_site=True, default_time="all")
+    return qs.values(
+        "id",
+        "number",
+        "site__name",
+        "site__city",
+        "work_type",
+        "title",
+        "status",
+        "assigned_to__first_name",
+        "assigned_to__last_name",
+        "assigned_to__username",
+        "planned_date",
+        "created_at",
+        "closed_at",
+    )
+
+
+def _workorder_row(r):
+    return (
+        r["number"] or r["id"],
+        r["site__name"],
+        r["site__city"],
+        WORKORDER_TYPES.get(r["work_type"], r["work_type"]),
+        r["title"],
+        WORKORDER_STATUSES.get(r["status"], r["status"]),
+        _person(r["assigned_to__first_name"], r["assigned_to__last_name"], r["assigned_to__username"]),
+        r["planned_date"],
+        _local_dt(r["created_at"]),
+        _local_dt(r["closed_at"]),
+    )
+
+
+# Protokoły serwisowe z sumą pozycji
+
+SERVICEREPORT_STATUSES = dict(ServiceReport.Status.choices)
+SERVICEREPORT_RESULTS = dict(ServiceReport.Result.choices)
+SERVICEREPORT_MODES = dict(ServiceReport.ServiceMode.choices)
+
+
+def _servicereports_queryset(params):
+    qs = ServiceReport.objects.order_by(F("report_date").desc(nulls_last=True), "-id")
+
+    status = params.get("status", "")
+    if status in SERVICEREPORT_STATUSES:
+        qs = qs.filter(status=status)
+    if params.get("only_final") == "on":
+        qs = qs.filter(status=ServiceReport.Status.FINAL)
+    date_from, date_to = _date_param(params, "date_from"), _date_param(params, "date_to")
+    if date_from:
+        qs = qs.filter(report_date__gte=date_from)
+    if date_to:
+        qs = qs.filter(report_date__lte=date_to)
+
+    # sumy pozycji z kolumn zdenormalizowanych (core/signals.py) – bez JOIN/GROUP BY
+    return qs.values(
+        "id",
+        "number",
+        "status",
+        "report_date",
+        "work_order__number",
+        "work_order__site__name",
+        "work_order__site__city",
+        "service_mode",
+        "result",
+        "technicians",
+        "items_count",
+        "items_net_total",
+    )
+
+
+def _servicereport_row(r):
+    return (
+        r["number"],
+        SERVICEREPORT_STATUSES.get(r["status"], r["status"]),
+        r["report_date"],
+        r["work_order__number"],
+        r["work_order__site__name"],
+        r["work_order__site__city"],
+        SERVICEREPORT_MODES.get(r["service_mode"], r["service_mode"]),
+        SERVICEREPORT_RESULTS.get(r["result"], r["result"]),
+        r["technicians"],
+        r["items_count"],
+        r["items_net_total"],
+    )
+
+
+# Pozycje protokołów serwisowych (jeden wiersz na pozycję)
+
+SERVICEREPORT_UNITS = dict(ServiceReportItem.Unit.choices)
+
+
+def _servicereport_items_queryset(params):
+    reports = _servicereports_queryset(params).values("id")
+    return (
+        ServiceReportItem.objects
+        .filter(report__in=reports)
+        .order_by(F("report__report_date").desc(nulls_last=True), "-report_id", "order_index", "id")
+        .values(
+            "report__number",
+            "report__report_date",
+            "report__work_order__site__name",
+            "description",
+            "quantity",
+            "unit",
+            "unit_price",
+            "total_price",
+        )
+    )
+
+
+def _servicereport_item_row(r):
+    return (
+        r["report__number"],
+        r["report__report_date"],
+        r["report__work_order__site__name"],
+        r["description"],
+        r["quantity"],
+        SERVICEREPORT_UNITS.get(r["unit"], r["unit"]),
+        r["unit_price"],
+        r["total_price"],
+    )
+
+
+# Wyniki konserwacji – punkt kontrolny × protokół
+
+CHECK_RESULTS = dict(MaintenanceSection.CheckResult.choices)
+
+
+def _maintenance_queryset(params):
+    qs = MaintenanceCheckItem.objects.filter(active=True)
+
+    protocol = _int_param(params, "protocol")
+    if protocol:
+        qs = qs.filter(section__protocol_id=protocol)
+    site = _int_param(params, "site")
+    if site:
+        qs = qs.filter(section__protocol__site_id=site)
+    year = _int_param(params, "year")
+    if year:
+        qs = qs.filter(section__protocol__period_year=year)
+    status = params.get("status", "")
+    if status in MaintenanceProtocol.Status.values:
+        qs = qs.filter(section__protocol__status=status)
+
+    return qs.order_by(
+        F("section__protocol__period_year").desc(nulls_last=True),
+        F("section__protocol__period_month").desc(nulls_last=True),
+        "-section__protocol_id",
+        "section__order",
+        "section_id",
+        "order",
+        "id",
+    ).values(
+        "section__protocol__number",
+        "section__protocol__period_year",
+        "section__protocol__period_month",
+        "section__protocol__date",
+        "section__protocol__site__name",
+        "section__protocol__site__city",
+        "section__header_name",
+        "section__manufacturer",
+        "section__model",
+        "label",
+        "result",
+        "note",
+    )
+
+
+def _maintenance_row(r):
+    year, month = r["section__protocol__period_year"], r["section__protocol__period_month"]
+    return (
+        r["section__protocol__number"],
+        f"{month:02d}/{year}" if year and month else "",
+        r["section__protocol__date"],
+        r["section__protocol__site__name"],
+        r["section__protocol__site__city"],
+        r["section__header_name"],
+        " ".join(filter(None, (r["section__manufacturer"], r["section__model"]))),
+        r["label"],
+        CHECK_RESULTS.get(r["result"], r["result"]),
+        r["note"],
+    )
+
+
+DATASETS = {
+    "workorders": Dataset(
+        "zlecenia",
+        ("Numer", "Obiekt", "Miejscowość", "Typ", "Tytuł", "Status", "Serwisant",
+         "Planowana data", "Utworzono", "Zamknięto"),
+        _workorders_queryset,
+        _workorder_row,
+    ),
+    "servicereports": Dataset(
+        "protokoly-serwisowe",
+        ("Numer", "Status", "Data", "Zlecenie", "Obiekt", "Miejscowość", "Tryb", "Wynik",
+         "Serwisanci", "Liczba pozycji", "Wartość netto"),
+        _servicereports_queryset,
+        _servicereport_row,
+    ),
+    "servicereport-items": Dataset(
+        "pozycje-protokolow",
+        ("Protokół", "Data", "Obiekt", "Opis pozycji", "Ilość", "Jm", "Cena jedn. netto", "Wartość netto"),
+        _servicereport_items_queryset,
+        _servicereport_item_row,
+    ),
+    "maintenance": Dataset(
+        "wyniki-konserwacji",
+        ("Protokół", "Okres", "Data", "Obiekt", "Miejscowość", "System", "Producent / model",
+         "Punkt kontrolny", "Wynik", "Uwagi"),
+        _maintenance_queryset,
+        _maintenance_row,
+    ),
+}
+
+
+def export_rows(dataset: str, params=None):
+    """Wiersze (tuple) zbioru – leniwie, porcjami z bazy."""
+    ds = DATASETS[dataset]
+    params = params if params is not None else QueryDict()
+    qs = ds.queryset(params)
+    for record in qs.iterator(chunk_size=get_export_settings()["CHUNK_SIZE"]):
+        yield ds.row(record)
+
+
+def export_filename(dataset: str, fmt: str) -> str:
+    return f"{DATASETS[dataset].title}-{timezone.localdate():%Y-%m-%d}.{fmt}"
+
+
+def stream_export(dataset: str, fmt: str, params=None):
+    """Iterator bajtów pliku; fmt z FORMATS."""
+    ds = DATASETS[dataset]
+    rows = export_rows(dataset, params)
+    if fmt == "csv":
+        return stream_csv(ds.header, rows)
+    if fmt == "xlsx":
+        return stream_xlsx(ds.header, rows, sheet_name=ds.title)
+    raise ValueError(f"Nieznany format eksportu: {fmt}")
+
+
+# --- CSV ---
+
+class _Echo:
+    """csv.writer pisze do write() – zwracamy linię zamiast buforować."""
+
+    def write(self, value):
+        return value
+
+
+# Excel wykonuje komórki zaczynające się od tych znaków jako formuły
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_value(value, decimal_comma):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (Decimal, float)):
+        text = str(value)
+        return text.replace(".", ",") if decimal_comma else text
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(header, rows):
+    conf = get_export_settings()
+    writer = csv.writer(_Echo(), delimiter=conf["CSV_DELIMITER"])
+    chunk_size = conf["CHUNK_SIZE"]
+    decimal_comma = conf["CSV_DECIMAL_COMMA"]
+
+    # BOM – Excel inaczej czyta UTF-8 jako cp1250
+    yield ("﻿" + writer.writerow(header)).encode("utf-8")
+
+    buf = []
+    for row in rows:
+        buf.append(writer.writerow([_csv_value(v, decimal_comma) for v in row]))
+        if len(buf) >= chunk_size:
+            yield "".join(buf).encode("utf-8")
+            buf = []
+    if buf:
+        yield "".join(buf).encode("utf-8")
+
+
+# --- XLSX ---
+
+class _ChunkSink:
+    """Plik tylko do zapisu dla zipfile; drain() oddaje to, co się zebrało."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+# znaki sterujące niedozwolone w XML 1.0 (wklejki z Worda/SMS-ów)
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+
+# styl komórki (indeks w cellXfs): 0 – ogólny, 1 – data, 2 – data i godzina
+_STYLE_DATE = 1
+_STYLE_DATETIME = 2
+
+_XLSX_STATIC = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        "</Types>"
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm"/></numFmts>'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="3">'
+        '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        "</cellXfs>"
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        "</styleSheet>"
+    ),
+}
+
+
+def _xlsx_workbook(sheet_name: str) -> str:
+    # nazwa arkusza: max 31 znaków, bez []:*?/\
+    name = re.sub(r"[\[\]:*?/\\]", "-", sheet_name)[:31] or "Arkusz1"
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(name)}" sheetId="1" r:id="rId1"/></sheets>'
+        "</workbook>"
+    )
+
+
+def _xlsx_cell(value) -> str:
+    if value is None or value == "":
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, datetime):
+        serial = (value.replace(tzinfo=None) - _EXCEL_EPOCH).total_seconds() / 86400
+        # pełna precyzja float – przy 6 miejscach po przecinku błąd sięga ~0,04 s
+        return f'<c s="{_STYLE_DATETIME}"><v>{serial!r}</v></c>'
+    if isinstance(value, date):
+        serial = (value - _EXCEL_EPOCH.date()).days
+        return f'<c s="{_STYLE_DATE}"><v>{serial}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f"<c><v>{value}</v></c>"
+    text = escape(_XML_ILLEGAL.sub("", str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_row(values) -> str:
+    # bez atrybutu r= – Excel numeruje wiersze i komórki kolejno
+    return "<row>" + "".join(_xlsx_cell(v) for v in values) + "</row>"
+
+
+def stream_xlsx(header, rows, sheet_name="Arkusz1"):
+    conf = get_export_settings()
+    chunk_size = conf["CHUNK_SIZE"]
+    sink = _ChunkSink()
+
+    with zipfile.ZipFile(
+        sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=conf["XLSX_COMPRESSLEVEL"]
+    ) as zf:
+        for name, content in _XLSX_STATIC.items():
+            zf.writestr(name, content)
+        zf.writestr("xl/workbook.xml", _xlsx_workbook(sheet_name))
+        yield sink.drain()
+
+        with zf.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(
+                (
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                    '<sheetViews><sheetView workbookViewId="0">'
+                    '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+                    "</sheetView></sheetViews>"
+                    "<sheetData>" + _xlsx_row(header)
+                ).encode("utf-8")
+            )
+            buf = []
+            for row in rows:
+                buf.append(_xlsx_row(row))
+                if len(buf) >= chunk_size:
+                    sheet.write("".join(buf).encode("utf-8"))
+                    buf = []
+                    data = sink.drain()
+                    if data:
+                        yield data
+            if buf:
+                sheet.write("".join(buf).encode("utf-8"))
+            sheet.write(b"</sheetData></worksheet>")
+        yield sink.drain()
+
+    # katalog centralny ZIP dopisany przy zamknięciu
+    yield sink.drain()
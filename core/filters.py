@@ -0,0 +1,145 @@
+"""
+Filtry zleceń niezależne od widoków.
+
+Wspólne dla listy zleceń w portalu (views._apply_workorder_filters dokłada
+do nich choices do selectów) i eksportów (core/exports.py). Parametry to
+zwykłe mapowanie z .get() – request.GET, QueryDict albo dict.
+"""
+
+from datetime import date, timedelta
+
+from django.utils import timezone
+
+from .models import WorkOrder
+
+
+TIME_CHOICES = (
+    ("all", "Wszystkie"),
+    ("week", "Tydzień"),
+    ("month", "Miesiąc"),
+    ("year", "Rok"),
+    ("range", "Zakres dat"),
+)
+
+
+def _param(params, name) -> str:
+    return (params.get(name, "") or "").strip()
+
+
+def filter_workorders(
+    params,
+    qs,
+    *,
+    include_type=False,
+    include_site=False,
+    default_time="all",
+):
+    """
+    Filtry zleceń (Dashboard-style).
+
+    Parametry:
+      - type (opcjonalnie)
+      - site (opcjonalnie)
+      - assignee
+      - status
+      - time: all|week|month|year|range
+      - date_from/date_to (ISO: YYYY-MM-DD) dla range
+      - hide_completed: 1 (jeśli brak parametru => domyślnie TRUE)
+    Zwraca: (przefiltrowany_qs, wartości filtrów po walidacji – niepoprawne jako "")
+    """
+    today = timezone.localdate()
+
+    # --- pobranie parametrów ---
+    type_param = _param(params, "type") if include_type else ""
+    site_param = _param(params, "site") if include_site else ""
+
+    assignee_param = _param(params, "assignee")
+    status_param = _param(params, "status")
+
+    time_param = _param(params, "time") or default_time
+    date_from_str = _param(params, "date_from")
+    date_to_str = _param(params, "date_to")
+
+    # checkbox (jak brak w URL -> domyślnie ukrywamy zakończone/odwołane)
+    if "hide_completed" in params:
+        hide_completed = params.get("hide_completed") in ("1", "true", "on", "yes")
+    else:
+        hide_completed = True
+
+    # --- walidacja: type/status ---
+    valid_work_types = {c[0] for c in WorkOrder.WorkOrderType.choices}
+    valid_statuses = {c[0] for c in WorkOrder.Status.choices}
+
+    # --- filtry: type / site / assignee / status ---
+    if include_type and type_param in valid_work_types:
+        qs = qs.filter(work_type=type_param)
+    elif include_type:
+        type_param = ""
+
+    if include_site and site_param:
+        try:
+            qs = qs.filter(site_id=int(site_param))
+        except (TypeError, ValueError):
+            site_param = ""
+
+    if assignee_param:
+        try:
+            qs = qs.filter(assigned_to_id=int(assignee_param))
+        except (TypeError, ValueError):
+            assignee_param = ""
+
+    if status_param in valid_statuses:
+        qs = qs.filter(status=status_param)
+    else:
+        status_param = ""
+
+    # --- filtr czasu (tak jak dashboard: tydzień/miesiąc/rok lub range) ---
+    if time_param == "week":
+        start_of_week = today - timedelta(days=today.weekday())
+        end_of_week = start_of_week + timedelta(days=6)
+        qs = qs.filter(planned_date__range=(start_of_week, end_of_week))
+
+    elif time_param == "month":
+        qs = qs.filter(planned_date__year=today.year, planned_date__month=today.month)
+
+    elif time_param == "year":
+        qs = qs.filter(planned_date__year=today.year)
+
+    elif time_param == "range":
+        try:
+            df = date.fromisoformat(date_from_str) if date_from_str else None
+        except ValueError:
+            df = None
+            date_from_str = ""
+        try:
+            dt = date.fromisoformat(date_to_str) if date_to_str else None
+        except ValueError:
+            dt = None
+            date_to_str = ""
+
+        if df and dt:
+            qs = qs.filter(planned_date__range=(df, dt))
+        elif df:
+            qs = qs.filter(planned_date__gte=df)
+        elif dt:
+            qs = qs.filter(planned_date__lte=dt)
+
+    elif time_param == "all":
+        pass
+    else:
+        time_param = default_time
+
+    # --- ukrywanie zakończonych/odwołanych na liście (COMPLETED + CANCELLED) ---
+    if hide_completed:
+        qs = qs.exclude(status__in=[WorkOrder.Status.COMPLETED, WorkOrder.Status.CANCELLED])
+
+    return qs, {
+        "type": type_param,
+        "site": site_param,
+        "assignee": assignee_param,
+        "status": status_param,
+        "time": time_param,
+        "date_from": date_from_str,
+        "date_to": date_to_str,
+        "hide_completed": hide_completed,
+    }
@@ -1,3 +1,5 @@
+import copy
+
 from django import forms
 from django.forms import inlineformset_factory
 from datetime import date
@@ -382,6 +384,52 @@ MaintenanceCheckItemFormSet = forms.modelformset_factory(
     extra=0,
 )
 
+
+class PreloadedPkField(forms.ModelChoiceField):
+    """
+    Pole id formsetu rozwiązywane ze słownika już wczytanych obiektów.
+    Zwykłe ModelChoiceField robi queryset.get() – jeden SELECT na formularz.
+    """
+
+    def __init__(self, objects_by_pk, **kwargs):
+        self.objects_by_pk = objects_by_pk
+        super().__init__(MaintenanceCheckItem.objects.none(), **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.objects_by_pk[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError(self.error_messages["invalid_choice"], code="invalid_choice")
+
+
+class PreloadedCheckItemFormSet(MaintenanceCheckItemFormSet):
+    """
+    MaintenanceCheckItemFormSet na gotowej liście punktów jednej sekcji
+    (core/protocol_editor.py wczytuje punkty całego protokołu jednym zapytaniem).
+    Id spoza listy (np. z innej sekcji) -> błąd walidacji.
+    """
+
+    def __init__(self, *args, items=(), **kwargs):
+        self.items = list(items)
+        self.items_by_pk = {obj.pk: obj for obj in self.items}
+        super().__init__(*args, queryset=MaintenanceCheckItem.objects.none(), **kwargs)
+
+    def get_queryset(self):
+        return self.items
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        name = self._pk_field.name
+        field = form.fields[name]
+        form.fields[name] = PreloadedPkField(
+            self.items_by_pk,
+            initial=field.initial,
+            required=False,
+            widget=field.widget,
+        )
+
 class SiteForm(forms.ModelForm):
     """
     Etap C (Site):
@@ -814,3 +862,160 @@ class SiteContactForm(BootstrapModelForm):
         model = SiteContact
         # 'site' też ustawiamy z widoku
         exclude = ["site"]
+
+
+# ==========================
+#  IMPORT CSV (core/importers.py)
+# ==========================
+
+# wartości z CSV uznawane za "tak" w polach typu checkbox
+IMPORT_TRUE_VALUES = {"1", "t", "tak", "true", "y", "yes", "x", "on"}
+
+
+class LookupField(forms.CharField):
+    """
+    Powiązanie z CSV (nazwa, NIP, "Nazwa (Miasto)") -> pk ze słownika
+    (importers.LookupMap), bez SELECT-a na wiersz jak w ModelChoiceField.
+    """
+
+    def __init__(self, lookup, **kwargs):
+        self.lookup = lookup
+        super().__init__(**kwargs)
+
+    def clean(self, value):
+        value = super().clean(value)
+        if not value:
+            return None
+        return self.lookup.resolve(value)
+
+
+class ImportFormMixin:
+    """
+    Formularz z portalu użyty do importu CSV:
+    - pola FK (lookup_fields) jako LookupField – Meta.fields ich nie zawiera,
+      więc ModelForm nie sprawdza FK zapytaniem w full_clean(); ustawia je save(),
+    - w polach wyboru można podać kod albo etykietę ("CCTV" / "System CCTV"),
+    - checkboxy: tak/nie, 1/0, true/false,
+    - brak kolumny w pliku = wartość początkowa pola (domyślna z modelu).
+    """
+
+    lookup_fields = ()
+
+    def __init__(self, *args, lookups=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        model_opts = self._meta.model._meta
+        for name in self.lookup_fields:
+            model_field = model_opts.get_field(name)
+            self.fields[name] = LookupField(
+                lookups[name],
+                # jak w formularzu portalu (np. SiteForm.REQUIRED_FIELDS), inaczej wg modelu
+                required=name in getattr(self, "REQUIRED_FIELDS", ()) or not model_field.blank,
+                label=model_field.verbose_name,
+            )
+        if self.is_bound:
+            self.data = self._normalize_import_data(self.data)
+
+    def _normalize_import_data(self, data):
+        data = dict(data)
+        for name, field in self.fields.items():
+            if name not in data and not isinstance(field, forms.BooleanField):
+                # brak kolumny w CSV = wartość domyślna, jak w pustym formularzu portalu
+                initial = self.get_initial_for_field(field, name)
+                if initial not in (None, ""):
+                    data[name] = initial
+            raw = data.get(name)
+            if isinstance(field, forms.BooleanField):
+                if (raw or "").strip().casefold() in IMPORT_TRUE_VALUES:
+                    data[name] = "on"
+                else:
+                    data.pop(name, None)
+            elif raw and isinstance(field, forms.ChoiceField):
+                key = raw.strip().casefold()
+                for value, label in field.choices:
+                    if key in (str(value).casefold(), str(label).casefold()):
+                        data[name] = value
+                        break
+        return data
+
+    def bind_row(self, data):
+        """
+        Kopia tego (niezwiązanego) formularza związana z jednym wierszem CSV.
+        Pola współdzielone – __init__ (deepcopy wszystkich pól) raz na plik,
+        nie raz na wiersz; walidacja pól nie zmienia ich stanu.
+        """
+        form = copy.copy(self)
+        form.is_bound = True
+        form.data = self._normalize_import_data(data)
+        form._errors = None
+        form._bound_fields_cache = {}
+        form.instance = self._meta.model()
+        return form
+
+    def save(self, commit=True):
+        instance = super().save(commit=False)
+        for name in self.lookup_fields:
+            setattr(instance, self._meta.model._meta.get_field(name).attname, self.cleaned_data.get(name))
+        if commit:
+            instance.save()
+        return instance
+
+
+class EntityImportForm(ImportFormMixin, EntityForm):
+    pass
+
+
+class SiteImportForm(ImportFormMixin, SiteForm):
+    lookup_fields = ("entity", "manager")
+
+    class Meta(SiteForm.Meta):
+        fields = [f for f in SiteForm.Meta.fields if f not in ("entity", "manager")]
+
+
+class SystemImportForm(ImportFormMixin, SystemForm):
+    lookup_fields = ("site",)
+
+
+class ContactImportForm(ImportFormMixin, ContactForm):
+    lookup_fields = ("manager",)
+
+    class Meta(ContactForm.Meta):
+        fields = [f for f in ContactForm.Meta.fields if f != "manager"]
+
+
+class SiteContactImportForm(ImportFormMixin, SiteContactForm):
+    """Opcjonalne powiązanie kontaktu z obiektem (kolumny site / role / ...)."""
+
+    lookup_fields = ("site",)
+
+    class Meta(SiteContactForm.Meta):
+        exclude = ["site", "contact"]
+
+
+class ImportUploadForm(forms.Form):
+    """Pliki CSV do importu (Obiekty → Import CSV); kolejność jak importers.IMPORT_KINDS."""
+
+    entities = forms.FileField(label="Dane FV", required=False)
+    sites = forms.FileField(label="Obiekty", required=False)
+    systems = forms.FileField(label="Systemy", required=False)
+    contacts = forms.FileField(label="Kontakty", required=False)
+    encoding = forms.ChoiceField(
+        label="Kodowanie",
+        choices=(("utf-8-sig", "UTF-8"), ("cp1250", "Windows-1250 (CSV z Excela)")),
+        initial="utf-8-sig",
+    )
+    dry_run = forms.BooleanField(label="Tylko sprawdź (bez zapisu)", required=False, initial=True)
+    skip_invalid = forms.BooleanField(label="Zapisz poprawne wiersze mimo błędów", required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in ("entities", "sites", "systems", "contacts"):
+            self.fields[name].widget.attrs.update({"class": "form-control form-control-sm", "accept": ".csv,text/csv"})
+        for name in ("dry_run", "skip_invalid"):
+            self.fields[name].widget.attrs["class"] = "form-check-input"
+        self.fields["encoding"].widget.attrs["class"] = "form-select form-select-sm"
+
+    def clean(self):
+        cleaned = super().clean()
+        if not any(cleaned.get(name) for name in ("entities", "sites", "systems", "contacts")):
+            raise ValidationError("Wybierz co najmniej jeden plik CSV.")
+        return cleaned
@@ -0,0 +1,490 @@
+"""
+Import CSV: dane FV (Entity), obiekty (Site), systemy (System), kontakty
+(Contact + opcjonalne powiązanie SiteContact) – komenda import_data i widok
+"Obiekty → Import CSV".
+
+- CSV czytany strumieniowo (csv.DictReader), kolumny = nazwy pól formularza
+  albo ich etykiety ("name" / "Nazwa obiektu"); separator ; lub , wykrywany
+  z nagłówka, kodowanie UTF-8 (z BOM lub bez) albo podane przy imporcie
+  (Excel zapisuje zwykły "CSV" w cp1250). Plik w innym kodowaniu albo uszkodzony
+  CSV to błąd całego pliku w raporcie, a nie wyjątek.
+- Walidacja formularzami z portalu (EntityForm, SiteForm, SystemForm,
+  ContactForm, SiteContactForm – wersje *ImportForm z forms.py). Powiązania
+  (entity, manager, site) rozwiązywane ze słowników LookupMap wczytanych raz
+  na początku – bez zapytań na wiersz.
+- Zapis bulk_create porcjami po BATCH_SIZE w jednej transakcji; pliki w
+  kolejności IMPORT_KINDS, więc obiekty mogą wskazywać dane FV z tego samego
+  importu. dry_run = pełna walidacja i zapis, na końcu rollback.
+- Błąd w dowolnym wierszu -> nic nie zapisujemy (chyba że skip_invalid);
+  błąd całego pliku -> nic nie zapisujemy nawet ze skip_invalid.
+- Rekordy, które już są w bazie (albo wyżej w pliku), są pomijane – ponowny
+  import tych samych plików nic nie dubluje. Klucze: dane FV – NIP/REGON/PESEL,
+  obiekty – nazwa + miejscowość, systemy – obiekt + typ + nazwa, kontakty –
+  imię + nazwisko + telefon (cyfry) + zarządca, powiązania – obiekt + kontakt
+  + rola. Powtórzony kontakt z kolumną site dostaje tylko brakujące powiązanie.
+"""
+
+import codecs
+import csv
+import io
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Max
+
+from .cache import bump_on_commit
+from .forms import (
+    ContactImportForm,
+    EntityImportForm,
+    SiteContactImportForm,
+    SiteImportForm,
+    SystemImportForm,
+)
+from .models import Contact, Entity, Manager, Site, SiteContact, System
+
+
+DEFAULT_IMPORTS = {
+    "BATCH_SIZE": 500,
+    # powyżej tego limitu błędy tylko liczymy (raport ma być czytelny)
+    "MAX_ERRORS": 1000,
+    "ENCODING": "utf-8-sig",
+}
+
+# kolejność ma znaczenie: później importowane pliki wskazują na wcześniejsze
+IMPORT_KINDS = ("entities", "sites", "systems", "contacts")
+
+IMPORT_LABELS = {
+    "entities": "Dane FV",
+    "sites": "Obiekty",
+    "systems": "Systemy",
+    "contacts": "Kontakty",
+}
+
+
+def get_import_settings() -> dict:
+    conf = dict(DEFAULT_IMPORTS)
+    conf.update(getattr(settings, "CORE_IMPORTS", {}) or {})
+    return conf
+
+
+def _norm(value) -> str:
+    return " ".join(str(value or "").split()).casefold()
+
+
+def _digits(value) -> str:
+    return "".join(ch for ch in str(value or "") if ch.isdigit())
+
+
+def system_key(site_id, system_type, name) -> tuple:
+    return (site_id, system_type, _norm(name))
+
+
+def contact_key(first_name, last_name, phone, manager_id) -> tuple:
+    return (_norm(first_name), _norm(last_name), _digits(phone), manager_id)
+
+
+# --- Słowniki powiązań ---
+
+_AMBIGUOUS = object()
+
+
+class LookupMap:
+    """Klucz tekstowy (znormalizowany) -> pk; ten sam klucz dla dwóch pk = niejednoznaczny."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self._keys = {}
+
+    def add(self, pk, *keys) -> None:
+        for key in keys:
+            key = _norm(key)
+            if not key:
+                continue
+            current = self._keys.get(key)
+            self._keys[key] = pk if current in (None, pk) else _AMBIGUOUS
+
+    def resolve(self, value):
+        key = _norm(value)
+        pk = self._keys.get(key)
+        if pk is None and _digits(value) and len(_digits(value)) >= 9:
+            # NIP/REGON wpisany z kreskami lub spacjami
+            pk = self._keys.get(_digits(value))
+        if pk is None:
+            raise ValidationError(f"{self.label}: nie znaleziono „{value}”.")
+        if pk is _AMBIGUOUS:
+            raise ValidationError(f"{self.label}: „{value}” pasuje do kilku pozycji – podaj dokładniej.")
+        return pk
+
+
+class Lookups:
+    """
+    Wszystko, czego import potrzebuje z bazy – wczytane raz (.values_list)
+    i uzupełniane o rekordy tworzone w trakcie importu.
+    """
+
+    def __init__(self):
+        self.maps = {
+            "entity": LookupMap("Dane FV"),
+            "manager": LookupMap("Zarządca"),
+            "site": LookupMap("Obiekt"),
+        }
+        # klucze do wykrywania duplikatów (baza + wcześniejsze wiersze)
+        self.entity_ids = set()
+        self.site_keys = set()
+        self.system_keys = set()
+        # klucz kontaktu -> Contact (z bazy: sam pk; z importu: obiekt, pk po bulk_create)
+        self.contacts = {}
+        self.site_contact_keys = set()
+        self.system_order = {}
+
+        for pk, name, nip, regon, pesel in Entity.objects.values_list("pk", "name", "nip", "regon", "pesel"):
+            self.add_entity(pk, name, nip, regon, pesel)
+        for pk, short_name, full_name, nip in Manager.objects.values_list("pk", "short_name", "full_name", "nip"):
+            self.maps["manager"].add(pk, short_name, full_name, _digits(nip))
+        for pk, name, city in Site.objects.values_list("pk", "name", "city"):
+            self.add_site(pk, name, city)
+        for site_id, system_type, name in System.objects.values_list("site_id", "system_type", "name"):
+            self.system_keys.add(system_key(site_id, system_type, name))
+        for pk, first, last, phone, manager_id in Contact.objects.values_list(
+            "pk", "first_name", "last_name", "phone", "manager_id"
+        ):
+            self.contacts.setdefault(contact_key(first, last, phone, manager_id), Contact(pk=pk))
+        self.site_contact_keys = set(SiteContact.objects.values_list("site_id", "contact_id", "role"))
+        self.system_order = dict(
+            System.objects.values("site_id").annotate(m=Max("sort_order")).values_list("site_id", "m")
+        )
+
+    def __getitem__(self, name):
+        return self.maps[name]
+
+    def add_entity(self, pk, name, nip, regon, pesel):
+        ids = [_digits(v) for v in (nip, regon, pesel) if _digits(v)]
+        self.maps["entity"].add(pk, name, *ids)
+        self.entity_ids.update(ids)
+
+    def add_site(self, pk, name, city):
+        # jak Site.__str__ i lista wyboru w portalu: "Nazwa (Miasto)"
+        self.maps["site"].add(pk, name, f"{name} ({city})" if city else name)
+        self.site_keys.add((_norm(name), _norm(city)))
+
+    def next_system_order(self, site_id) -> int:
+        # jak System.save(): nowy system na końcu listy obiektu
+        order = (self.system_order.get(site_id) or 0) + 1
+        self.system_order[site_id] = order
+        return order
+
+
+# --- Wynik ---
+
+@dataclass
+class RowError:
+    kind: str
+    line: int
+    field: str
+    message: str
+
+    @property
+    def kind_label(self) -> str:
+        return IMPORT_LABELS.get(self.kind, self.kind)
+
+
+@dataclass
+class ImportResult:
+    dry_run: bool = False
+    committed: bool = False
+    rows: Counter = field(default_factory=Counter)
+    created: Counter = field(default_factory=Counter)
+    skipped: Counter = field(default_factory=Counter)
+    errors: list = field(default_factory=list)
+    error_count: int = 0
+    # pliki, których nie dało się przeczytać do końca (kodowanie, uszkodzony CSV)
+    failed_files: list = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.error_count
+
+    def add_error(self, kind, line, field_name, message, limit):
+        self.error_count += 1
+        if len(self.errors) < limit:
+            self.errors.append(RowError(kind, line, field_name, str(message)))
+
+    def add_file_error(self, kind, message, limit):
+        # wiersz 0 = cały plik
+        self.failed_files.append(kind)
+        self.add_error(kind, 0, "", message, limit)
+
+    def rows_per_second(self) -> float:
+        total = sum(self.rows.values())
+        return total / self.seconds if self.seconds else 0.0
+
+
+# --- CSV ---
+
+def read_csv(fileobj, encoding=None):
+    """
+    (numer linii, {kolumna: wartość}) – strumieniowo. fileobj tekstowy albo
+    binarny (UploadedFile, open(..., "rb")).
+    """
+    if isinstance(fileobj, (io.TextIOBase, io.StringIO)):
+        text = fileobj
+    else:
+        text = io.TextIOWrapper(fileobj, encoding=encoding or get_import_settings()["ENCODING"], newline="")
+
+    header_line = text.readline()
+    if not header_line:
+        return
+    delimiter = ";" if header_line.count(";") >= header_line.count(",") else ","
+    header = next(csv.reader([header_line], delimiter=delimiter))
+
+    reader = csv.DictReader(text, fieldnames=[h.strip() for h in header], delimiter=delimiter)
+    for row in reader:
+        if not any((v or "").strip() for k, v in row.items() if k is not None):
+            continue  # pusta linia / same separatory
+        yield reader.line_num + 1, row
+
+
+def _column_map(form_classes, lookups, header):
+    """Kolumna CSV -> nazwa pola formularza (nazwa pola albo jego etykieta)."""
+    names = {}
+    for form_class in form_classes:
+        for name, form_field in form_class(lookups=lookups).fields.items():
+            names.setdefault(_norm(name), name)
+            if form_field.label:
+                names.setdefault(_norm(form_field.label), name)
+    return {col: names.get(_norm(col), col) for col in header if col is not None}
+
+
+# --- Rodzaje importu ---
+
+class _KindImporter:
+    kind = ""
+    model = None
+    form_class = None
+    # formularze, których etykiety też rozpoznajemy jako nagłówki kolumn
+    extra_forms = ()
+    namespace = ""  # przestrzeń cache do podbicia (bulk_create nie wysyła sygnałów)
+
+    def __init__(self, lookups, result, conf):
+        self.lookups = lookups
+        self.result = result
+        self.conf = conf
+        self.pending = []
+        # niezwiązane formularze-wzorce, wiersze przez bind_row()
+        self.forms = {}
+
+    def run(self, rows):
+        columns = None
+        for line, raw in rows:
+            if columns is None:
+                columns = _column_map((self.form_class, *self.extra_forms), self.lookups, raw.keys())
+            data = {columns[k]: (v or "").strip() for k, v in raw.items() if k is not None}
+            self.result.rows[self.kind] += 1
+            self.handle_row(line, data)
+            if len(self.pending) >= self.conf["BATCH_SIZE"]:
+                self.flush()
+        self.flush()
+
+    def validate(self, form_class, line, data):
+        if form_class not in self.forms:
+            self.forms[form_class] = form_class(lookups=self.lookups)
+        form = self.forms[form_class].bind_row(data)
+        if form.is_valid():
+            return form
+        for field_name, messages in form.errors.items():
+            for message in messages:
+                self.result.add_error(
+                    self.kind, line, "" if field_name == "__all__" else field_name, message, self.conf["MAX_ERRORS"]
+                )
+        return None
+
+    def handle_row(self, line, data):
+        form = self.validate(self.form_class, line, data)
+        if form is None:
+            return
+        if self.is_duplicate(form):
+            self.result.skipped[self.kind] += 1
+            return
+        self.pending.append(self.build(form, data, line))
+
+    def is_duplicate(self, form) -> bool:
+        return False
+
+    def build(self, form, data, line):
+        return form.save(commit=False)
+
+    def flush(self):
+        if not self.pending:
+            return
+        objs = self.model.objects.bulk_create(self.pending, batch_size=self.conf["BATCH_SIZE"])
+        self.after_create(objs)
+        self.result.created[self.kind] += len(objs)
+        if self.namespace:
+            bump_on_commit(self.namespace)
+        self.pending = []
+
+    def after_create(self, objs):
+        pass
+
+
+class EntityImporter(_KindImporter):
+    kind = "entities"
+    model = Entity
+    form_class = EntityImportForm
+    namespace = "entities"
+
+    def is_duplicate(self, form):
+        ids = [form.cleaned_data.get(f) for f in ("nip", "regon", "pesel") if form.cleaned_data.get(f)]
+        if any(i in self.lookups.entity_ids for i in ids):
+            return True
+        self.lookups.entity_ids.update(ids)
+        return False
+
+    def after_create(self, objs):
+        for obj in objs:
+            self.lookups.add_entity(obj.pk, obj.name, obj.nip, obj.regon, obj.pesel)
+
+
+class SiteImporter(_KindImporter):
+    kind = "sites"
+    model = Site
+    form_class = SiteImportForm
+    namespace = "sites"
+
+    def is_duplicate(self, form):
+        key = (_norm(form.cleaned_data["name"]), _norm(form.cleaned_data["city"]))
+        if key in self.lookups.site_keys:
+            return True
+        self.lookups.site_keys.add(key)
+        return False
+
+    def after_create(self, objs):
+        for obj in objs:
+            self.lookups.add_site(obj.pk, obj.name, obj.city)
+
+
+class SystemImporter(_KindImporter):
+    kind = "systems"
+    model = System
+    form_class = SystemImportForm
+    namespace = "systems"
+
+    def is_duplicate(self, form):
+        data = form.cleaned_data
+        key = system_key(data["site"], data["system_type"], data.get("name"))
+        if key in self.lookups.system_keys:
+            return True
+        self.lookups.system_keys.add(key)
+        return False
+
+    def build(self, form, data, line):
+        obj = form.save(commit=False)
+        if not obj.sort_order:
+            obj.sort_order = self.lookups.next_system_order(obj.site_id)
+        return obj
+
+
+class ContactImporter(_KindImporter):
+    """Kontakt + (gdy podano kolumnę site) powiązanie z obiektem i rolą."""
+
+    kind = "contacts"
+    model = Contact
+    form_class = ContactImportForm
+    extra_forms = (SiteContactImportForm,)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (kontakt, powiązanie) – contact_id znany dopiero po bulk_create kontaktów
+        self.pending_links = []
+
+    def handle_row(self, line, data):
+        form = self.validate(self.form_class, line, data)
+        link_form = None
+        if data.get("site"):
+            link_form = self.validate(SiteContactImportForm, line, data)
+            if link_form is None:
+                return
+        if form is None:
+            return
+
+        contact = form.save(commit=False)
+        key = contact_key(contact.first_name, contact.last_name, contact.phone, contact.manager_id)
+        existing = self.lookups.contacts.get(key)
+        if existing is None:
+            self.lookups.contacts[key] = contact
+            self.pending.append(contact)
+        else:
+            self.result.skipped[self.kind] += 1
+            contact = existing
+
+        if link_form is not None:
+            self.pending_links.append((contact, link_form.save(commit=False)))
+            if len(self.pending_links) >= self.conf["BATCH_SIZE"]:
+                self.flush()
+
+    def flush(self):
+        super().flush()
+        links = []
+        for contact, link in self.pending_links:
+            key = (link.site_id, contact.pk, link.role)
+            if key in self.lookups.site_contact_keys:
+                self.result.skipped["site_contacts"] += 1
+                continue
+            self.lookups.site_contact_keys.add(key)
+            link.contact = contact
+            links.append(link)
+        self.pending_links = []
+        if links:
+            SiteContact.objects.bulk_create(links, batch_size=self.conf["BATCH_SIZE"])
+            self.result.created["site_contacts"] += len(links)
+
+
+IMPORTERS = {
+    "entities": EntityImporter,
+    "sites": SiteImporter,
+    "systems": SystemImporter,
+    "contacts": ContactImporter,
+}
+
+
+def run_import(files: dict, *, dry_run=False, skip_invalid=False, encoding=None) -> ImportResult:
+    """
+    files: {rodzaj z IMPORT_KINDS: plik (tekstowy/binarny)}. Zwraca ImportResult;
+    zapis tylko gdy nie dry_run, każdy plik przeczytany do końca i (brak błędów
+    albo skip_invalid). encoding – dla plików binarnych (domyślnie ENCODING).
+    """
+    conf = get_import_settings()
+    encoding = encoding or conf["ENCODING"]
+    result = ImportResult(dry_run=dry_run)
+    started = time.perf_counter()
+
+    with transaction.atomic():
+        lookups = Lookups()
+        for kind in IMPORT_KINDS:
+            if files.get(kind) is None:
+                continue
+            try:
+                IMPORTERS[kind](lookups, result, conf).run(read_csv(files[kind], encoding))
+            except UnicodeDecodeError:
+                result.add_file_error(
+                    kind,
+                    f"Plik nie jest w kodowaniu {codecs.lookup(encoding).name} – wybierz inne kodowanie "
+                    "albo zapisz plik jako „CSV UTF-8”.",
+                    conf["MAX_ERRORS"],
+                )
+            except csv.Error as exc:
+                result.add_file_error(kind, f"Niepoprawny plik CSV: {exc}.", conf["MAX_ERRORS"])
+
+        if dry_run or result.failed_files or (result.error_count and not skip_invalid):
+            # rollback odrzuca też bump_on_commit – cache zostaje jak był
+            transaction.set_rollback(True)
+        else:
+            result.committed = True
+
+    result.seconds = time.perf_counter() - started
+    return result
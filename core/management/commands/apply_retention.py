@@ -0,0 +1,77 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import retention
+
+
+def _mb(value: int) -> str:
+    return f"{value / 1024 / 1024:.1f} MB"
+
+
+class Command(BaseCommand):
+    help = (
+        "Retencja danych: usuwa stare zdarzenia zleceń, archiwizuje zamknięte zlecenia "
+        "(ArchivedWorkOrder) i robi VACUUM/ANALYZE z rozmiarem bazy przed i po. "
+        "Progi z settings.CORE_RETENTION (core/retention.py). Do crona, np. raz w tygodniu w nocy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Tylko policz, co zostałoby usunięte/zarchiwizowane.")
+        parser.add_argument(
+            "--events-days",
+            type=int,
+            help="Nadpisz EVENTS_MAX_AGE_DAYS (0 = pomiń zdarzenia). Sumy analityki miesięcy, "
+            "z których coś usunięto, zostają zamrożone (RetentionMark).",
+        )
+        parser.add_argument("--archive-years", type=int, help="Nadpisz ARCHIVE_AFTER_YEARS (0 = pomiń archiwizację).")
+        parser.add_argument("--skip-vacuum", action="store_true", help="Bez VACUUM/ANALYZE.")
+
+    def handle(self, *args, **opts):
+        conf = retention.get_retention_settings()
+        if opts["events_days"] is not None:
+            conf["EVENTS_MAX_AGE_DAYS"] = opts["events_days"]
+        if opts["archive_years"] is not None:
+            conf["ARCHIVE_AFTER_YEARS"] = opts["archive_years"]
+        if (conf["EVENTS_MAX_AGE_DAYS"] or 0) < 0 or (conf["ARCHIVE_AFTER_YEARS"] or 0) < 0:
+            raise CommandError("Progi retencji nie mogą być ujemne.")
+
+        dry_run = opts["dry_run"]
+
+        # najpierw archiwum – do zrzutu trafia to, co zostało z historii statusów
+        cutoff = retention.archive_cutoff(conf)
+        if cutoff:
+            started = time.monotonic()
+            n = retention.archive_work_orders(cutoff, conf["ARCHIVE_BATCH_SIZE"], conf["SLEEP"], dry_run=dry_run)
+            verb = "Do archiwizacji" if dry_run else "Zarchiwizowano"
+            self.stdout.write(
+                f"{verb} zleceń zamkniętych przed {cutoff:%d.%m.%Y}: {n} "
+                f"({time.monotonic() - started:.1f} s)."
+            )
+
+        cutoff = retention.events_cutoff(conf)
+        if cutoff:
+            started = time.monotonic()
+            n = retention.prune_events(cutoff, conf["EVENT_BATCH_SIZE"], conf["SLEEP"], dry_run=dry_run)
+            verb = "Do usunięcia" if dry_run else "Usunięto"
+            self.stdout.write(
+                f"{verb} zdarzeń sprzed {cutoff:%d.%m.%Y}: {n} ({time.monotonic() - started:.1f} s)."
+            )
+
+        frozen = retention.frozen_before()
+        if frozen:
+            self.stdout.write(f"Sumy analityki zamrożone przed {frozen:%m.%Y}.")
+
+        if dry_run or opts["skip_vacuum"]:
+            size = retention.database_size()
+            self.stdout.write(f"Rozmiar bazy: {_mb(size.total)} (wolne strony: {_mb(size.free)}).")
+            return
+
+        started = time.monotonic()
+        before, after = retention.vacuum()
+        self.stdout.write(self.style.SUCCESS(
+            f"VACUUM/ANALYZE: {_mb(before.total)} -> {_mb(after.total)} "
+            f"(odzyskano {_mb(max(before.total - after.total, 0))}, {time.monotonic() - started:.1f} s)."
+        ))
+        for name, size in after.files.items():
+            self.stdout.write(f"  {name}: {_mb(before.files.get(name, 0))} -> {_mb(size)}")
@@ -0,0 +1,171 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def _mb(value: int) -> str:
+    return f"{value / 1024 / 1024:.1f} MB"
+
+
+class _Restarted(Exception):
+    """Źródło zmienione przez inne połączenie – backup SQLite zaczął od nowa."""
+
+
+class Command(BaseCommand):
+    help = (
+        "Kopia zapasowa bazy SQLite w trakcie pracy aplikacji – przez online backup API "
+        "(po --pages stron na krok, z przerwą --sleep między krokami, więc zapisy z PWA "
+        "nie czekają na całą kopię; w trybie WAL kopia to spójny stan z chwili startu). "
+        "Opcjonalnie gzip i PRAGMA integrity_check na kopii. "
+        "Do crona, np. co godzinę z --gzip --check --keep 48."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Alias bazy (musi być SQLite).")
+        parser.add_argument(
+            "--output",
+            default=str(Path(settings.BASE_DIR) / "backups"),
+            help="Katalog na kopie (domyślnie BASE_DIR/backups).",
+        )
+        parser.add_argument("--pages", type=int, default=1000, help="Stron kopiowanych w jednym kroku.")
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0.05,
+            help="Przerwa (s) między krokami – daje miejsce zapisom z PWA.",
+        )
+        parser.add_argument(
+            "--max-restarts",
+            type=int,
+            default=3,
+            help="Bez WAL: ile razy kopia krokowa może zacząć od nowa przez zapisy w trakcie, "
+            "potem jedna kopia w całości.",
+        )
+        parser.add_argument("--gzip", action="store_true", help="Spakuj kopię (.sqlite3.gz).")
+        parser.add_argument("--check", action="store_true", help="PRAGMA integrity_check na gotowej kopii.")
+        parser.add_argument("--keep", type=int, default=0, help="Zostaw N najnowszych kopii (0 = nie usuwaj).")
+
+    def handle(self, *args, **opts):
+        connection = connections[opts["database"]]
+        if connection.vendor != "sqlite":
+            raise CommandError("Baza nie jest SQLite – na PostgreSQL kopię robi pg_dump.")
+        source = Path(connection.settings_dict["NAME"])
+        if not source.exists():
+            raise CommandError(f"Brak pliku SQLite: {source}")
+        if opts["pages"] <= 0:
+            raise CommandError("--pages musi być większe od zera.")
+
+        out_dir = Path(opts["output"])
+        out_dir.mkdir(parents=True, exist_ok=True)
+        target = out_dir / f"{source.stem}-{datetime.now():%Y%m%d-%H%M%S}.sqlite3"
+        partial = target.with_name(target.name + ".part")
+
+        started = time.monotonic()
+        try:
+            steps, pages, restarts = self._backup(source, partial, opts)
+            copied = time.monotonic() - started
+            size = partial.stat().st_size
+
+            if opts["check"]:
+                result = self._integrity_check(partial)
+                if result != "ok":
+                    raise CommandError(f"integrity_check kopii: {result}")
+
+            if opts["gzip"]:
+                target = target.with_name(target.name + ".gz")
+                with open(partial, "rb") as src, gzip.open(target, "wb", compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                partial.unlink()
+            else:
+                os.replace(partial, target)
+        finally:
+            if partial.exists():
+                partial.unlink()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Kopia: {target} ({_mb(size)}"
+            + (f", spakowana {_mb(target.stat().st_size)}" if opts["gzip"] else "")
+            + f") w {elapsed:.1f} s."
+        ))
+        self.stdout.write(
+            f"  backup API: {f'{steps} kroków po {pages} stron' if pages > 0 else 'w całości'}, {copied:.1f} s, "
+            f"{size / 1024 / 1024 / max(copied, 0.001):.1f} MB/s"
+            + (f", restartów: {restarts}" if restarts else "")
+            + ("; integrity_check: ok" if opts["check"] else "")
+        )
+
+        if opts["keep"] > 0:
+            self._rotate(out_dir, source.stem, opts["keep"])
+
+    def _backup(self, source: Path, partial: Path, opts) -> tuple:
+        """
+        Kopia krokowa. Bez WAL każdy zapis innego połączenia zaczyna kopię od
+        nowa – po --max-restarts kopiujemy w całości jednym krokiem.
+        """
+        busy_timeout = (getattr(settings, "SQLITE_PRAGMAS", {}) or {}).get("busy_timeout") or 5000
+        src = sqlite3.connect(
+            f"{source.as_uri()}?mode=ro", uri=True, timeout=busy_timeout / 1000, isolation_level=None
+        )
+        try:
+            wal = src.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            if wal:
+                # w WAL otwarta transakcja odczytu to stały snapshot: zapisy innych
+                # połączeń idą dalej, a kopia nie zaczyna się przez nie od nowa
+                src.execute("BEGIN")
+                src.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+            restarts = 0
+            while True:
+                steps = 0
+                last_remaining = None
+
+                def progress(status, remaining, total):
+                    nonlocal steps, last_remaining
+                    steps += 1
+                    if last_remaining is not None and remaining > last_remaining:
+                        raise _Restarted()
+                    last_remaining = remaining
+                    if remaining:
+                        time.sleep(opts["sleep"])
+
+                pages = opts["pages"] if restarts < opts["max_restarts"] else -1
+                dst = sqlite3.connect(partial)
+                try:
+                    src.backup(dst, pages=pages, progress=progress)
+                    # kopia ma być jednym plikiem, bez -wal obok
+                    dst.execute("PRAGMA journal_mode=DELETE")
+                    return steps, pages, restarts
+                except _Restarted:
+                    restarts += 1
+                    if opts["verbosity"] >= 2:
+                        self.stdout.write(f"  źródło zmienione w trakcie – restart {restarts}")
+                finally:
+                    dst.close()
+                partial.unlink()
+        finally:
+            src.close()
+
+    def _integrity_check(self, path: Path) -> str:
+        conn = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True)
+        try:
+            rows = conn.execute("PRAGMA integrity_check").fetchall()
+        finally:
+            conn.close()
+        return "; ".join(row[0] for row in rows[:10])
+
+    def _rotate(self, out_dir: Path, stem: str, keep: int) -> None:
+        # nazwy z datą – kolejność alfabetyczna = chronologiczna
+        backups = sorted(
+            p for p in out_dir.glob(f"{stem}-*.sqlite3*") if not p.name.endswith(".part")
+        )
+        for old in backups[:-keep]:
+            old.unlink()
+            self.stdout.write(f"  usunięto starą kopię: {old.name}")
@@ -0,0 +1,219 @@
+import contextlib
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+
+
+SOURCE_ALIAS = "sqlite_source"
+
+# tabele wypełniane przez migrate na docelowej bazie – ich id mogą się różnić,
+# więc klucze obce do nich przepisujemy po kluczu naturalnym
+REMAPPED_MODELS = ("contenttypes.ContentType", "auth.Permission")
+
+
+def _sorted_models():
+    """Modele do skopiowania (z tabelami M2M), rodzice przed dziećmi."""
+    skip = {apps.get_model(label) for label in REMAPPED_MODELS}
+    models = [
+        m for m in apps.get_models(include_auto_created=True)
+        if m._meta.managed and not m._meta.proxy and m not in skip
+    ]
+
+    ordered, done = [], set()
+
+    def visit(model, path=()):
+        if model in done or model in path:
+            # cykl kluczy obcych – na PostgreSQL FK są DEFERRABLE, kolejność wtedy nie ma znaczenia
+            return
+        for field in model._meta.concrete_fields:
+            target = field.related_model if field.is_relation else None
+            if target is not None and target is not model and target in models:
+                visit(target, path + (model,))
+        done.add(model)
+        ordered.append(model)
+
+    for model in models:
+        visit(model)
+    return ordered
+
+
+@contextlib.contextmanager
+def _raw_timestamps(model):
+    """bulk_create woła pre_save – auto_now/auto_now_add nadpisałyby oryginalne daty."""
+    changed = []
+    for field in model._meta.concrete_fields:
+        for attr in ("auto_now", "auto_now_add"):
+            if getattr(field, attr, False):
+                setattr(field, attr, False)
+                changed.append((field, attr))
+    try:
+        yield
+    finally:
+        for field, attr in changed:
+            setattr(field, attr, True)
+
+
+class Command(BaseCommand):
+    help = (
+        "Kopiuje dane z pliku SQLite do bazy docelowej (PostgreSQL) partiami. "
+        "Docelowa baza musi mieć wykonane migracje i być pusta. "
+        "Typy zawartości i uprawnienia tworzy migrate – odwołania do nich są przepisywane po kluczu naturalnym."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--source",
+            default=str(Path(settings.BASE_DIR) / "db.sqlite3"),
+            help="Ścieżka do pliku SQLite (domyślnie BASE_DIR/db.sqlite3).",
+        )
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Alias bazy docelowej.")
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **opts):
+        source_path = Path(opts["source"])
+        if not source_path.exists():
+            raise CommandError(f"Brak pliku SQLite: {source_path}")
+
+        target_alias = opts["database"]
+        target = connections[target_alias]
+        if target.vendor != "postgresql":
+            raise CommandError(
+                f"Baza docelowa '{target_alias}' to {target.vendor}, a nie PostgreSQL "
+                "(ustaw DB_BACKEND = \"postgres\" w local_settings)."
+            )
+
+        self._register_source(source_path)
+        source = connections[SOURCE_ALIAS]
+
+        executor = MigrationExecutor(target)
+        if executor.migration_plan(executor.loader.graph.leaf_nodes()):
+            raise CommandError("Baza docelowa ma niewykonane migracje – najpierw: manage.py migrate.")
+
+        models = _sorted_models()
+        non_empty = [m._meta.label for m in models if m._base_manager.using(target_alias).exists()]
+        if non_empty:
+            raise CommandError("Baza docelowa nie jest pusta: " + ", ".join(non_empty))
+
+        remap = self._build_remap(target_alias)
+        batch_size = opts["batch_size"]
+        started = time.monotonic()
+
+        try:
+            with transaction.atomic(using=target_alias):
+                for model in models:
+                    copied, skipped = self._copy_model(model, target_alias, remap, batch_size)
+                    if copied or skipped:
+                        msg = f"{model._meta.label}: {copied}"
+                        if skipped:
+                            msg += f" (pominięto {skipped} – brak typu/uprawnienia w bazie docelowej)"
+                        self.stdout.write(msg)
+
+                self._reset_sequences(target, models)
+        finally:
+            source.close()
+
+        self.stdout.write("")
+        self.stdout.write("Weryfikacja liczby wierszy:")
+        mismatches = 0
+        for model in models:
+            src_count = model._base_manager.using(SOURCE_ALIAS).count()
+            dst_count = model._base_manager.using(target_alias).count()
+            if src_count != dst_count:
+                mismatches += 1
+                self.stdout.write(self.style.WARNING(f"  {model._meta.label}: {src_count} -> {dst_count}"))
+        source.close()
+
+        elapsed = time.monotonic() - started
+        if mismatches:
+            self.stdout.write(self.style.WARNING(f"Różnice w {mismatches} tabelach ({elapsed:.1f} s)."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"OK – wszystkie tabele zgodne ({elapsed:.1f} s)."))
+
+    def _register_source(self, path):
+        configured = connections.configure_settings({
+            DEFAULT_DB_ALIAS: dict(connections.settings[DEFAULT_DB_ALIAS]),
+            SOURCE_ALIAS: {"ENGINE": "django.db.backends.sqlite3", "NAME": str(path)},
+        })
+        connections.settings[SOURCE_ALIAS] = configured[SOURCE_ALIAS]
+
+    def _build_remap(self, target_alias):
+        """{model: {id_źródłowe: id_docelowe}} dla ContentType i Permission."""
+        ContentType = apps.get_model("contenttypes", "ContentType")
+        Permission = apps.get_model("auth", "Permission")
+
+        ct_target = {
+            (ct.app_label, ct.model): ct.pk
+            for ct in ContentType.objects.using(target_alias).all()
+        }
+        ct_map = {}
+        ct_natural = {}
+        for ct in ContentType.objects.using(SOURCE_ALIAS).all():
+            ct_natural[ct.pk] = (ct.app_label, ct.model)
+            if (ct.app_label, ct.model) in ct_target:
+                ct_map[ct.pk] = ct_target[(ct.app_label, ct.model)]
+
+        perm_target = {
+            (p.content_type_id, p.codename): p.pk
+            for p in Permission.objects.using(target_alias).all()
+        }
+        perm_map = {}
+        for p in Permission.objects.using(SOURCE_ALIAS).all():
+            target_ct = ct_map.get(p.content_type_id)
+            if target_ct is not None and (target_ct, p.codename) in perm_target:
+                perm_map[p.pk] = perm_target[(target_ct, p.codename)]
+
+        return {ContentType: ct_map, Permission: perm_map}
+
+    def _copy_model(self, model, target_alias, remap, batch_size):
+        remapped_fields = [
+            (f, remap[f.related_model])
+            for f in model._meta.concrete_fields
+            if f.is_relation and f.related_model in remap
+        ]
+
+        copied = skipped = 0
+        batch = []
+        manager = model._base_manager
+
+        with _raw_timestamps(model):
+            for obj in manager.using(SOURCE_ALIAS).order_by("pk").iterator(chunk_size=batch_size):
+                drop = False
+                for field, mapping in remapped_fields:
+                    old = getattr(obj, field.attname)
+                    if old is None:
+                        continue
+                    new = mapping.get(old)
+                    if new is None:
+                        if not field.null:
+                            drop = True
+                            break
+                    setattr(obj, field.attname, new)
+                if drop:
+                    skipped += 1
+                    continue
+
+                batch.append(obj)
+                if len(batch) >= batch_size:
+                    manager.using(target_alias).bulk_create(batch, batch_size=batch_size)
+                    copied += len(batch)
+                    batch = []
+
+            if batch:
+                manager.using(target_alias).bulk_create(batch, batch_size=batch_size)
+                copied += len(batch)
+
+        return copied, skipped
+
+    def _reset_sequences(self, target, models):
+        # id wstawiamy jawnie – sekwencje trzeba przesunąć za max(id)
+        statements = target.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with target.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
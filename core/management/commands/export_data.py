@@ -0,0 +1,55 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+
+from core import exports
+
+
+class Command(BaseCommand):
+    help = (
+        "Eksport danych do CSV/XLSX (zlecenia, protokoły serwisowe, pozycje, wyniki konserwacji) – "
+        "strumieniowo, stała pamięć. Filtry jak parametry GET list w portalu (--filter klucz=wartość)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=sorted(exports.DATASETS))
+        parser.add_argument("--format", dest="fmt", choices=exports.FORMATS, default="csv")
+        parser.add_argument(
+            "--output",
+            "-o",
+            help="Plik wynikowy. Domyślnie nazwa jak w portalu; '-' = stdout.",
+        )
+        parser.add_argument(
+            "--filter",
+            action="append",
+            default=[],
+            metavar="KLUCZ=WARTOŚĆ",
+            help="Filtr (można powtórzyć), np. status=COMPLETED, time=year, hide_completed=0.",
+        )
+
+    def handle(self, *args, **opts):
+        dataset, fmt = opts["dataset"], opts["fmt"]
+
+        params = QueryDict(mutable=True)
+        for item in opts["filter"]:
+            key, sep, value = item.partition("=")
+            if not sep or not key:
+                raise CommandError(f"Niepoprawny filtr {item!r} – oczekiwano KLUCZ=WARTOŚĆ.")
+            params.appendlist(key.strip(), value.strip())
+
+        output = opts["output"] or exports.export_filename(dataset, fmt)
+        chunks = exports.stream_export(dataset, fmt, params)
+
+        if output == "-":
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+
+        written = 0
+        with open(output, "wb") as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+                written += len(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Zapisano {output} ({written / 1024:.1f} KiB)."))
@@ -0,0 +1,87 @@
+import codecs
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import importers
+
+
+class Command(BaseCommand):
+    help = (
+        "Import CSV: dane FV, obiekty, systemy, kontakty (core/importers.py). Walidacja formularzami "
+        "portalu, zapis bulk_create w jednej transakcji; przy błędach nic nie jest zapisywane."
+    )
+
+    def add_arguments(self, parser):
+        for kind in importers.IMPORT_KINDS:
+            parser.add_argument(f"--{kind}", metavar="PLIK.csv", help=f"{importers.IMPORT_LABELS[kind]} (CSV).")
+        parser.add_argument(
+            "--encoding",
+            help="Kodowanie plików (domyślnie CORE_IMPORTS['ENCODING'], utf-8-sig); CSV z Excela: cp1250.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Tylko walidacja – na końcu rollback.")
+        parser.add_argument(
+            "--skip-invalid",
+            action="store_true",
+            help="Zapisz poprawne wiersze mimo błędów w innych.",
+        )
+        parser.add_argument("--report", metavar="PLIK.csv", help="Raport błędów (wiersz, pole, komunikat) do CSV.")
+
+    def handle(self, *args, **opts):
+        paths = {kind: opts[kind] for kind in importers.IMPORT_KINDS if opts[kind]}
+        if not paths:
+            raise CommandError("Podaj co najmniej jeden plik: " + ", ".join(f"--{k}" for k in importers.IMPORT_KINDS))
+
+        if opts["encoding"]:
+            try:
+                codecs.lookup(opts["encoding"])
+            except LookupError:
+                raise CommandError(f"Nieznane kodowanie: {opts['encoding']}")
+
+        files = {}
+        try:
+            for kind, path in paths.items():
+                files[kind] = open(path, "rb")
+            result = importers.run_import(
+                files, dry_run=opts["dry_run"], skip_invalid=opts["skip_invalid"], encoding=opts["encoding"]
+            )
+        except OSError as exc:
+            raise CommandError(str(exc))
+        finally:
+            for fh in files.values():
+                fh.close()
+
+        for kind in importers.IMPORT_KINDS:
+            if kind not in paths:
+                continue
+            self.stdout.write(
+                f"{importers.IMPORT_LABELS[kind]:<10} wierszy: {result.rows[kind]:>6}  "
+                f"nowych: {result.created[kind]:>6}  pominiętych (już są): {result.skipped[kind]:>6}"
+            )
+        if result.created["site_contacts"] or result.skipped["site_contacts"]:
+            self.stdout.write(
+                f"Powiązania kontaktów z obiektami – nowych: {result.created['site_contacts']}, "
+                f"pominiętych (już są): {result.skipped['site_contacts']}"
+            )
+        self.stdout.write(f"{result.rows_per_second():.0f} wierszy/s ({result.seconds:.2f} s)")
+
+        for err in result.errors[:50]:
+            self.stderr.write(f"{err.kind}:{err.line or '*'} {err.field or '-'}: {err.message}")
+        if result.error_count > 50:
+            self.stderr.write(f"... i {result.error_count - 50} kolejnych błędów (pełna lista: --report).")
+
+        if opts["report"]:
+            with open(opts["report"], "w", newline="", encoding="utf-8-sig") as fh:
+                writer = csv.writer(fh, delimiter=";")
+                writer.writerow(["plik", "wiersz", "pole", "błąd"])
+                for err in result.errors:
+                    writer.writerow([err.kind, err.line, err.field, err.message])
+
+        if result.committed:
+            self.stdout.write(self.style.SUCCESS("Zapisano."))
+        elif opts["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"Dry-run – nic nie zapisano. Błędów: {result.error_count}."))
+        else:
+            if result.failed_files:
+                raise CommandError("Nie udało się przeczytać pliku – nic nie zapisano (popraw plik albo --encoding).")
+            raise CommandError(f"Błędów: {result.error_count} – nic nie zapisano (popraw pliki albo --skip-invalid).")
@@ -0,0 +1,61 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Usuwa wygasłe sesje z bazy partiami (krótkie transakcje zamiast jednego dużego DELETE, "
+        "który na SQLite blokuje zapisy na cały czas trwania). Do crona zamiast clearsessions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0.05,
+            help="Przerwa (s) między partiami – daje miejsce zapisom z PWA.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Tylko policz wygasłe sesje.")
+
+    def handle(self, *args, **opts):
+        if settings.SESSION_ENGINE.endswith("signed_cookies"):
+            self.stdout.write("SESSION_ENGINE = signed_cookies – sesje nie są w bazie, nie ma czego czyścić.")
+            return
+
+        now = timezone.now()
+        expired = Session.objects.filter(expire_date__lt=now)
+
+        if opts["dry_run"]:
+            total = Session.objects.count()
+            self.stdout.write(f"Wygasłe sesje: {expired.count()} z {total}.")
+            return
+
+        batch_size = opts["batch_size"]
+        deleted = 0
+        batches = 0
+        started = time.monotonic()
+
+        while True:
+            with transaction.atomic():
+                keys = list(expired.values_list("session_key", flat=True)[:batch_size])
+                if not keys:
+                    break
+                n, _ = Session.objects.filter(session_key__in=keys).delete()
+            deleted += n
+            batches += 1
+            if opts["verbosity"] >= 2:
+                self.stdout.write(f"  partia {batches}: {n}")
+            if len(keys) < batch_size:
+                break
+            time.sleep(opts["sleep"])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"Usunięto {deleted} wygasłych sesji w {batches} partiach ({elapsed:.1f} s).")
+        )
@@ -0,0 +1,199 @@
+import gzip
+import json
+import random
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.columnar import decode_columnar, encode_columnar
+from core.compression import brotli, compress_bytes
+from core.models import System
+from core.streaming import JsonArray, iter_json_object
+from core.views_pwa import (
+    SITE_DICT_COLUMNS, SITE_FIELDS, SYSTEM_DICT_COLUMNS, SYSTEM_FIELDS, _isoformat_row,
+)
+
+
+CITIES = [
+    "Kraków", "Wieliczka", "Skawina", "Niepołomice", "Zielonki", "Zabierzów", "Myślenice",
+    "Bochnia", "Tarnów", "Oświęcim", "Chrzanów", "Olkusz", "Wadowice", "Nowy Targ",
+]
+MANUFACTURERS = ["Hikvision", "Dahua", "Satel", "Bosch", "D+H", "Roger", "Commax", "Axis", ""]
+STREETS = ["Długa", "Krakowska", "Zakopiańska", "Wielicka", "Kalwaryjska", "Mogilska", "Lea", "Opolska"]
+
+
+def _synthetic_catalog(n_sites: int, systems_per_site: int, seed: int):
+    """Katalog o kształcie jak z api_pwa_catalog_dump (bez bazy)."""
+    rnd = random.Random(seed)
+    system_types = [c for c, _label in System.SystemType.choices]
+    now = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+    sites, systems = [], []
+    system_id = 1
+    for site_id in range(1, n_sites + 1):
+        sites.append(_isoformat_row({
+            "id": site_id,
+            "name": f"Wspólnota Mieszkaniowa {rnd.choice(STREETS)} {rnd.randint(1, 200)}",
+            "street": f"ul. {rnd.choice(STREETS)} {rnd.randint(1, 200)}",
+            "postal_code": f"3{rnd.randint(0, 4)}-{rnd.randint(100, 999)}",
+            "city": rnd.choice(CITIES),
+            "google_maps_url": "",
+            "access_info": rnd.choice(["", "Klucz u administratora.", f"Kod do furtki: {rnd.randint(1000, 9999)}"]),
+            "technical_notes": rnd.choice(["", "Centrala w piwnicy, pom. techniczne."]),
+            "updated_at": now + timedelta(minutes=site_id),
+        }))
+        for _ in range(systems_per_site):
+            systems.append(_isoformat_row({
+                "id": system_id,
+                "site_id": site_id,
+                "system_type": rnd.choice(system_types),
+                "name": rnd.choice(["", "Klatka A", "Garaż", "Budynek B"]),
+                "manufacturer": rnd.choice(MANUFACTURERS),
+                "model": rnd.choice(["", "DS-7608NI", "INTEGRA 64", "RZN 4408"]),
+                "in_service_contract": rnd.random() < 0.6,
+                "commissioning_date": date(2015, 1, 1) + timedelta(days=rnd.randint(0, 3000)),
+                "last_modernization_date": None,
+                "location_info": rnd.choice(["", "Szafa RACK w piwnicy"]),
+                "access_data": rnd.choice(["", f"admin / {rnd.randint(100000, 999999)}"]),
+                "procedures": "",
+                "notes": "",
+                "updated_at": now + timedelta(minutes=system_id),
+            }))
+            system_id += 1
+    return sites, systems
+
+
+# JSON.parse + decodeColumnar z static/pwa/idb.js w Node (V8 – ten sam silnik co Chrome
+# na telefonach); idb.js dotyka indexedDB dopiero w funkcjach, więc import działa bez przeglądarki
+JS_BENCH = """
+import { readFileSync } from "node:fs";
+import { pathToFileURL } from "node:url";
+
+const [idbPath, repeat, ...bodies] = process.argv.slice(2);
+const { decodeColumnar } = await import(pathToFileURL(idbPath).href);
+
+function parse(text) {
+  const data = JSON.parse(text);
+  return [decodeColumnar(data.sites), decodeColumnar(data.systems)];
+}
+
+const out = [];
+for (const path of bodies) {
+  const text = readFileSync(path, "utf8");
+  const times = [];
+  for (let i = 0; i < Number(repeat); i++) {
+    const started = performance.now();
+    parse(text);
+    times.push(performance.now() - started);
+  }
+  times.sort((a, b) => a - b);
+  out.push(times[Math.floor(times.length / 2)]);
+}
+console.log(JSON.stringify(out));
+"""
+
+
+def _js_parse_ms(bodies, repeat: int):
+    """Mediana czasu parsowania w Node dla każdego body albo None (brak node)."""
+    node = shutil.which("node")
+    if not node:
+        return None
+    idb = Path(settings.BASE_DIR) / "static" / "pwa" / "idb.js"
+    with tempfile.TemporaryDirectory() as tmp:
+        script = Path(tmp) / "bench.mjs"
+        script.write_text(JS_BENCH, encoding="utf-8")
+        paths = []
+        for i, body in enumerate(bodies):
+            path = Path(tmp) / f"body{i}.json"
+            path.write_bytes(body)
+            paths.append(str(path))
+        result = subprocess.run(
+            [node, str(script), str(idb), str(repeat), *paths],
+            capture_output=True, text=True, check=True,
+        )
+    return json.loads(result.stdout)
+
+
+def _median_ms(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+class Command(BaseCommand):
+    help = (
+        "Porównuje format wierszowy i kolumnowy (?format=columnar) katalogu PWA na syntetycznym "
+        "katalogu: rozmiar (surowy/gzip/brotli) oraz czas parsowania i dekodowania "
+        "(Python oraz JS w Node, jeśli jest zainstalowany; mediana)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sites", type=int, default=5000)
+        parser.add_argument("--systems-per-site", type=int, default=3)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--no-js", action="store_true", help="Pomiń pomiar w Node.")
+
+    def handle(self, *args, **opts):
+        sites, systems = _synthetic_catalog(opts["sites"], opts["systems_per_site"], opts["seed"])
+
+        rows_body = b"".join(iter_json_object({
+            "server_time": "",
+            "scope": "all",
+            "sites": JsonArray(sites),
+            "systems": JsonArray(systems),
+        }))
+        columnar_body = b"".join(iter_json_object({
+            "format": "columnar",
+            "server_time": "",
+            "scope": "all",
+            "sites": encode_columnar(sites, dict_columns=SITE_DICT_COLUMNS, columns=SITE_FIELDS),
+            "systems": encode_columnar(systems, dict_columns=SYSTEM_DICT_COLUMNS, columns=SYSTEM_FIELDS),
+        }))
+
+        def parse_rows():
+            data = json.loads(rows_body)
+            return data["sites"], data["systems"]
+
+        def parse_columnar():
+            data = json.loads(columnar_body)
+            return decode_columnar(data["sites"]), decode_columnar(data["systems"])
+
+        if parse_columnar() != parse_rows():
+            self.stderr.write(self.style.ERROR("Format kolumnowy nie odtwarza danych 1:1!"))
+            return
+
+        self.stdout.write(
+            f"Katalog: {len(sites)} obiektów, {len(systems)} systemów (mediana z {opts['repeat']} prób)"
+        )
+        js_ms = None if opts["no_js"] else _js_parse_ms([rows_body, columnar_body], opts["repeat"])
+
+        header = f"{'format':<10} {'surowy':>12} {'gzip':>10} {'brotli':>10} {'py ms':>8} {'js ms':>8}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+
+        for i, (name, body, parse) in enumerate((
+            ("rows", rows_body, parse_rows),
+            ("columnar", columnar_body, parse_columnar),
+        )):
+            gz = len(gzip.compress(body, 6))
+            br = f"{len(compress_bytes(body, 'br')):,}" if brotli is not None else "-"
+            parse_ms = _median_ms(parse, opts["repeat"])
+            js = f"{js_ms[i]:.1f}" if js_ms else "-"
+            self.stdout.write(f"{name:<10} {len(body):>12,} {gz:>10,} {br:>10} {parse_ms:>8.1f} {js:>8}")
+
+        self.stdout.write("")
+        self.stdout.write("py ms = json.loads + decode_columnar (core/columnar.py);")
+        self.stdout.write("js ms = JSON.parse + decodeColumnar (static/pwa/idb.js) w Node – jak sync w PWA.")
+        if js_ms is None and not opts["no_js"]:
+            self.stdout.write("Brak node w PATH – pomiar JS pominięty.")
@@ -0,0 +1,60 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import analytics
+
+
+class Command(BaseCommand):
+    help = (
+        "Przelicza sumy miesięczne analityki (MonthlySummary) dla miesięcy oznaczonych przez sygnały. "
+        "Do crona, np. co kilka minut; --rebuild przelicza całą historię od zera."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Przelicz wszystkie miesiące (po zmianach z pominięciem sygnałów, np. QuerySet.update).",
+        )
+        parser.add_argument(
+            "--month",
+            action="append",
+            default=[],
+            metavar="RRRR-MM",
+            help="Przelicz wskazany miesiąc (można powtórzyć).",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["rebuild"]:
+            stats = analytics.rebuild()
+            self.stdout.write(self.style.SUCCESS(
+                f"Przeliczono od zera – miesięcy: {stats['months']}, wierszy sum: {stats['rows']} "
+                f"({stats['seconds']:.2f} s)."
+            ))
+            return
+
+        if opts["month"]:
+            for value in opts["month"]:
+                try:
+                    year, month = (int(part) for part in value.split("-"))
+                    month = date(year, month, 1)
+                except ValueError:
+                    raise CommandError(f"Niepoprawny miesiąc {value!r} – oczekiwano RRRR-MM.")
+                try:
+                    rows = analytics.refresh_month(month)
+                except ValueError as exc:
+                    raise CommandError(str(exc))
+                self.stdout.write(f"{month:%m-%Y}: wierszy sum {rows}")
+            return
+
+        started = time.monotonic()
+        months = analytics.refresh_dirty()
+        if not months:
+            self.stdout.write("Brak miesięcy do przeliczenia.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Przeliczono miesięcy: {len(months)} ({', '.join(f'{m:%m-%Y}' for m in months)}), "
+            f"{time.monotonic() - started:.2f} s."
+        ))
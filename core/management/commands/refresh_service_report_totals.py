@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from core.models import ServiceReport, ServiceReportItem
+
+
+class Command(BaseCommand):
+    help = (
+        "Przelicza ServiceReport.items_net_total / items_count z pozycji (jeden UPDATE). "
+        "Potrzebne po zmianach pozycji z pominięciem sygnałów (QuerySet.update, surowy SQL)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Tylko pokaż protokoły z rozjechanymi sumami, bez zapisu (błąd, jeśli są).",
+        )
+
+    def handle(self, *args, **opts):
+        if not opts["check"]:
+            updated = ServiceReport.objects.all().refresh_items_totals()
+            self.stdout.write(self.style.SUCCESS(f"Przeliczono sumy {updated} protokołów."))
+            return
+
+        items = ServiceReportItem.objects.filter(report=OuterRef("pk")).order_by().values("report")
+        drift = (
+            ServiceReport.objects.annotate(
+                real_total=Coalesce(
+                    Subquery(items.annotate(s=Sum("total_price")).values("s")),
+                    0,
+                    output_field=DecimalField(max_digits=12, decimal_places=2),
+                ),
+                real_count=Coalesce(Subquery(items.annotate(n=Count("pk")).values("n")), 0),
+            )
+            # NOT (suma zgodna AND liczba zgodna)
+            .exclude(items_net_total=F("real_total"), items_count=F("real_count"))
+            .values_list("pk", "number", "items_net_total", "real_total", "items_count", "real_count")
+        )
+
+        bad = 0
+        for pk, number, total, real_total, count, real_count in drift.iterator():
+            bad += 1
+            self.stdout.write(f"#{pk} {number or '-'}: netto {total} -> {real_total}, pozycji {count} -> {real_count}")
+
+        if bad:
+            raise CommandError(f"Rozjechane sumy: {bad} (uruchom bez --check, żeby przeliczyć).")
+        self.stdout.write(self.style.SUCCESS("Sumy zgodne z pozycjami."))
@@ -0,0 +1,78 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+
+POLLING_URLS = (
+    "/api/pwa/health/",
+    "/api/pwa/ping/",
+    "/api/powiadomienia/zlecenia/unread-count/",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Porównuje strategie sesji (settings.SESSION_STRATEGY_ENGINES) na endpointach odpytywanych "
+        "cyklicznie: liczba zapytań SQL i średni czas na request. Działa na tymczasowej bazie testowej."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Requestów na endpoint i strategię.")
+        parser.add_argument(
+            "--strategy",
+            action="append",
+            help="Tylko wybrane strategie (można powtórzyć). Domyślnie wszystkie.",
+        )
+
+    def handle(self, *args, **opts):
+        strategies = opts["strategy"] or list(settings.SESSION_STRATEGY_ENGINES)
+        n = opts["requests"]
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            User = get_user_model()
+            user = User.objects.create_superuser("bench", "bench@example.com", "bench")
+
+            rows = []
+            for strategy in strategies:
+                engine = settings.SESSION_STRATEGY_ENGINES[strategy]
+                with override_settings(SESSION_ENGINE=engine, ALLOWED_HOSTS=["*"]):
+                    caches[settings.SESSION_CACHE_ALIAS].clear()
+                    client = Client()
+                    client.force_login(user)
+
+                    for url in POLLING_URLS:
+                        client.get(url)  # rozgrzewka (cache sesji, pierwsze połączenie)
+
+                        queries = []
+                        times = []
+                        for _ in range(n):
+                            with CaptureQueriesContext(connection) as ctx:
+                                started = time.perf_counter()
+                                resp = client.get(url)
+                                times.append((time.perf_counter() - started) * 1000)
+                            queries.append(len(ctx.captured_queries))
+                            if resp.status_code != 200:
+                                self.stderr.write(f"{strategy} {url}: HTTP {resp.status_code}")
+                                break
+
+                        rows.append((strategy, url, statistics.mean(queries), statistics.mean(times)))
+                    caches[settings.SESSION_CACHE_ALIAS].clear()
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"{n} requestów na endpoint (średnie):")
+        header = f"{'strategia':<16} {'endpoint':<44} {'SQL/req':>8} {'ms/req':>8}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for strategy, url, q, ms in rows:
+            self.stdout.write(f"{strategy:<16} {url:<44} {q:>8.1f} {ms:>8.2f}")
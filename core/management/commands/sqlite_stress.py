@@ -0,0 +1,169 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, transaction
+from django.db.backends.signals import connection_created
+
+from core.db import PRAGMAS_DISPATCH_UID, configure_sqlite_connection
+
+
+STRESS_ALIAS = "sqlite_stress"
+
+
+class Command(BaseCommand):
+    help = (
+        "Test obciążeniowy SQLite na tymczasowym pliku: równoległe zapisy i odczyty przez "
+        "połączenia Django (PRAGMA z configure_sqlite_connection, transakcje wg "
+        "SQLITE_TRANSACTION_MODE). Pokazuje liczbę błędów blokady i opóźnienia odczytów."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument("--rows", type=int, default=20000, help="Liczba wierszy na start.")
+        parser.add_argument(
+            "--no-tuning",
+            action="store_true",
+            help="Bez PRAGMA (domyślny journal, busy_timeout=0) i z BEGIN DEFERRED – dla porównania.",
+        )
+
+    def _register(self, path, no_tuning):
+        default = dict(connections.settings[DEFAULT_DB_ALIAS])
+        if default["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError("Domyślna baza nie jest SQLite.")
+        options = dict(default.get("OPTIONS") or {})
+        if no_tuning:
+            options.pop("transaction_mode", None)
+            options["timeout"] = 0
+        configured = connections.configure_settings({
+            DEFAULT_DB_ALIAS: default,
+            STRESS_ALIAS: {**default, "NAME": path, "OPTIONS": options, "TEST": {}},
+        })
+        connections.settings[STRESS_ALIAS] = configured[STRESS_ALIAS]
+
+    def handle(self, *args, **opts):
+        no_tuning = opts["no_tuning"]
+
+        fd, path = tempfile.mkstemp(suffix=".sqlite3", prefix="allsec_stress_")
+        os.close(fd)
+        self._register(path, no_tuning)
+
+        if no_tuning:
+            # bez PRAGMA z configure_sqlite_connection (przywracane w finally)
+            connection_created.disconnect(dispatch_uid=PRAGMAS_DISPATCH_UID)
+
+        def connect():
+            conn = connections[STRESS_ALIAS]
+            conn.ensure_connection()
+            return conn
+
+        def pragmas():
+            with connect().cursor() as cursor:
+                return {
+                    name: cursor.execute(f"PRAGMA {name}").fetchone()[0]
+                    for name in ("journal_mode", "busy_timeout", "synchronous")
+                }
+
+        try:
+            conn = connect()
+            with conn.cursor() as cursor, transaction.atomic(using=STRESS_ALIAS):
+                cursor.execute("CREATE TABLE item (id INTEGER PRIMARY KEY, site_id INTEGER, result TEXT, note TEXT)")
+                cursor.execute("CREATE INDEX item_site ON item(site_id)")
+                cursor.executemany(
+                    "INSERT INTO item (site_id, result, note) VALUES (%s, %s, %s)",
+                    [(i % 500, "NOT_DONE", "") for i in range(opts["rows"])],
+                )
+            used_pragmas = pragmas()
+            tx_mode = conn.transaction_mode or "DEFERRED"
+            conn.close()
+
+            stop_at = time.monotonic() + opts["seconds"]
+            lock = threading.Lock()
+            stats = {
+                "writes": 0, "write_errors": 0,
+                "reads": 0, "read_errors": 0,
+                "read_latencies": [],
+            }
+
+            def writer(n):
+                conn = connect()
+                i = 0
+                while time.monotonic() < stop_at:
+                    i += 1
+                    try:
+                        # odczyt przed zapisem – w BEGIN DEFERRED to klasyczny "database is locked"
+                        with transaction.atomic(using=STRESS_ALIAS), conn.cursor() as cursor:
+                            cursor.execute("SELECT count(*) FROM item WHERE site_id = %s", [i % 500])
+                            cursor.execute(
+                                "UPDATE item SET result = %s, note = %s WHERE site_id = %s",
+                                ["OK" if i % 2 else "FAIL", f"w{n}-{i}", (n * 31 + i) % 500],
+                            )
+                            cursor.execute("INSERT INTO item (site_id, result, note) VALUES (%s, 'OK', '')", [i % 500])
+                        with lock:
+                            stats["writes"] += 1
+                    except OperationalError:
+                        with lock:
+                            stats["write_errors"] += 1
+                conn.close()
+
+            def reader(n):
+                conn = connect()
+                i = 0
+                while time.monotonic() < stop_at:
+                    i += 1
+                    started = time.perf_counter()
+                    try:
+                        with conn.cursor() as cursor:
+                            cursor.execute(
+                                "SELECT result, count(*) FROM item WHERE site_id BETWEEN %s AND %s GROUP BY result",
+                                [(n + i) % 400, (n + i) % 400 + 100],
+                            )
+                            cursor.fetchall()
+                        elapsed = time.perf_counter() - started
+                        with lock:
+                            stats["reads"] += 1
+                            stats["read_latencies"].append(elapsed)
+                    except OperationalError:
+                        with lock:
+                            stats["read_errors"] += 1
+                conn.close()
+
+            threads = [threading.Thread(target=writer, args=(n,)) for n in range(opts["writers"])]
+            threads += [threading.Thread(target=reader, args=(n,)) for n in range(opts["readers"])]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            lat = sorted(stats["read_latencies"]) or [0.0]
+            p50 = lat[len(lat) // 2] * 1000
+            p99 = lat[min(len(lat) - 1, int(len(lat) * 0.99))] * 1000
+
+            self.stdout.write(f"PRAGMA: {used_pragmas}, transakcje: BEGIN {tx_mode}")
+            self.stdout.write(
+                f"Zapisy: {stats['writes']} ({stats['writes'] / opts['seconds']:.0f}/s), "
+                f"błędy blokady: {stats['write_errors']}"
+            )
+            self.stdout.write(
+                f"Odczyty: {stats['reads']} ({stats['reads'] / opts['seconds']:.0f}/s), "
+                f"błędy: {stats['read_errors']}, p50={p50:.2f} ms, p99={p99:.2f} ms"
+            )
+
+            if stats["write_errors"] or stats["read_errors"]:
+                self.stdout.write(self.style.WARNING("Wystąpiły błędy blokady."))
+            else:
+                self.stdout.write(self.style.SUCCESS("Brak błędów blokady."))
+        finally:
+            connections[STRESS_ALIAS].close()
+            del connections.settings[STRESS_ALIAS]
+            if no_tuning:
+                connection_created.connect(configure_sqlite_connection, dispatch_uid=PRAGMAS_DISPATCH_UID)
+            for suffix in ("", "-wal", "-shm", "-journal"):
+                try:
+                    os.remove(path + suffix)
+                except FileNotFoundError:
+                    pass
@@ -1,4 +1,26 @@
-from django.http import HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect
+
+
+class HealthCheckMiddleware:
+    """
+    /api/pwa/health/ – "czy serwer żyje" dla PWA (ping co kilka sekund).
+
+    Odpowiada od razu, przed sesją, autoryzacją i resztą middleware – bez
+    zapytań do bazy. Musi stać NA POCZĄTKU listy MIDDLEWARE.
+    Wygaśnięcie sesji sprawdza osobno /api/pwa/ping/ (login_required).
+    """
+
+    path = "/api/pwa/health/"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path == self.path and request.method in ("GET", "HEAD"):
+            response = HttpResponse(b'{"ok":true}', content_type="application/json")
+            response["Cache-Control"] = "no-store"
+            return response
+        return self.get_response(request)
 
 
 class TechnicianPwaOnlyMiddleware:
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0030_alter_system_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='maintenancecheckitem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Zaktualizowano'),
+        ),
+        migrations.AddField(
+            model_name='maintenancesection',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Zaktualizowano'),
+        ),
+    ]
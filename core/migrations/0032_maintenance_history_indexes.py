@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0031_maintenance_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='maintenanceprotocol',
+            index=models.Index(fields=['site', '-period_year', '-period_month', '-id'], name='core_mp_site_period_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenancesection',
+            index=models.Index(fields=['system', 'protocol'], name='core_ms_system_protocol_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:35
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_item_totals(apps, schema_editor):
+    # jak ServiceReportQuerySet.refresh_items_totals() – jeden UPDATE dla wszystkich
+    ServiceReport = apps.get_model("core", "ServiceReport")
+    ServiceReportItem = apps.get_model("core", "ServiceReportItem")
+    items = ServiceReportItem.objects.filter(report=models.OuterRef("pk")).order_by().values("report")
+    ServiceReport.objects.update(
+        items_net_total=Coalesce(
+            models.Subquery(items.annotate(s=models.Sum("total_price")).values("s")),
+            Decimal("0.00"),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+        items_count=Coalesce(models.Subquery(items.annotate(n=models.Count("pk")).values("n")), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0032_maintenance_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='servicereport',
+            name='items_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Liczba pozycji'),
+        ),
+        migrations.AddField(
+            model_name='servicereport',
+            name='items_net_total',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=12, verbose_name='Wartość netto pozycji'),
+        ),
+        migrations.AddIndex(
+            model_name='servicereport',
+            index=models.Index(fields=['status', 'report_date', 'items_net_total'], name='core_sr_revenue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicereport',
+            index=models.Index(fields=['items_net_total'], name='core_sr_net_total_idx'),
+        ),
+        migrations.RunPython(backfill_item_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:40
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0033_service_report_item_totals'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySummaryDirty',
+            fields=[
+                ('month', models.DateField(primary_key=True, serialize=False, verbose_name='Miesiąc')),
+                ('marked_at', models.DateTimeField(auto_now=True, verbose_name='Oznaczono')),
+            ],
+            options={
+                'verbose_name': 'Miesiąc do przeliczenia',
+                'verbose_name_plural': 'Miesiące do przeliczenia',
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Miesiąc')),
+                ('work_type', models.CharField(choices=[('MAINTENANCE', 'Konserwacja'), ('SERVICE', 'Serwis'), ('JOB', 'Montaż'), ('OTHER', 'Inne')], max_length=20, verbose_name='Typ zlecenia')),
+                ('closed_count', models.PositiveIntegerField(default=0, verbose_name='Zakończone zlecenia')),
+                ('waiting_parts_count', models.PositiveIntegerField(default=0, verbose_name='Oczekiwania na materiał')),
+                ('waiting_parts_seconds', models.PositiveBigIntegerField(default=0, verbose_name='Czas oczekiwania na materiał (s)')),
+                ('reports_count', models.PositiveIntegerField(default=0, verbose_name='Protokoły zatwierdzone')),
+                ('net_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Przychód netto')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Przeliczono')),
+                ('manager', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.manager', verbose_name='Zarządca')),
+                ('technician', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Serwisant')),
+            ],
+            options={
+                'verbose_name': 'Podsumowanie miesięczne',
+                'verbose_name_plural': 'Podsumowania miesięczne',
+                'ordering': ['-month'],
+                'indexes': [models.Index(fields=['month', 'manager'], name='core_msum_month_mgr_idx'), models.Index(fields=['month', 'technician'], name='core_msum_month_tech_idx')],
+            },
+        ),
+    ]
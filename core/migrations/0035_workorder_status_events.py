@@ -0,0 +1,87 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:44
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+CLOSED_STATUSES = ("COMPLETED", "CANCELLED")
+
+
+def backfill_status_history(apps, schema_editor):
+    WorkOrder = apps.get_model("core", "WorkOrder")
+    WorkOrderEvent = apps.get_model("core", "WorkOrderEvent")
+
+    # dotychczasowe zdarzenia powstawały tylko jako powiadomienia z PWA
+    WorkOrderEvent.objects.update(notify=True)
+
+    # czas w poprzednim statusie – tylko gdy łańcuch zdarzeń jest ciągły
+    # (poprzednie zdarzenie weszło w status, z którego wychodzi bieżące)
+    changed = []
+    prev = None
+    for ev in WorkOrderEvent.objects.order_by("work_order_id", "created_at", "id").iterator():
+        if prev is not None and prev.work_order_id == ev.work_order_id and prev.new_status == ev.old_status:
+            ev.duration_seconds = max(int((ev.created_at - prev.created_at).total_seconds()), 0)
+            changed.append(ev)
+        prev = ev
+    WorkOrderEvent.objects.bulk_update(changed, ["duration_seconds"], batch_size=500)
+
+    # wejście w bieżący status: ostatnie zdarzenie do niego; closed_at: to samo albo updated_at
+    entered = (
+        WorkOrderEvent.objects.filter(work_order=models.OuterRef("pk"), new_status=models.OuterRef("status"))
+        .order_by("-created_at", "-id")
+        .values("created_at")[:1]
+    )
+    WorkOrder.objects.filter(status__in=CLOSED_STATUSES, closed_at__isnull=True).update(
+        closed_at=Coalesce(models.Subquery(entered), "updated_at"),
+    )
+    WorkOrder.objects.update(status_changed_at=models.Subquery(entered))
+    WorkOrder.objects.filter(status__in=CLOSED_STATUSES, status_changed_at__isnull=True).update(
+        status_changed_at=models.F("closed_at"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0034_monthly_summaries'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workorder',
+            name='status_changed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Zmiana statusu'),
+        ),
+        migrations.AddField(
+            model_name='workorderevent',
+            name='duration_seconds',
+            field=models.PositiveBigIntegerField(blank=True, null=True, verbose_name='Czas w poprzednim statusie (s)'),
+        ),
+        migrations.AddField(
+            model_name='workorderevent',
+            name='notify',
+            field=models.BooleanField(default=False, verbose_name='Powiadomienie dla biura'),
+        ),
+        migrations.AlterField(
+            model_name='workorderevent',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Utworzono'),
+        ),
+        migrations.AlterField(
+            model_name='workorderevent',
+            name='source',
+            field=models.CharField(choices=[('PORTAL', 'Portal'), ('PWA', 'PWA'), ('ADMIN', 'Panel admina')], default='PORTAL', max_length=16, verbose_name='Źródło'),
+        ),
+        migrations.AddIndex(
+            model_name='workorderevent',
+            index=models.Index(fields=['work_order', 'created_at'], name='core_woe_timeline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workorderevent',
+            index=models.Index(condition=models.Q(('notify', True)), fields=['is_read', '-created_at'], name='core_woe_notify_idx'),
+        ),
+        migrations.RunPython(backfill_status_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-19 05:48
+
+import django.core.serializers.json
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0035_workorder_status_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedWorkOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.PositiveBigIntegerField(unique=True, verbose_name='ID zlecenia')),
+                ('number', models.CharField(blank=True, db_index=True, max_length=32, verbose_name='Numer zlecenia')),
+                ('title', models.CharField(max_length=255, verbose_name='Tytuł')),
+                ('work_type', models.CharField(choices=[('MAINTENANCE', 'Konserwacja'), ('SERVICE', 'Serwis'), ('JOB', 'Montaż'), ('OTHER', 'Inne')], max_length=20, verbose_name='Typ zlecenia')),
+                ('status', models.CharField(choices=[('NEW', 'Do umówienia'), ('SCHEDULED', 'Umówione'), ('IN_PROGRESS', 'Realizacja'), ('REALIZED', 'Zrealizowane'), ('WAITING_FOR_DECISION', 'Decyzja'), ('WAITING_FOR_PARTS', 'Materiał'), ('COMPLETED', 'Zakończone'), ('CANCELLED', 'Odwołane')], max_length=32, verbose_name='Status')),
+                ('site_name', models.CharField(max_length=255, verbose_name='Obiekt (nazwa)')),
+                ('site_city', models.CharField(blank=True, max_length=100, verbose_name='Miejscowość')),
+                ('manager_name', models.CharField(blank=True, max_length=255, verbose_name='Zarządca')),
+                ('assigned_to_name', models.CharField(blank=True, max_length=255, verbose_name='Przypisano do')),
+                ('planned_date', models.DateField(blank=True, null=True, verbose_name='Termin realizacji')),
+                ('created_at', models.DateTimeField(verbose_name='Utworzono')),
+                ('closed_at', models.DateTimeField(blank=True, null=True, verbose_name='Data zamknięcia')),
+                ('service_report_number', models.CharField(blank=True, max_length=50, verbose_name='Nr protokołu serwisowego')),
+                ('maintenance_protocol_number', models.CharField(blank=True, max_length=50, verbose_name='Nr protokołu konserwacji')),
+                ('net_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12, verbose_name='Wartość netto')),
+                ('payload', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Zrzut danych')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Zarchiwizowano')),
+                ('site', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_work_orders', to='core.site', verbose_name='Obiekt')),
+            ],
+            options={
+                'verbose_name': 'Zlecenie archiwalne',
+                'verbose_name_plural': 'Zlecenia archiwalne',
+                'ordering': ['-closed_at', '-id'],
+                'indexes': [models.Index(fields=['closed_at'], name='core_arch_closed_idx'), models.Index(fields=['site', 'closed_at'], name='core_arch_site_idx')],
+            },
+        ),
+    ]
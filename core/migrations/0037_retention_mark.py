@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-19 06:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0036_work_order_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RetentionMark',
+            fields=[
+                ('kind', models.CharField(choices=[('EVENTS', 'Zdarzenia zleceń'), ('WORK_ORDERS', 'Zlecenia zarchiwizowane')], max_length=20, primary_key=True, serialize=False, verbose_name='Rodzaj')),
+                ('month', models.DateField(verbose_name='Pierwszy kompletny miesiąc')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Zmieniono')),
+            ],
+            options={
+                'verbose_name': 'Granica retencji',
+                'verbose_name_plural': 'Granice retencji',
+            },
+        ),
+    ]
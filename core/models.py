@@ -1,8 +1,10 @@
 from django.conf import settings
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
 from django.utils import timezone
 from decimal import Decimal
 from django.db.models import Max
+from django.db.models.functions import Coalesce, RowNumber
 
 from datetime import date
 from django.utils.translation import gettext_lazy as _
@@ -674,6 +676,52 @@ class Job(models.Model):
     def __str__(self):
         return f"{self.title} – {self.site}"
 
+class WorkOrderQuerySet(models.QuerySet):
+    def set_status(self, status, actor=None, source="PORTAL") -> int:
+        """
+        Zmiana statusu wielu zleceń naraz: jeden UPDATE i jeden bulk_create
+        zdarzeń w jednej transakcji (bez save() i sygnałów – cache i sumy
+        miesięczne podbijane tutaj). Zwraca liczbę zmienionych zleceń.
+        """
+        from . import analytics
+        from .cache import bump_on_commit
+
+        now = timezone.now()
+        with transaction.atomic():
+            rows = list(
+                self.exclude(status=status)
+                .select_for_update()
+                .values("pk", "status", "status_changed_at", "closed_at", "assigned_to_id")
+            )
+            if not rows:
+                return 0
+            WorkOrder.objects.filter(pk__in=[r["pk"] for r in rows]).update(
+                status=status,
+                status_changed_at=now,
+                closed_at=now if status in WorkOrder.CLOSED_STATUSES else None,
+                updated_at=now,
+            )
+            WorkOrderEvent.objects.bulk_create(
+                [
+                    WorkOrderEvent.for_transition(
+                        work_order_id=r["pk"],
+                        assigned_to_id=r["assigned_to_id"],
+                        old_status=r["status"],
+                        new_status=status,
+                        since=r["status_changed_at"],
+                        at=now,
+                        actor=actor,
+                        source=source,
+                    )
+                    for r in rows
+                ],
+                batch_size=500,
+            )
+            bump_on_commit("workorders")
+            analytics.mark_dirty(now, *(r["closed_at"] for r in rows))
+        return len(rows)
+
+
 class WorkOrder(models.Model):
     """Zlecenie: przegląd, serwis lub wyjazd w ramach robót."""
 
@@ -695,7 +743,8 @@ class WorkOrder(models.Model):
         COMPLETED = "COMPLETED", "Zakończone"
         CANCELLED = "CANCELLED", "Odwołane"
 
-
+    # wejście w te statusy ustawia closed_at, wyjście z nich je czyści
+    CLOSED_STATUSES = (Status.COMPLETED, Status.CANCELLED)
 
     class VisitType(models.TextChoices):
         FLEXIBLE = "FLEXIBLE", "W ciągu dnia"
@@ -812,6 +861,25 @@ class WorkOrder(models.Model):
     created_at = models.DateTimeField("Utworzono", auto_now_add=True)
     updated_at = models.DateTimeField("Zaktualizowano", auto_now=True)
     closed_at = models.DateTimeField("Data zamknięcia", blank=True, null=True)
+    status_changed_at = models.DateTimeField("Zmiana statusu", blank=True, null=True, editable=False)
+
+    objects = WorkOrderQuerySet.as_manager()
+
+    # kto i skąd zmienia status przy najbliższym save() – ustawiają widoki
+    # i admin; trafia do WorkOrderEvent
+    status_actor = None
+    status_source = "PORTAL"
+
+    # stan sprzed zapisu (jedno zapytanie w save()) – także dla sygnałów
+    TRACKED_FIELDS = (
+        "status",
+        "status_changed_at",
+        "closed_at",
+        "updated_at",
+        "assigned_to_id",
+        "work_type",
+        "site_id",
+    )
 
     class Meta:
         verbose_name = "Zlecenie"
@@ -856,19 +924,86 @@ class WorkOrder(models.Model):
             # sufiks daty: MM-YYYY, np. "11-2025"
             date_suffix = f"{month_str}-{year_str}"
 
-            # policz ile zleceń już ma numer z tym sufiksem
+            # następny numer po najwyższym istniejącym z tym sufiksem,
             # np. "ZL 01-11-2025", "ZL 02-11-2025" itd.
-            base_qs = WorkOrder.objects.filter(number__endswith=date_suffix)
-            count = base_qs.count() + 1
+            # (max z numerów, nie count() – po usunięciu zlecenia nie powstanie duplikat;
+            # parsowanie w Pythonie daje ten sam wynik na SQLite i PostgreSQL)
+            numbers = WorkOrder.objects.filter(
+                number__startswith="ZL ",
+                number__endswith=f"-{date_suffix}",
+            ).values_list("number", flat=True)
+            count = 0
+            for number in numbers:
+                head = number[3:-(len(date_suffix) + 1)]
+                if head.isdigit():
+                    count = max(count, int(head))
+            count += 1
 
             self.number = f"ZL {count:02d}-{date_suffix}"
 
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        with transaction.atomic():
+            previous = None
+            if not is_new and not kwargs.get("force_insert"):
+                previous = WorkOrder.objects.filter(pk=self.pk).values(*self.TRACKED_FIELDS).first()
+            self._previous = previous
+
+            old_status = previous["status"] if previous else ""
+            changed = self.status != old_status and (update_fields is None or "status" in update_fields)
+            if changed:
+                now = timezone.now()
+                since = previous["status_changed_at"] if previous else None
+                self.status_changed_at = now
+                if self.status in self.CLOSED_STATUSES:
+                    self.closed_at = now
+                elif old_status in self.CLOSED_STATUSES:
+                    self.closed_at = None
+                if update_fields is not None:
+                    kwargs["update_fields"] = {*update_fields, "status_changed_at", "closed_at", "updated_at"}
+
+            super().save(*args, **kwargs)
+
+            # każda zmiana statusu (także utworzenie zlecenia) = zdarzenie, w tej samej transakcji
+            if changed:
+                WorkOrderEvent.for_transition(
+                    work_order_id=self.pk,
+                    assigned_to_id=self.assigned_to_id,
+                    old_status=old_status,
+                    new_status=self.status,
+                    since=since,
+                    at=now,
+                    actor=self.status_actor,
+                    source=self.status_source,
+                ).save()
+
+        # autor dotyczy jednego zapisu – kolejny save() tej instancji nie może go odziedziczyć
+        self.status_actor = None
+        self.status_source = WorkOrder.status_source
+
+class WorkOrderEventQuerySet(models.QuerySet):
+    def notifications(self):
+        """Zdarzenia dla biura (zmiany statusu z PWA przez przypisanego serwisanta)."""
+        return self.filter(notify=True)
+
+    def timeline(self, work_order):
+        """Historia statusów zlecenia od najstarszej – skan po core_woe_timeline_idx."""
+        return self.filter(work_order=work_order).order_by("created_at", "id")
+
 
 class WorkOrderEvent(models.Model):
+    """
+    Dziennik zmian statusu zleceń – tylko dopisywany (poza is_read), zapisywany
+    w WorkOrder.save() / WorkOrderQuerySet.set_status() w tej samej transakcji.
+    """
+
     class Kind(models.TextChoices):
         STATUS_CHANGE = "STATUS_CHANGE", "Zmiana statusu"
 
+    class Source(models.TextChoices):
+        PORTAL = "PORTAL", "Portal"
+        PWA = "PWA", "PWA"
+        ADMIN = "ADMIN", "Panel admina"
+
     work_order = models.ForeignKey(
         "WorkOrder",
         on_delete=models.CASCADE,
@@ -896,21 +1031,60 @@ class WorkOrderEvent(models.Model):
 
     source = models.CharField(
         max_length=16,
-        default="PORTAL",
+        choices=Source.choices,
+        default=Source.PORTAL,
         verbose_name="Źródło",
     )
 
+    # czas spędzony w old_status (od poprzedniej zmiany); brak – nieznany początek
+    duration_seconds = models.PositiveBigIntegerField(
+        "Czas w poprzednim statusie (s)",
+        blank=True,
+        null=True,
+    )
+
+    notify = models.BooleanField(default=False, verbose_name="Powiadomienie dla biura")
     is_read = models.BooleanField(default=False, verbose_name="Przeczytane (biuro)")
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Utworzono")
+    created_at = models.DateTimeField(default=timezone.now, editable=False, verbose_name="Utworzono")
+
+    objects = WorkOrderEventQuerySet.as_manager()
 
     class Meta:
         ordering = ["-created_at"]
         verbose_name = "Powiadomienie zlecenia"
         verbose_name_plural = "Powiadomienia zleceń"
+        indexes = [
+            models.Index(fields=["work_order", "created_at"], name="core_woe_timeline_idx"),
+            models.Index(
+                fields=["is_read", "-created_at"],
+                condition=models.Q(notify=True),
+                name="core_woe_notify_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.work_order_id}: {self.old_status} -> {self.new_status}"
 
+    @classmethod
+    def for_transition(cls, *, work_order_id, assigned_to_id, old_status, new_status, since, at, actor=None, source="PORTAL"):
+        """
+        Niezapisane zdarzenie zmiany statusu. Powiadomienie dla biura – tylko
+        gdy status zmienia przypisany serwisant z PWA (jak wcześniej w API PWA).
+        """
+        notify = source == cls.Source.PWA and actor is not None and actor.pk == assigned_to_id
+        return cls(
+            work_order_id=work_order_id,
+            actor=actor,
+            kind=cls.Kind.STATUS_CHANGE,
+            old_status=old_status,
+            new_status=new_status,
+            source=source,
+            duration_seconds=max(int((at - since).total_seconds()), 0) if since else None,
+            notify=notify,
+            is_read=not notify,
+            created_at=at,
+        )
+
 
 class MaintenanceProtocol(models.Model):
     """Protokół konserwacji (przegląd okresowy) powiązany ze zleceniem MAINTENANCE."""
@@ -992,6 +1166,10 @@ class MaintenanceProtocol(models.Model):
         verbose_name = "Protokół konserwacji"
         verbose_name_plural = "Protokoły konserwacji"
         ordering = ["-date", "-id"]
+        indexes = [
+            # historia obiektu: najnowszy okres najpierw (MaintenanceSection.LATEST_FIRST)
+            models.Index(fields=["site", "-period_year", "-period_month", "-id"], name="core_mp_site_period_idx"),
+        ]
 
     def __str__(self):
         return self.number or f"KS (ID {self.pk})"
@@ -1149,6 +1327,20 @@ class MaintenanceProtocol(models.Model):
             "system_type", "manufacturer", "model"
         )
 
+        systems = list(systems)
+
+        # 2) Ostatnie sekcje wszystkich tych systemów na obiekcie – jedno zapytanie
+        #    (ROW_NUMBER() po systemie) + jedno na ich punkty
+        latest_by_system = {
+            section.system_id: section
+            for section in (
+                MaintenanceSection.objects
+                .filter(system__in=[s.pk for s in systems], protocol__site=self.site)
+                .latest_per_system()
+                .prefetch_related("check_items")
+            )
+        }
+
         created_sections = 0
         order_counter = 0
 
@@ -1158,19 +1350,7 @@ class MaintenanceProtocol(models.Model):
                 # np. Sieci LAN/OPTO, Inny – na razie pomijamy
                 continue
 
-            # 2) Szukamy ostatniej sekcji dla TEGO systemu
-            last_section = (
-                MaintenanceSection.objects
-                .filter(system=system, protocol__site=self.site)
-                .select_related("protocol")
-                .order_by(
-                    "-protocol__period_year",
-                    "-protocol__period_month",
-                    "-protocol__id",
-                    "-id",
-                )
-                .first()
-            )
+            last_section = latest_by_system.get(system.pk)
 
             if last_section:
                 # 2a) Kopia sekcji + wszystkich punktów
@@ -1187,8 +1367,9 @@ class MaintenanceProtocol(models.Model):
                     order=order_counter,
                 )
 
-                for item in last_section.check_items.all().order_by("order", "id"):
-                    MaintenanceCheckItem.objects.create(
+                # check_items z prefetch – już posortowane wg Meta.ordering (order, id)
+                MaintenanceCheckItem.objects.bulk_create([
+                    MaintenanceCheckItem(
                         section=new_section,
                         order=item.order,
                         label=item.label,
@@ -1196,6 +1377,8 @@ class MaintenanceProtocol(models.Model):
                         note=item.note,
                         active=item.active,
                     )
+                    for item in last_section.check_items.all()
+                ])
 
             else:
                 # 2b) Brak historii dla tego systemu – tworzymy z domyślnej checklisty
@@ -1215,12 +1398,10 @@ class MaintenanceProtocol(models.Model):
                     order=order_counter,
                 )
 
-                for idx, label in enumerate(checks, start=1):
-                    MaintenanceCheckItem.objects.create(
-                        section=new_section,
-                        order=idx,
-                        label=label,
-                    )
+                MaintenanceCheckItem.objects.bulk_create([
+                    MaintenanceCheckItem(section=new_section, order=idx, label=label)
+                    for idx, label in enumerate(checks, start=1)
+                ])
 
             created_sections += 1
             order_counter += 1
@@ -1298,9 +1479,37 @@ class MaintenanceProtocol(models.Model):
 
 
 
+class MaintenanceSectionQuerySet(models.QuerySet):
+    def latest_per_system(self):
+        """
+        Najnowsza sekcja każdego systemu (wg MaintenanceSection.LATEST_FIRST) –
+        ROW_NUMBER() OVER (PARTITION BY system_id ...), jedno zapytanie zamiast
+        osobnego ORDER BY ... LIMIT 1 dla każdego systemu.
+        """
+        return (
+            self.filter(system__isnull=False)
+            .annotate(
+                _system_rank=models.Window(
+                    RowNumber(),
+                    partition_by=[models.F("system_id")],
+                    order_by=MaintenanceSection.LATEST_FIRST,
+                )
+            )
+            .filter(_system_rank=1)
+        )
+
+
 class MaintenanceSection(models.Model):
     """Sekcja protokołu konserwacji dla konkretnego systemu na obiekcie."""
 
+    # kolejność "od najnowszego przeglądu": okres protokołu, potem kolejność utworzenia
+    LATEST_FIRST = (
+        models.F("protocol__period_year").desc(nulls_last=True),
+        models.F("protocol__period_month").desc(nulls_last=True),
+        models.F("protocol__id").desc(),
+        models.F("id").desc(),
+    )
+
     class CheckResult(models.TextChoices):
         OK = "OK", "✓ poprawny"
         FAIL = "FAIL", "X niepoprawny"
@@ -1373,10 +1582,18 @@ class MaintenanceSection(models.Model):
         default=0,
     )
 
+    updated_at = models.DateTimeField("Zaktualizowano", auto_now=True)
+
+    objects = MaintenanceSectionQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Sekcja protokołu konserwacji"
         verbose_name_plural = "Sekcje protokołu konserwacji"
         ordering = ["order", "id"]
+        indexes = [
+            # historia systemu: system -> protokoły bez sięgania do tabeli sekcji
+            models.Index(fields=["system", "protocol"], name="core_ms_system_protocol_idx"),
+        ]
 
     def __str__(self):
         return f"{self.header_name} – {self.location or 'bez lokalizacji'}"
@@ -1422,6 +1639,8 @@ class MaintenanceCheckItem(models.Model):
         help_text="Czy ten punkt jest używany dla danego obiektu.",
     )
 
+    updated_at = models.DateTimeField("Zaktualizowano", auto_now=True)
+
     class Meta:
         verbose_name = "Punkt kontrolny przeglądu"
         verbose_name_plural = "Punkty kontrolne przeglądu"
@@ -1431,9 +1650,33 @@ class MaintenanceCheckItem(models.Model):
         return self.label
    
 
+class ServiceReportQuerySet(models.QuerySet):
+    def refresh_items_totals(self) -> int:
+        """
+        Przelicza items_net_total / items_count z pozycji – jeden UPDATE
+        z podzapytaniami dla całego querysetu. Zwraca liczbę protokołów.
+        """
+        items = ServiceReportItem.objects.filter(report=models.OuterRef("pk")).order_by().values("report")
+        return self.update(
+            items_net_total=Coalesce(
+                models.Subquery(items.annotate(s=models.Sum("total_price")).values("s")),
+                Decimal("0.00"),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+            items_count=Coalesce(
+                models.Subquery(items.annotate(n=models.Count("pk")).values("n")),
+                0,
+            ),
+        )
+
+
 class ServiceReport(models.Model):
     """Protokół serwisowy do zlecenia typu SERWIS."""
 
+    # liczone z pozycji (ServiceReportQuerySet.refresh_items_totals, sygnały
+    # w core/signals.py) – zwykły save() protokołu ich nie nadpisuje
+    ITEM_TOTAL_FIELDS = ("items_net_total", "items_count")
+
     class ServiceMode(models.TextChoices):
         WARRANTY = "WARRANTY", "Gwarancja"
         CONTRACT = "CONTRACT", "Umowa"
@@ -1548,12 +1791,28 @@ class ServiceReport(models.Model):
         help_text="Widoczne tylko wewnętrznie, nie drukują się na protokole dla klienta.",
     )
 
+    items_net_total = models.DecimalField(
+        "Wartość netto pozycji",
+        max_digits=12,
+        decimal_places=2,
+        default=Decimal("0.00"),
+        editable=False,
+    )
+    items_count = models.PositiveIntegerField("Liczba pozycji", default=0, editable=False)
+
     created_at = models.DateTimeField("Utworzono", auto_now_add=True)
     updated_at = models.DateTimeField("Zaktualizowano", auto_now=True)
 
+    objects = ServiceReportQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Protokół serwisowy"
         verbose_name_plural = "Protokoły serwisowe"
+        indexes = [
+            # przychód w analityce (analytics.compute) i lista z filtrem statusu/daty
+            models.Index(fields=["status", "report_date", "items_net_total"], name="core_sr_revenue_idx"),
+            models.Index(fields=["items_net_total"], name="core_sr_net_total_idx"),
+        ]
 
     def __str__(self):
         if self.number:
@@ -1634,6 +1893,14 @@ class ServiceReport(models.Model):
             if full_name:
                 self.technicians = full_name
 
+        # sumy pozycji aktualizuje UPDATE z sygnałów pozycji; egzemplarz wczytany
+        # przed zmianą pozycji nie może ich nadpisać starymi wartościami
+        if self.pk and not kwargs.get("force_insert") and kwargs.get("update_fields") is None and not self._state.adding:
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.ITEM_TOTAL_FIELDS
+            ]
+
         super().save(*args, **kwargs)
 
 
@@ -1701,6 +1968,150 @@ class ServiceReportItem(models.Model):
         super().save(*args, **kwargs)
 
 
+# ==========================
+#  ANALITYKA – SUMY MIESIĘCZNE
+# ==========================
+
+class MonthlySummary(models.Model):
+    """
+    Zagregowane dane miesiąca per (serwisant, typ zlecenia, zarządca obiektu).
+    Wiersze miesiąca są zawsze przeliczane w całości (core/analytics.py),
+    więc klucz jest unikalny z konstrukcji – bez constraintu (NULL-e w FK).
+    """
+
+    month = models.DateField("Miesiąc")  # pierwszy dzień miesiąca
+    technician = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        verbose_name="Serwisant",
+        blank=True,
+        null=True,
+    )
+    work_type = models.CharField(
+        "Typ zlecenia",
+        max_length=20,
+        choices=WorkOrder.WorkOrderType.choices,
+    )
+    manager = models.ForeignKey(
+        Manager,
+        on_delete=models.SET_NULL,
+        related_name="+",
+        verbose_name="Zarządca",
+        blank=True,
+        null=True,
+    )
+
+    closed_count = models.PositiveIntegerField("Zakończone zlecenia", default=0)
+    waiting_parts_count = models.PositiveIntegerField("Oczekiwania na materiał", default=0)
+    waiting_parts_seconds = models.PositiveBigIntegerField("Czas oczekiwania na materiał (s)", default=0)
+    reports_count = models.PositiveIntegerField("Protokoły zatwierdzone", default=0)
+    net_total = models.DecimalField("Przychód netto", max_digits=14, decimal_places=2, default=Decimal("0.00"))
+
+    updated_at = models.DateTimeField("Przeliczono", auto_now=True)
+
+    class Meta:
+        verbose_name = "Podsumowanie miesięczne"
+        verbose_name_plural = "Podsumowania miesięczne"
+        ordering = ["-month"]
+        indexes = [
+            models.Index(fields=["month", "manager"], name="core_msum_month_mgr_idx"),
+            models.Index(fields=["month", "technician"], name="core_msum_month_tech_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.month:%m-%Y} {self.work_type}"
+
+
+class MonthlySummaryDirty(models.Model):
+    """Miesiące do przeliczenia – znaczone sygnałami przy zmianach źródeł."""
+
+    month = models.DateField("Miesiąc", primary_key=True)
+    marked_at = models.DateTimeField("Oznaczono", auto_now=True)
+
+    class Meta:
+        verbose_name = "Miesiąc do przeliczenia"
+        verbose_name_plural = "Miesiące do przeliczenia"
+
+    def __str__(self):
+        return f"{self.month:%m-%Y}"
+
+
+# ==========================
+#  ARCHIWUM ZLECEŃ (RETENCJA)
+# ==========================
+
+class ArchivedWorkOrder(models.Model):
+    """
+    Zlecenie przeniesione z tabel roboczych (core/retention.py): kolumny do
+    wyszukiwania + pełny zrzut zlecenia, protokołów i historii statusów.
+    """
+
+    original_id = models.PositiveBigIntegerField("ID zlecenia", unique=True)
+    number = models.CharField("Numer zlecenia", max_length=32, blank=True, db_index=True)
+    title = models.CharField("Tytuł", max_length=255)
+    work_type = models.CharField("Typ zlecenia", max_length=20, choices=WorkOrder.WorkOrderType.choices)
+    status = models.CharField("Status", max_length=32, choices=WorkOrder.Status.choices)
+
+    site = models.ForeignKey(
+        Site,
+        on_delete=models.SET_NULL,
+        related_name="archived_work_orders",
+        verbose_name="Obiekt",
+        blank=True,
+        null=True,
+    )
+    site_name = models.CharField("Obiekt (nazwa)", max_length=255)
+    site_city = models.CharField("Miejscowość", max_length=100, blank=True)
+    manager_name = models.CharField("Zarządca", max_length=255, blank=True)
+    assigned_to_name = models.CharField("Przypisano do", max_length=255, blank=True)
+
+    planned_date = models.DateField("Termin realizacji", blank=True, null=True)
+    created_at = models.DateTimeField("Utworzono")
+    closed_at = models.DateTimeField("Data zamknięcia", blank=True, null=True)
+
+    service_report_number = models.CharField("Nr protokołu serwisowego", max_length=50, blank=True)
+    maintenance_protocol_number = models.CharField("Nr protokołu konserwacji", max_length=50, blank=True)
+    net_total = models.DecimalField("Wartość netto", max_digits=12, decimal_places=2, default=Decimal("0.00"))
+
+    payload = models.JSONField("Zrzut danych", encoder=DjangoJSONEncoder)
+    archived_at = models.DateTimeField("Zarchiwizowano", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Zlecenie archiwalne"
+        verbose_name_plural = "Zlecenia archiwalne"
+        ordering = ["-closed_at", "-id"]
+        indexes = [
+            models.Index(fields=["closed_at"], name="core_arch_closed_idx"),
+            models.Index(fields=["site", "closed_at"], name="core_arch_site_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.number or self.original_id} {self.title}"
+
+
+class RetentionMark(models.Model):
+    """
+    Granica danych faktycznie usuniętych przez retencję (core/retention.py):
+    pierwszy miesiąc, którego źródła analityki są kompletne. Tylko rośnie.
+    """
+
+    class Kind(models.TextChoices):
+        EVENTS = "EVENTS", "Zdarzenia zleceń"
+        WORK_ORDERS = "WORK_ORDERS", "Zlecenia zarchiwizowane"
+
+    kind = models.CharField("Rodzaj", max_length=20, choices=Kind.choices, primary_key=True)
+    month = models.DateField("Pierwszy kompletny miesiąc")
+    updated_at = models.DateTimeField("Zmieniono", auto_now=True)
+
+    class Meta:
+        verbose_name = "Granica retencji"
+        verbose_name_plural = "Granice retencji"
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.month:%m-%Y}"
+
+
 # ==========================
 #  USTAWIENIA KONSERWACJI KS
 # ==========================
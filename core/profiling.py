@@ -0,0 +1,241 @@
+"""
+Profilowanie wybranych widoków na produkcji (cProfile + lista zapytań SQL).
+
+Konfiguracja w settings.PROFILING (nadpisywana w local_settings):
+- ENABLED: włącza próbkowanie (SAMPLE_RATE) – flaga superusera działa niezależnie,
+- SAMPLE_RATE: ułamek requestów profilowanych losowo (0.0–1.0),
+- ALLOW_SUPERUSER_FLAG: superuser może wymusić profil nagłówkiem X-Profile: 1
+  albo parametrem ?_profile=1,
+- VIEWS: wzorce nazw widoków (fnmatch), np. "core:api_pwa_*",
+- TOP_N: ile funkcji (wg czasu skumulowanego) zapisujemy,
+- MAX_SQL: ile zapytań SQL zapisujemy,
+- DIR / MAX_FILES: katalog na pliki JSON i limit plików (najstarsze są usuwane).
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import random
+import time
+import uuid
+from fnmatch import fnmatch
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.urls import Resolver404, resolve
+from django.utils import timezone
+
+
+DEFAULTS = {
+    "ENABLED": False,
+    "SAMPLE_RATE": 0.0,
+    "ALLOW_SUPERUSER_FLAG": True,
+    "VIEWS": [
+        "core:dashboard",
+        "core:maintenance_protocol_edit",
+        "core:api_pwa_*",
+    ],
+    "TOP_N": 40,
+    "MAX_SQL": 500,
+    "DIR": None,
+    "MAX_FILES": 200,
+}
+
+
+def get_profiling_settings() -> dict:
+    conf = dict(DEFAULTS)
+    conf.update(getattr(settings, "PROFILING", {}) or {})
+    if not conf["DIR"]:
+        conf["DIR"] = Path(settings.BASE_DIR) / "profiles"
+    return conf
+
+
+class ProfileStore:
+    """Rotacyjny magazyn profili na dysku (1 profil = 1 plik JSON)."""
+
+    def __init__(self, directory, max_files: int):
+        self.directory = Path(directory)
+        self.max_files = max_files
+
+    def _files(self):
+        if not self.directory.exists():
+            return []
+        # nazwa pliku zaczyna się od znacznika czasu -> sortowanie po nazwie = po czasie
+        return sorted(self.directory.glob("*.json"))
+
+    def save(self, record: dict) -> str:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{record['id']}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(record, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+        self.rotate()
+        return record["id"]
+
+    def rotate(self):
+        files = self._files()
+        for old in files[: max(0, len(files) - self.max_files)]:
+            try:
+                old.unlink()
+            except FileNotFoundError:
+                pass
+
+    def load(self, profile_id: str):
+        # id pochodzi z URL – nie pozwalamy wyjść poza katalog
+        if not profile_id or "/" in profile_id or "\\" in profile_id or profile_id.startswith("."):
+            return None
+        path = self.directory / f"{profile_id}.json"
+        if not path.exists():
+            return None
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def list(self, view_name: str = ""):
+        """Zwraca podsumowania profili (najnowsze pierwsze), bez statystyk i SQL."""
+        out = []
+        for path in reversed(self._files()):
+            try:
+                record = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if view_name and record.get("view_name") != view_name:
+                continue
+            record.pop("stats", None)
+            record.pop("sql", None)
+            out.append(record)
+        return out
+
+
+def get_store() -> ProfileStore:
+    conf = get_profiling_settings()
+    return ProfileStore(conf["DIR"], conf["MAX_FILES"])
+
+
+def _short_path(filename: str) -> str:
+    base = str(settings.BASE_DIR)
+    if filename.startswith(base):
+        return filename[len(base):].lstrip(os.sep)
+    marker = f"site-packages{os.sep}"
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    return filename
+
+
+def _top_stats(profiler: cProfile.Profile, top_n: int):
+    stats = pstats.Stats(profiler)
+    stats.sort_stats("cumulative")
+
+    rows = []
+    for func in stats.fcn_list[:top_n]:
+        filename, line, name = func
+        cc, nc, tt, ct, _callers = stats.stats[func]
+        rows.append({
+            "func": f"{_short_path(filename)}:{line}({name})",
+            "ncalls": nc,
+            "primitive_calls": cc,
+            "tottime_ms": round(tt * 1000, 3),
+            "cumtime_ms": round(ct * 1000, 3),
+        })
+    return rows
+
+
+class ProfilingMiddleware:
+    """
+    Owija wybrane widoki w cProfile i zapisuje wynik do ProfileStore.
+
+    Profiluje wywołanie get_response – widok wywołuje Django jak zwykle
+    (process_view/process_exception pozostałych middleware, widoki async).
+    Nazwę widoku bierzemy z resolve() przed wywołaniem, bo resolver_match
+    Django ustawia dopiero wewnątrz get_response. Powinno stać NA KOŃCU
+    listy MIDDLEWARE, żeby profil obejmował sam widok, a nie resztę łańcucha.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        conf = get_profiling_settings()
+        trigger = self._trigger(request, conf)
+        if not trigger:
+            return self.get_response(request)
+
+        view_name = self._view_name(request)
+        if not view_name or not any(fnmatch(view_name, p) for p in conf["VIEWS"]):
+            return self.get_response(request)
+
+        return self._profile(request, conf, view_name, trigger)
+
+    def _view_name(self, request) -> str:
+        try:
+            match = resolve(request.path_info, getattr(request, "urlconf", None))
+        except Resolver404:
+            return ""
+        return match.view_name
+
+    def _trigger(self, request, conf):
+        user = getattr(request, "user", None)
+        if conf["ALLOW_SUPERUSER_FLAG"] and user is not None and user.is_authenticated and user.is_superuser:
+            if request.headers.get("X-Profile") == "1" or request.GET.get("_profile") == "1":
+                return "flag"
+
+        if conf["ENABLED"] and conf["SAMPLE_RATE"] > 0 and random.random() < conf["SAMPLE_RATE"]:
+            return "sample"
+
+        return None
+
+    def _profile(self, request, conf, view_name, trigger):
+        queries = []
+        max_sql = conf["MAX_SQL"]
+        sql_total = {"count": 0, "time": 0.0}
+
+        def sql_wrapper(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                elapsed = time.perf_counter() - start
+                sql_total["count"] += 1
+                sql_total["time"] += elapsed
+                # bez parametrów – mogą zawierać dane wrażliwe (hasła, kody dostępu)
+                if len(queries) < max_sql:
+                    queries.append({"sql": sql, "time_ms": round(elapsed * 1000, 3)})
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        with connection.execute_wrapper(sql_wrapper):
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - started
+
+        now = timezone.now()
+        user = getattr(request, "user", None)
+        record = {
+            "id": f"{now:%Y%m%d%H%M%S%f}-{uuid.uuid4().hex[:8]}",
+            "created_at": now.isoformat(),
+            "view_name": view_name,
+            "path": request.get_full_path(),
+            "method": request.method,
+            "user": user.get_username() if user is not None and user.is_authenticated else "",
+            "trigger": trigger,
+            "status_code": getattr(response, "status_code", None),
+            "duration_ms": round(duration * 1000, 3),
+            "sql_count": sql_total["count"],
+            "sql_time_ms": round(sql_total["time"] * 1000, 3),
+            "stats": _top_stats(profiler, conf["TOP_N"]),
+            "sql": queries,
+        }
+
+        try:
+            get_store().save(record)
+        except OSError:
+            # profil nie może wywrócić requestu użytkownika
+            pass
+
+        return response
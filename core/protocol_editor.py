@@ -0,0 +1,215 @@
+"""
+Edycja protokołu konserwacji – wspólny backend dla portalu
+(maintenance_protocol_edit), formularza PWA (pwa_maintenanceprotocol_edit)
+i API zapisu z outboxa PWA (api_pwa_maintenanceprotocol_save).
+
+Format danych bez zmian (formsety z prefiksem "section-<pk>" + pole
+"section_<pk>_remarks"), ale:
+- punkty całego protokołu wczytujemy jednym zapytaniem,
+- walidacja jednym przebiegiem bez SELECT-a na każdy punkt (PreloadedCheckItemFormSet),
+- zapis: tylko zmienione punkty i uwagi sekcji, bulk_update w jednej transakcji.
+
+apply_patch() to wersja JSON dla PWA (api_pwa_maintenanceprotocol_patch):
+klient wysyła tylko zmienione punkty/uwagi/pola protokołu, bez formsetów –
+stała liczba zapytań niezależnie od wielkości protokołu.
+"""
+
+from django.db import transaction
+from django.forms.models import model_to_dict
+from django.utils import timezone
+
+from .cache import bump_on_commit
+from .forms import MaintenanceProtocolForm, PreloadedCheckItemFormSet
+from .models import MaintenanceCheckItem, MaintenanceSection
+
+
+class ProtocolEditor:
+    def __init__(self, protocol, data=None, sections_order=None):
+        self.protocol = protocol
+        self.data = data
+        self.form = MaintenanceProtocolForm(data, instance=protocol)
+
+        sections_qs = protocol.sections.select_related("system")
+        if sections_order:
+            sections_qs = sections_qs.order_by(*sections_order)
+        self.sections = list(sections_qs)
+
+        items_by_section = {}
+        items = MaintenanceCheckItem.objects.filter(section__protocol=protocol).order_by("order", "id")
+        for item in items:
+            items_by_section.setdefault(item.section_id, []).append(item)
+
+        self.section_formsets = []
+        for section in self.sections:
+            section_items = items_by_section.get(section.pk, [])
+            for item in section_items:
+                # bez dociągania sekcji przy item.section (sygnały cache, szablony)
+                item.section = section
+            formset = PreloadedCheckItemFormSet(
+                data,
+                items=section_items,
+                prefix=f"section-{section.pk}",
+            )
+            self.section_formsets.append({"section": section, "formset": formset})
+
+    def is_valid(self) -> bool:
+        # bez zwarcia – błędy mają się pokazać we wszystkich sekcjach naraz
+        valid = self.form.is_valid()
+        for bundle in self.section_formsets:
+            valid = bundle["formset"].is_valid() and valid
+        return valid
+
+    def section_errors(self) -> list:
+        errors = []
+        for bundle in self.section_formsets:
+            fs = bundle["formset"]
+            if any(fs.errors) or fs.non_form_errors():
+                errors.append(
+                    {"section_id": bundle["section"].pk, "errors": fs.errors, "non_form_errors": fs.non_form_errors()}
+                )
+        return errors
+
+    def changed_items(self) -> list:
+        changed = []
+        for bundle in self.section_formsets:
+            # extra=0: tylko istniejące punkty; nadmiarowe formularze z POST ignorujemy
+            for item_form in bundle["formset"].initial_forms:
+                if item_form.has_changed():
+                    changed.append(item_form.instance)
+        return changed
+
+    def changed_sections(self) -> list:
+        changed = []
+        for section in self.sections:
+            remarks = (self.data.get(f"section_{section.pk}_remarks") or "").strip()
+            if remarks != (section.section_remarks or ""):
+                section.section_remarks = remarks
+                changed.append(section)
+        return changed
+
+    def save(self):
+        """Zapis po is_valid(): protokół + zmienione punkty/uwagi (bulk_update)."""
+        items = self.changed_items()
+        sections = self.changed_sections()
+
+        # bulk_update pomija auto_now – updated_at wersjonuje cache fragmentów
+        now = timezone.now()
+        for obj in items + sections:
+            obj.updated_at = now
+
+        with transaction.atomic():
+            protocol = self.form.save()
+            if items:
+                MaintenanceCheckItem.objects.bulk_update(items, ["result", "note", "updated_at"])
+            if sections:
+                MaintenanceSection.objects.bulk_update(sections, ["section_remarks", "updated_at"])
+            # bulk_update nie wysyła post_save
+            bump_on_commit(f"maintenanceprotocol:{protocol.pk}")
+
+        return protocol
+
+
+CHECK_RESULTS = frozenset(MaintenanceSection.CheckResult.values)
+
+
+def _patch_rows(rows, allowed_keys, errors, label):
+    """[{id, ...}] -> {id: {pole: wartość}} albo błąd w errors."""
+    if not isinstance(rows, list):
+        errors[label] = ["Oczekiwano listy."]
+        return {}
+
+    out = {}
+    for row in rows:
+        if not isinstance(row, dict) or isinstance(row.get("id"), bool) or not isinstance(row.get("id"), int):
+            errors.setdefault(label, []).append(f"Niepoprawny wpis: {row!r}")
+            continue
+        out[row["id"]] = {k: v for k, v in row.items() if k in allowed_keys}
+    return out
+
+
+def apply_patch(protocol, payload: dict):
+    """
+    payload = {
+        "protocol": {"date": ..., "status": ..., ...},        # tylko zmienione pola
+        "items": [{"id": 5, "result": "OK", "note": "..."}],  # result/note opcjonalne
+        "sections": [{"id": 3, "remarks": "..."}],
+    }
+    Zwraca (protokół, None) albo (None, błędy) – wtedy nic nie zapisano.
+    """
+    errors = {}
+    item_patch = _patch_rows(payload.get("items") or [], ("result", "note"), errors, "items")
+    section_patch = _patch_rows(payload.get("sections") or [], ("remarks",), errors, "sections")
+
+    protocol_fields = payload.get("protocol") or {}
+    form = None
+    if not isinstance(protocol_fields, dict):
+        errors["protocol"] = ["Oczekiwano obiektu."]
+    elif protocol_fields:
+        allowed = list(MaintenanceProtocolForm.base_fields)
+        data = model_to_dict(protocol, fields=allowed)
+        data.update({k: v for k, v in protocol_fields.items() if k in allowed})
+        form = MaintenanceProtocolForm(data=data, instance=protocol)
+        if not form.is_valid():
+            errors["protocol"] = form.errors
+
+    # jedno zapytanie na tabelę, tylko wiersze z tego protokołu
+    items = {
+        obj.pk: obj
+        for obj in MaintenanceCheckItem.objects.filter(section__protocol=protocol, pk__in=item_patch)
+    } if item_patch else {}
+    sections = {
+        obj.pk: obj
+        for obj in MaintenanceSection.objects.filter(protocol=protocol, pk__in=section_patch)
+    } if section_patch else {}
+
+    now = timezone.now()
+    changed_items = []
+    for pk, changes in item_patch.items():
+        obj = items.get(pk)
+        if obj is None:
+            errors.setdefault("items", []).append(f"Punkt {pk} nie należy do protokołu.")
+            continue
+        result = changes.get("result", obj.result)
+        note = changes.get("note", obj.note)
+        if result not in CHECK_RESULTS:
+            errors.setdefault("items", []).append(f"Punkt {pk}: niepoprawny wynik {result!r}.")
+            continue
+        if not isinstance(note, str):
+            errors.setdefault("items", []).append(f"Punkt {pk}: notatka musi być tekstem.")
+            continue
+        note = note.strip()
+        if (result, note) != (obj.result, obj.note):
+            obj.result, obj.note, obj.updated_at = result, note, now
+            changed_items.append(obj)
+
+    changed_sections = []
+    for pk, changes in section_patch.items():
+        obj = sections.get(pk)
+        if obj is None:
+            errors.setdefault("sections", []).append(f"Sekcja {pk} nie należy do protokołu.")
+            continue
+        remarks = changes.get("remarks", obj.section_remarks)
+        if not isinstance(remarks, str):
+            errors.setdefault("sections", []).append(f"Sekcja {pk}: uwagi muszą być tekstem.")
+            continue
+        remarks = remarks.strip()
+        if remarks != (obj.section_remarks or ""):
+            obj.section_remarks, obj.updated_at = remarks, now
+            changed_sections.append(obj)
+
+    if errors:
+        return None, errors
+
+    with transaction.atomic():
+        if form is not None:
+            protocol = form.save()
+        if changed_items:
+            MaintenanceCheckItem.objects.bulk_update(changed_items, ["result", "note", "updated_at"])
+        if changed_sections:
+            MaintenanceSection.objects.bulk_update(changed_sections, ["section_remarks", "updated_at"])
+        if form is None and (changed_items or changed_sections):
+            # updated_at protokołu = znacznik zmian dla PWA / warunkowych stron
+            protocol.save(update_fields=["updated_at"])
+        bump_on_commit(f"maintenanceprotocol:{protocol.pk}")
+
+    return protocol, None
@@ -0,0 +1,106 @@
+"""
+Lista plików statycznych do precache w Service Workerze PWA.
+
+Źródłem jest manifest WhiteNoise (CompressedManifestStaticFilesStorage,
+staticfiles.json po collectstatic): każdy plik trafia do SW z adresem
+haszowanym (np. /static/pwa/pwa.3f2a1b9c0d4e.js), więc telefon pobiera
+ponownie tylko pliki, których treść się zmieniła. Wersja SW to skrót
+z listy plików i szablonu SW – zmienia się tylko przy realnej zmianie.
+
+Bez manifestu (DEBUG, brak collectstatic) rewizję liczymy z treści pliku
+znalezionego przez finders.
+"""
+
+import hashlib
+import json
+from fnmatch import fnmatch
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.template.loader import get_template
+
+
+DEFAULT_PWA_PRECACHE = (
+    "css/main.css",
+    "pwa/*.js",
+)
+
+# strony HTML PWA dogrywane przy instalacji SW (dalej network-first)
+PWA_SHELL_PAGES = (
+    "/pwa/",
+    "/pwa/zlecenia/",
+    "/pwa/obiekty/",
+)
+
+SW_TEMPLATE = "pwa/sw.js"
+
+
+def _patterns():
+    return tuple(getattr(settings, "PWA_PRECACHE", DEFAULT_PWA_PRECACHE))
+
+
+def _manifest_names() -> dict:
+    """{nazwa: nazwa_haszowana} z manifestu albo {} (brak manifestu / inny storage)."""
+    return dict(getattr(staticfiles_storage, "hashed_files", {}) or {})
+
+
+def _finder_names():
+    names = set()
+    for finder in finders.get_finders():
+        for path, _storage in finder.list(["CVS", ".*", "*~"]):
+            names.add(path.replace("\\", "/"))
+    return names
+
+
+def _file_revision(name: str) -> str:
+    path = finders.find(name)
+    if not path:
+        return ""
+    with open(path, "rb") as fh:
+        return hashlib.md5(fh.read(), usedforsecurity=False).hexdigest()[:12]
+
+
+def precache_entries():
+    """
+    [{"url": "/static/pwa/pwa.js", "cache_url": "/static/pwa/pwa.<hash>.js"}, ...]
+
+    url – adres, pod którym strony odwołują się do pliku (np. import w <script type=module>),
+    cache_url – adres wersji, którą SW trzyma w cache.
+    """
+    patterns = _patterns()
+    hashed = _manifest_names()
+    names = sorted(hashed) if hashed else sorted(_finder_names())
+
+    entries = []
+    for name in names:
+        if not any(fnmatch(name, p) for p in patterns):
+            continue
+
+        url = settings.STATIC_URL + name
+        if hashed:
+            cache_url = settings.STATIC_URL + hashed[name]
+        else:
+            revision = _file_revision(name)
+            cache_url = f"{url}?v={revision}" if revision else url
+        entries.append({"url": url, "cache_url": cache_url})
+    return entries
+
+
+def _template_source() -> str:
+    template = get_template(SW_TEMPLATE)
+    return getattr(getattr(template, "template", None), "source", "")
+
+
+def service_worker_context() -> dict:
+    entries = precache_entries()
+    digest = hashlib.sha1()
+    digest.update(json.dumps(entries, sort_keys=True).encode())
+    digest.update(json.dumps(PWA_SHELL_PAGES).encode())
+    digest.update(_template_source().encode())
+
+    return {
+        "version": digest.hexdigest()[:12],
+        "precache_json": json.dumps(entries),
+        "shell_pages_json": json.dumps(list(PWA_SHELL_PAGES)),
+    }
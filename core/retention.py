@@ -0,0 +1,417 @@
+"""
+Retencja danych: tabele robocze (zlecenia, zdarzenia, protokoły) trzymają
+tylko dane "gorące", reszta idzie do archiwum albo znika.
+
+- Zdarzenia zleceń starsze niż EVENTS_MAX_AGE_DAYS – usuwane partiami.
+  Ich treść analityczna zostaje w MonthlySummary (czasy oczekiwania itd.).
+- Zlecenia zamknięte (COMPLETED/CANCELLED) przed ARCHIVE_AFTER_YEARS –
+  zrzut do ArchivedWorkOrder (zlecenie, protokół serwisowy z pozycjami,
+  protokół konserwacji z sekcjami i punktami, historia statusów), potem
+  usunięcie z tabel roboczych. Granica wyrównana do początku miesiąca.
+- VACUUM/ANALYZE z rozmiarem bazy przed i po.
+
+Każda partia to osobna krótka transakcja (na SQLite nie blokujemy zapisów
+z PWA na czas całej operacji): usunięcie to DELETE po id, bez pobierania
+wierszy i bez sygnałów per wiersz (sumy pozycji, znaczniki analityki, cache).
+W tej samej transakcji przesuwa się RetentionMark – miesiąc po ostatniej
+usuniętej dacie źródłowej. Miesiące sprzed znacznika są w sumach analityki
+zamrożone (frozen_before) – nie da się ich już przeliczyć ze źródeł. Sam
+próg z settings niczego nie zamraża, dopóki retencja czegoś nie usunie.
+Uruchamiane komendą apply_retention (cron, np. raz w tygodniu w nocy).
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import Max, Prefetch
+from django.db.models.deletion import get_candidate_relations_to_delete
+from django.utils import timezone
+from django.utils.formats import date_format
+
+from .cache import bump_on_commit
+from .models import (
+    ArchivedWorkOrder,
+    MaintenanceProtocol,
+    MaintenanceSection,
+    RetentionMark,
+    ServiceReport,
+    ServiceReportItem,
+    WorkOrder,
+    WorkOrderEvent,
+)
+
+
+DEFAULT_RETENTION = {
+    # None = nie usuwaj zdarzeń / nie archiwizuj zleceń
+    "EVENTS_MAX_AGE_DAYS": 730,
+    "ARCHIVE_AFTER_YEARS": 5,
+    "EVENT_BATCH_SIZE": 2000,
+    "ARCHIVE_BATCH_SIZE": 100,
+    # przerwa (s) między partiami – miejsce na zapisy z PWA
+    "SLEEP": 0.05,
+}
+
+
+def get_retention_settings() -> dict:
+    conf = dict(DEFAULT_RETENTION)
+    conf.update(getattr(settings, "CORE_RETENTION", {}) or {})
+    return conf
+
+
+# --- Granice ---
+
+def events_cutoff(conf=None):
+    conf = conf or get_retention_settings()
+    days = conf["EVENTS_MAX_AGE_DAYS"]
+    return timezone.now() - timedelta(days=days) if days else None
+
+
+def archive_cutoff(conf=None):
+    """Początek miesiąca (czas lokalny) sprzed ARCHIVE_AFTER_YEARS lat."""
+    from .analytics import add_months, month_start
+
+    conf = conf or get_retention_settings()
+    years = conf["ARCHIVE_AFTER_YEARS"]
+    if not years:
+        return None
+    month = add_months(month_start(timezone.localdate()), -12 * years)
+    return timezone.make_aware(datetime.combine(month, datetime.min.time()))
+
+
+def frozen_before():
+    """
+    Pierwszy miesiąc, który da się jeszcze przeliczyć ze źródeł; wcześniejsze
+    sumy miesięczne zostają takie, jakie były (None – retencja nic nie usunęła).
+    """
+    return RetentionMark.objects.aggregate(month=Max("month"))["month"]
+
+
+def _advance_mark(kind: str, last) -> None:
+    """Przesuwa znacznik za miesiąc daty last (tylko do przodu; w transakcji partii)."""
+    from .analytics import add_months, month_start
+
+    month = add_months(month_start(last), 1)
+    if not RetentionMark.objects.filter(kind=kind, month__lt=month).update(month=month, updated_at=timezone.now()):
+        RetentionMark.objects.get_or_create(kind=kind, defaults={"month": month})
+
+
+def _fast_delete(queryset) -> int:
+    """
+    DELETE bez pobierania wierszy i bez sygnałów, z kaskadą po relacjach
+    CASCADE od liści w górę. Wołający sam odpowiada za znacznik retencji
+    i cache. Relacje inne niż CASCADE – zwykły delete() (Collector).
+    """
+    for rel in get_candidate_relations_to_delete(queryset.model._meta):
+        if rel.on_delete is not models.CASCADE:
+            return queryset.delete()[0]
+        _fast_delete(rel.related_model._base_manager.filter(**{f"{rel.field.name}__in": queryset}))
+    return queryset._raw_delete(queryset.db)
+
+
+# --- Zdarzenia ---
+
+def prune_events(cutoff, batch_size: int, sleep: float = 0, dry_run: bool = False) -> int:
+    """Usuwa zdarzenia sprzed cutoff partiami. Zwraca liczbę (do usunięcia przy dry_run)."""
+    old = WorkOrderEvent.objects.filter(created_at__lt=cutoff)
+    if dry_run:
+        return old.count()
+
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            batch = list(old.order_by("created_at", "id").values_list("pk", "created_at")[:batch_size])
+            if not batch:
+                break
+            n = _fast_delete(WorkOrderEvent.objects.filter(pk__in=[pk for pk, _ in batch]))
+            # partia posortowana – ostatnie zdarzenie jest najpóźniejsze
+            _advance_mark(RetentionMark.Kind.EVENTS, batch[-1][1])
+        deleted += n
+        if len(batch) < batch_size:
+            break
+        time.sleep(sleep)
+    return deleted
+
+
+# --- Archiwum zleceń ---
+
+def _row(obj, exclude=()) -> dict:
+    """Wszystkie kolumny obiektu (FK jako *_id) – do JSON przez DjangoJSONEncoder."""
+    return {
+        f.attname: f.value_from_object(obj)
+        for f in obj._meta.concrete_fields
+        if f.attname not in exclude
+    }
+
+
+def _person(user):
+    if user is None:
+        return ""
+    return user.get_full_name() or user.username
+
+
+def archive_queryset(cutoff):
+    return WorkOrder.objects.filter(
+        status__in=WorkOrder.CLOSED_STATUSES,
+        closed_at__lt=cutoff,
+    )
+
+
+def snapshot(order) -> ArchivedWorkOrder:
+    """Niezapisany wiersz archiwum dla zlecenia z prefetchem (archive_work_orders)."""
+    site = order.site
+    report = getattr(order, "service_report", None)
+    protocol = getattr(order, "maintenance_protocol", None)
+
+    payload = {
+        "work_order": {
+            **_row(order),
+            "systems": [str(system) for system in order.systems.all()],
+        },
+        "events": [
+            {**_row(ev, exclude=("work_order_id",)), "actor": _person(ev.actor)}
+            for ev in order.events.all()
+        ],
+        "service_report": None,
+        "maintenance_protocol": None,
+    }
+    if report is not None:
+        payload["service_report"] = {
+            **_row(report),
+            "items": [_row(item, exclude=("report_id",)) for item in report.items.all()],
+        }
+    if protocol is not None:
+        payload["maintenance_protocol"] = {
+            **_row(protocol),
+            "sections": [
+                {
+                    **_row(section, exclude=("protocol_id",)),
+                    "items": [_row(item, exclude=("section_id",)) for item in section.check_items.all()],
+                }
+                for section in protocol.sections.all()
+            ],
+        }
+
+    return ArchivedWorkOrder(
+        original_id=order.pk,
+        number=order.number or "",
+        title=order.title,
+        work_type=order.work_type,
+        status=order.status,
+        site_id=order.site_id,
+        site_name=site.name,
+        site_city=site.city,
+        manager_name=site.manager.short_name if site.manager else "",
+        assigned_to_name=_person(order.assigned_to),
+        planned_date=order.planned_date,
+        created_at=order.created_at,
+        closed_at=order.closed_at,
+        service_report_number=(report.number or "") if report else "",
+        maintenance_protocol_number=(protocol.number or "") if protocol else "",
+        net_total=report.items_net_total if report else 0,
+        payload=payload,
+    )
+
+
+def archive_work_orders(cutoff, batch_size: int, sleep: float = 0, dry_run: bool = False) -> int:
+    """
+    Przenosi zamknięte zlecenia sprzed cutoff do ArchivedWorkOrder partiami:
+    zrzut + usunięcie (kaskada: protokoły, pozycje, sekcje, punkty, zdarzenia)
+    + znacznik retencji w jednej transakcji na partię. Zwraca liczbę zleceń.
+    """
+    from .analytics import month_start
+
+    candidates = archive_queryset(cutoff)
+    if dry_run:
+        return candidates.count()
+
+    archived = 0
+    while True:
+        with transaction.atomic():
+            pks = list(candidates.order_by("closed_at", "id").values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                break
+            orders = (
+                WorkOrder.objects.filter(pk__in=pks)
+                .select_related("site__manager", "assigned_to", "service_report", "maintenance_protocol")
+                .prefetch_related(
+                    "systems",
+                    Prefetch("events", queryset=WorkOrderEvent.objects.select_related("actor").order_by("created_at", "id")),
+                    Prefetch("service_report__items", queryset=ServiceReportItem.objects.order_by("order_index", "id")),
+                    Prefetch(
+                        "maintenance_protocol__sections",
+                        queryset=MaintenanceSection.objects.order_by("order", "id").prefetch_related("check_items"),
+                    ),
+                )
+            )
+            ArchivedWorkOrder.objects.bulk_create([snapshot(order) for order in orders])
+            # ostatni miesiąc, w którym analityka liczyła te zlecenia
+            last = max(
+                month_start(value)
+                for order in orders
+                for value in (
+                    order.closed_at,
+                    getattr(getattr(order, "service_report", None), "report_date", None),
+                    *(ev.created_at for ev in order.events.all()),
+                )
+                if value is not None
+            )
+            _fast_delete(WorkOrder.objects.filter(pk__in=pks))
+            _advance_mark(RetentionMark.Kind.WORK_ORDERS, last)
+            bump_on_commit("workorders")
+        archived += len(pks)
+        if len(pks) < batch_size:
+            break
+        time.sleep(sleep)
+    return archived
+
+
+# --- VACUUM / ANALYZE ---
+
+@dataclass
+class DatabaseSize:
+    total: int                 # bajty pliku/bazy
+    free: int = 0              # wolne strony do odzyskania (SQLite)
+    files: dict = field(default_factory=dict)
+
+
+def database_size() -> DatabaseSize:
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA page_size")
+            page_size = cursor.fetchone()[0]
+            cursor.execute("PRAGMA page_count")
+            page_count = cursor.fetchone()[0]
+            cursor.execute("PRAGMA freelist_count")
+            free_pages = cursor.fetchone()[0]
+        name = str(connection.settings_dict["NAME"])
+        files = {
+            os.path.basename(path): os.path.getsize(path)
+            for path in (name, f"{name}-wal")
+            if os.path.exists(path)
+        }
+        return DatabaseSize(total=page_size * page_count, free=page_size * free_pages, files=files)
+
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_database_size(current_database())")
+            return DatabaseSize(total=cursor.fetchone()[0])
+
+    return DatabaseSize(total=0)
+
+
+def vacuum() -> tuple:
+    """VACUUM + ANALYZE (poza transakcją). Zwraca (rozmiar przed, rozmiar po)."""
+    before = database_size()
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("VACUUM")
+            cursor.execute("ANALYZE")
+            # WAL po VACUUM ma rozmiar całej bazy – oddajemy miejsce od razu
+            cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        elif connection.vendor == "postgresql":
+            cursor.execute("VACUUM (ANALYZE)")
+    return before, database_size()
+
+
+# --- Wyszukiwarka archiwum ---
+
+def describe(model, row: dict, exclude=()) -> list:
+    """
+    [(etykieta, tekst)] dla kolumn zrzutu wg bieżącego modelu: etykiety
+    choices, daty sformatowane; kolumn usuniętych z modelu nie pokazujemy.
+    """
+    out = []
+    for f in model._meta.concrete_fields:
+        if f.attname not in row or f.attname in exclude or f.is_relation or f.primary_key:
+            continue
+        value = row[f.attname]
+        if value in (None, ""):
+            continue
+        if f.choices:
+            value = dict(f.flatchoices).get(value, value)
+        else:
+            try:
+                value = f.to_python(value)
+            except Exception:
+                pass
+        if isinstance(value, bool):
+            value = "tak" if value else "nie"
+        elif isinstance(value, datetime):
+            value = date_format(timezone.localtime(value) if timezone.is_aware(value) else value, "d.m.Y H:i")
+        elif isinstance(value, date):
+            value = date_format(value, "d.m.Y")
+        out.append((f.verbose_name, value))
+    return out
+
+
+def archive_detail(archived: ArchivedWorkOrder) -> dict:
+    """Dane szablonu szczegółów zlecenia archiwalnego."""
+    payload = archived.payload
+    status_labels = dict(WorkOrder.Status.choices)
+
+    def parse(model, name, value):
+        return model._meta.get_field(name).to_python(value) if value else value
+
+    events = [
+        {
+            "created_at": parse(WorkOrderEvent, "created_at", ev.get("created_at")),
+            "old_label": status_labels.get(ev.get("old_status"), ev.get("old_status")),
+            "new_label": status_labels.get(ev.get("new_status"), ev.get("new_status")),
+            "actor": ev.get("actor", ""),
+            "duration_seconds": ev.get("duration_seconds"),
+        }
+        for ev in payload.get("events", [])
+    ]
+
+    report = payload.get("service_report")
+    if report:
+        report = {
+            "fields": describe(ServiceReport, report, exclude=("items_count", "items_net_total")),
+            "items": [
+                {
+                    "description": item.get("description", ""),
+                    "quantity": parse(ServiceReportItem, "quantity", item.get("quantity")),
+                    "unit": dict(ServiceReportItem.Unit.choices).get(item.get("unit"), item.get("unit")),
+                    "unit_price": parse(ServiceReportItem, "unit_price", item.get("unit_price")),
+                    "total_price": parse(ServiceReportItem, "total_price", item.get("total_price")),
+                }
+                for item in report.get("items", [])
+            ],
+        }
+
+    protocol = payload.get("maintenance_protocol")
+    if protocol:
+        check_results = dict(MaintenanceSection.CheckResult.choices)
+        protocol = {
+            "fields": describe(MaintenanceProtocol, protocol),
+            "sections": [
+                {
+                    "header": section.get("header_name") or section.get("system_type", ""),
+                    "result": check_results.get(section.get("section_result"), section.get("section_result")),
+                    "remarks": section.get("section_remarks", ""),
+                    "items": [
+                        {
+                            "label": item.get("label", ""),
+                            "result": check_results.get(item.get("result"), item.get("result")),
+                            "note": item.get("note", ""),
+                        }
+                        for item in section.get("items", [])
+                        if item.get("active", True)
+                    ],
+                }
+                for section in protocol.get("sections", [])
+            ],
+        }
+
+    work_order = payload.get("work_order", {})
+    return {
+        "order_fields": describe(WorkOrder, work_order, exclude=("number", "title", "status_changed_at")),
+        "systems": work_order.get("systems", []),
+        "events": events,
+        "report": report,
+        "protocol": protocol,
+    }
@@ -0,0 +1,174 @@
+"""
+Sygnały core – podłączane jawnie w CoreConfig.ready.
+
+Sumy pozycji na ServiceReport (items_net_total, items_count) – przeliczane
+jednym UPDATE przy każdym zapisie/usunięciu pozycji (także inline w adminie).
+Zapis wielu pozycji naraz (ServiceReportItemFormSet w service_report_edit)
+idzie w deferred_report_totals(): sygnały tylko zbierają protokoły, sumy
+i miesiące analityki liczone raz na końcu, w tej samej transakcji. Zmiany
+z pominięciem sygnałów (QuerySet.update, surowy SQL) – komenda
+refresh_service_report_totals.
+
+Sumy miesięczne analityki (core/analytics.py) – sygnały tylko znaczą miesiące
+do przeliczenia (MonthlySummaryDirty), samo liczenie robi refresh_dirty().
+Zmiany z pominięciem sygnałów – refresh_monthly_summaries --rebuild.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# id protokołów, których pozycje zmieniono w bloku deferred_report_totals()
+_deferred_reports: ContextVar = ContextVar("core_deferred_report_totals", default=None)
+
+
+@contextmanager
+def deferred_report_totals():
+    """
+    Blok zapisujący wiele pozycji protokołów: sumy pozycji i miesiące
+    analityki przeliczane raz na protokół po wyjściu z bloku, nie przy każdej
+    pozycji. Przy wyjątku nic nie przeliczamy (transakcja i tak się wycofa).
+    """
+    from . import analytics
+    from .models import ServiceReport
+
+    reports = set()
+    token = _deferred_reports.set(reports)
+    try:
+        yield reports
+    finally:
+        _deferred_reports.reset(token)
+    if not reports:
+        return
+    changed = ServiceReport.objects.filter(pk__in=reports)
+    changed.refresh_items_totals()
+    analytics.mark_dirty(
+        *changed.filter(status=ServiceReport.Status.FINAL).values_list("report_date", flat=True)
+    )
+
+
+def refresh_report_totals(sender, instance, **kwargs) -> None:
+    from .models import ServiceReport
+
+    if kwargs.get("raw"):
+        # loaddata – sumy przychodzą razem z protokołem
+        return
+    deferred = _deferred_reports.get()
+    if deferred is not None:
+        deferred.add(instance.report_id)
+        return
+    ServiceReport.objects.filter(pk=instance.report_id).refresh_items_totals()
+
+
+def connect_service_report_totals() -> None:
+    from django.db.models.signals import post_delete, post_save
+
+    from .models import ServiceReportItem
+
+    post_save.connect(refresh_report_totals, sender=ServiceReportItem, dispatch_uid="core_sr_totals_save")
+    post_delete.connect(refresh_report_totals, sender=ServiceReportItem, dispatch_uid="core_sr_totals_delete")
+
+
+# --- Sumy miesięczne (analityka) ---
+
+# zmiana któregoś z tych pól przenosi całą historię zlecenia pod inny klucz
+SUMMARY_KEY_FIELDS = ("assigned_to_id", "work_type", "site_id")
+
+
+def mark_work_order_months(sender, instance, raw=False, **kwargs) -> None:
+    from . import analytics
+    from .models import WorkOrder
+
+    if raw:
+        return
+    # stan sprzed zapisu odczytany w WorkOrder.save()
+    old = getattr(instance, "_previous", None)
+    months = []
+    if instance.status == WorkOrder.Status.COMPLETED:
+        months.append(instance.closed_at)
+    if old and old["status"] == WorkOrder.Status.COMPLETED:
+        months.append(old["closed_at"])
+    if old and any(old[f] != getattr(instance, f) for f in SUMMARY_KEY_FIELDS):
+        analytics.mark_work_orders_dirty(WorkOrder.objects.filter(pk=instance.pk))
+    analytics.mark_dirty(*months)
+
+
+def mark_deleted_work_order_months(sender, instance, **kwargs) -> None:
+    from . import analytics
+
+    analytics.mark_dirty(instance.closed_at, instance.updated_at)
+
+
+def mark_event_month(sender, instance, raw=False, **kwargs) -> None:
+    from . import analytics
+
+    if not raw:
+        analytics.mark_dirty(instance.created_at)
+
+
+def remember_report_date(sender, instance, raw=False, **kwargs) -> None:
+    from .models import ServiceReport
+
+    instance._summary_report_date = None
+    if not raw and instance.pk is not None:
+        instance._summary_report_date = (
+            ServiceReport.objects.filter(pk=instance.pk).values_list("report_date", flat=True).first()
+        )
+
+
+def mark_report_months(sender, instance, raw=False, **kwargs) -> None:
+    from . import analytics
+
+    if not raw:
+        analytics.mark_dirty(instance.report_date, getattr(instance, "_summary_report_date", None))
+
+
+def mark_report_item_month(sender, instance, raw=False, **kwargs) -> None:
+    from . import analytics
+    from .models import ServiceReport
+
+    if raw:
+        return
+    deferred = _deferred_reports.get()
+    if deferred is not None:
+        # miesiąc zaznaczy deferred_report_totals() na końcu bloku
+        deferred.add(instance.report_id)
+        return
+    report_date = (
+        ServiceReport.objects.filter(pk=instance.report_id, status=ServiceReport.Status.FINAL)
+        .values_list("report_date", flat=True)
+        .first()
+    )
+    analytics.mark_dirty(report_date)
+
+
+def mark_site_months(sender, instance, raw=False, **kwargs) -> None:
+    from . import analytics
+    from .models import Site, WorkOrder
+
+    if raw or instance.pk is None:
+        return
+    old_manager = Site.objects.filter(pk=instance.pk).values_list("manager_id", flat=True).first()
+    if old_manager != instance.manager_id:
+        analytics.mark_work_orders_dirty(WorkOrder.objects.filter(site_id=instance.pk))
+
+
+def connect_monthly_summaries() -> None:
+    from django.db.models.signals import post_delete, post_save, pre_save
+
+    from .models import ServiceReport, ServiceReportItem, Site, WorkOrder, WorkOrderEvent
+
+    post_save.connect(mark_work_order_months, sender=WorkOrder, dispatch_uid="core_msum_wo_save")
+    post_delete.connect(mark_deleted_work_order_months, sender=WorkOrder, dispatch_uid="core_msum_wo_delete")
+
+    post_save.connect(mark_event_month, sender=WorkOrderEvent, dispatch_uid="core_msum_event_save")
+    post_delete.connect(mark_event_month, sender=WorkOrderEvent, dispatch_uid="core_msum_event_delete")
+
+    pre_save.connect(remember_report_date, sender=ServiceReport, dispatch_uid="core_msum_sr_pre")
+    post_save.connect(mark_report_months, sender=ServiceReport, dispatch_uid="core_msum_sr_save")
+    post_delete.connect(mark_report_months, sender=ServiceReport, dispatch_uid="core_msum_sr_delete")
+
+    post_save.connect(mark_report_item_month, sender=ServiceReportItem, dispatch_uid="core_msum_item_save")
+    post_delete.connect(mark_report_item_month, sender=ServiceReportItem, dispatch_uid="core_msum_item_delete")
+
+    # zmiana zarządcy obiektu przenosi historię wszystkich jego zleceń
+    pre_save.connect(mark_site_months, sender=Site, dispatch_uid="core_msum_site_pre")
@@ -0,0 +1,93 @@
+"""
+Strumieniowe odpowiedzi JSON dla dużych zrzutów (PWA, eksporty).
+
+Zamiast budować całą listę słowników i jeden JsonResponse, kodujemy wiersz
+po wierszu i wysyłamy paczkami przez StreamingHttpResponse. Źródłem wierszy
+powinny być .values(...).iterator(chunk_size=...) – wtedy w pamięci jest
+naraz tylko jedna paczka z bazy i jeden bufor wyjściowy.
+
+    return streaming_json_response({
+        "server_time": timezone.now().isoformat(),
+        "sites": JsonArray(site_rows()),
+    })
+"""
+
+import json
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+
+# ile bajtów zbieramy przed wysłaniem paczki (mniej = szybszy pierwszy bajt, więcej wywołań write)
+DEFAULT_FLUSH_BYTES = 64 * 1024
+
+
+class JsonArray:
+    """Znacznik: wartość klucza to iterowalne źródło elementów tablicy JSON."""
+
+    def __init__(self, iterable):
+        self.iterable = iterable
+
+
+def chunked(iterable, size: int):
+    """Dzieli iterator na listy po `size` elementów (ostatnia może być krótsza)."""
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_json_object(fields: dict, encoder=DjangoJSONEncoder, flush_bytes: int = DEFAULT_FLUSH_BYTES):
+    """Generator bajtów obiektu JSON; wartości JsonArray są kodowane element po elemencie."""
+    enc = encoder(ensure_ascii=False, separators=(",", ":"))
+    buf = []
+    size = 0
+
+    def push(piece):
+        nonlocal size
+        buf.append(piece)
+        size += len(piece)
+
+    def flush():
+        nonlocal buf, size
+        data = "".join(buf).encode("utf-8")
+        buf = []
+        size = 0
+        return data
+
+    push("{")
+    for i, (key, value) in enumerate(fields.items()):
+        if i:
+            push(",")
+        push(json.dumps(str(key), ensure_ascii=False))
+        push(":")
+
+        if not isinstance(value, JsonArray):
+            push(enc.encode(value))
+            continue
+
+        push("[")
+        for j, item in enumerate(value.iterable):
+            if j:
+                push(",")
+            push(enc.encode(item))
+            if size >= flush_bytes:
+                yield flush()
+        push("]")
+
+    push("}")
+    yield flush()
+
+
+def streaming_json_response(fields: dict, *, status: int = 200, encoder=DjangoJSONEncoder) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(
+        iter_json_object(fields, encoder=encoder),
+        content_type="application/json",
+        status=status,
+    )
+    # nginx domyślnie buforuje całą odpowiedź – wtedy strumieniowanie nic by nie dało
+    response["X-Accel-Buffering"] = "no"
+    return response
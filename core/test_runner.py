@@ -0,0 +1,94 @@
+"""
+Runner testów (settings.TEST_RUNNER).
+
+Backend bazy wybierany jawnie: --backend sqlite|postgres, domyślnie ze zmiennej
+ALLSEC_TEST_BACKEND, a bez niej SQLite. Przy postgres testy idą na jednorazowej
+bazie test_<NAME> na serwerze z settings.TEST_POSTGRES (wymaga psycopg).
+
+Na czas testów: zwykły storage plików statycznych (testy nie robią collectstatic,
+a bez manifestu {% static %} rzuca ValueError) i cache w pamięci (świeża baza
+testowa + cache plikowy z poprzedniego uruchomienia = stare dane).
+"""
+
+import os
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+BACKENDS = ("sqlite", "postgres")
+
+
+def _postgres_test_database(conf) -> dict:
+    return {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": conf["NAME"],
+        "USER": conf.get("USER", ""),
+        "PASSWORD": conf.get("PASSWORD", ""),
+        "HOST": conf.get("HOST", ""),
+        "PORT": conf.get("PORT", ""),
+        "OPTIONS": dict(conf.get("OPTIONS", {})),
+    }
+
+
+class AllsecTestRunner(DiscoverRunner):
+    def __init__(self, backend=None, **kwargs):
+        super().__init__(**kwargs)
+        self.backend = backend or os.environ.get("ALLSEC_TEST_BACKEND") or "sqlite"
+        if self.backend not in BACKENDS:
+            raise ImproperlyConfigured(
+                f"Nieznany backend testów: {self.backend!r} (dozwolone: {', '.join(BACKENDS)})."
+            )
+        self._overrides = None
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            "--backend",
+            choices=BACKENDS,
+            help="Baza dla testów (domyślnie ALLSEC_TEST_BACKEND albo sqlite).",
+        )
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._overrides = override_settings(
+            STORAGES={
+                **settings.STORAGES,
+                "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+            },
+            CACHES={
+                **settings.CACHES,
+                "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            },
+        )
+        self._overrides.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        if self._overrides is not None:
+            self._overrides.disable()
+            self._overrides = None
+        super().teardown_test_environment(**kwargs)
+
+    def setup_databases(self, **kwargs):
+        if self.backend == "postgres":
+            self._use_postgres()
+        if self.verbosity >= 1:
+            self.log(f"Baza testów: {connections[DEFAULT_DB_ALIAS].vendor}")
+        return super().setup_databases(**kwargs)
+
+    def _use_postgres(self):
+        conf = getattr(settings, "TEST_POSTGRES", None)
+        if not conf:
+            raise ImproperlyConfigured("--backend postgres wymaga TEST_POSTGRES w settings.")
+        db = _postgres_test_database(conf)
+        settings.DATABASES[DEFAULT_DB_ALIAS] = db
+
+        # połączenie mogło już powstać (np. przy imporcie testów) – wymieniamy je
+        # razem z ustawieniami aliasu, jak przy aliasach tymczasowych w komendach
+        if any(conn.alias == DEFAULT_DB_ALIAS for conn in connections.all(initialized_only=True)):
+            connections[DEFAULT_DB_ALIAS].close()
+            del connections[DEFAULT_DB_ALIAS]
+        connections.settings[DEFAULT_DB_ALIAS] = connections.configure_settings({DEFAULT_DB_ALIAS: db})[DEFAULT_DB_ALIAS]
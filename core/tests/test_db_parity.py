@@ -0,0 +1,85 @@
+import calendar
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Entity, Site, WorkOrder
+from core.views import _assignee_options
+from core.views_pwa import _catalog_site_ids
+
+
+class DbParityTests(TestCase):
+    """Zapytania, które na SQLite i PostgreSQL muszą dawać ten sam wynik
+    (manage.py test core --backend postgres)."""
+
+    def setUp(self):
+        entity = Entity.objects.create(name="Wspólnota")
+        self.site = Site.objects.create(entity=entity, name="Kamienica")
+        self.other_site = Site.objects.create(entity=entity, name="Biurowiec")
+        self.today = timezone.localdate()
+
+    def order(self, **kwargs):
+        kwargs.setdefault("site", self.site)
+        kwargs.setdefault("work_type", WorkOrder.WorkOrderType.SERVICE)
+        kwargs.setdefault("title", "Serwis")
+        return WorkOrder.objects.create(**kwargs)
+
+    def test_number_follows_highest_existing(self):
+        suffix = f"{self.today.month:02d}-{self.today.year}"
+        # numer z innego miesiąca i numer nadany ręcznie nie liczą się
+        self.order(number="ZL 40-01-2000")
+        self.order(number=f"ręczny-{suffix}")
+
+        first, second, third = self.order(), self.order(), self.order()
+        self.assertEqual(
+            [first.number, second.number, third.number],
+            [f"ZL 01-{suffix}", f"ZL 02-{suffix}", f"ZL 03-{suffix}"],
+        )
+
+        # po usunięciu zlecenia ze środka count() dałby ponownie "03"
+        second.delete()
+        self.assertEqual(self.order().number, f"ZL 04-{suffix}")
+
+    def test_year_and_month_filters(self):
+        User = get_user_model()
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "x"))
+
+        last_day = calendar.monthrange(self.today.year, self.today.month)[1]
+        first_of_month = self.today.replace(day=1)
+        end_of_month = self.today.replace(day=last_day)
+        next_month = end_of_month + timedelta(days=1)
+        previous_year = first_of_month.replace(year=self.today.year - 1)
+
+        in_month = {self.order(planned_date=first_of_month).pk, self.order(planned_date=end_of_month).pk}
+        next_month_pk = self.order(planned_date=next_month).pk
+        self.order(planned_date=previous_year)
+        self.order(planned_date=None)
+
+        def listed(time):
+            response = self.client.get(reverse("core:workorder_list"), {"time": time, "hide_completed": "0"})
+            self.assertEqual(response.status_code, 200)
+            return {o.pk for o in response.context["orders"]}
+
+        self.assertEqual(listed("month"), in_month)
+        in_year = in_month | ({next_month_pk} if next_month.year == self.today.year else set())
+        self.assertEqual(listed("year"), in_year)
+
+    def test_distinct_ids(self):
+        User = get_user_model()
+        anna = User.objects.create_user("anna", first_name="Anna", last_name="Nowak")
+        jan = User.objects.create_user("jan", first_name="Jan", last_name="Kowalski")
+        User.objects.create_user("bez_zlecen")
+
+        for _ in range(3):
+            self.order(assigned_to=jan, planned_date=self.today)
+        self.order(assigned_to=jan, site=self.other_site, planned_date=self.today)
+        self.order(assigned_to=anna)
+
+        self.assertEqual(
+            _assignee_options(),
+            [(anna.pk, "Anna Nowak"), (jan.pk, "Jan Kowalski")],
+        )
+        self.assertEqual(_catalog_site_ids(jan), {self.site.pk, self.other_site.pk})
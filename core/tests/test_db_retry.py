@@ -0,0 +1,96 @@
+import json
+import sqlite3
+import threading
+import unittest
+
+from django.db import OperationalError, connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+
+from core.db import contention_stats, retry_on_lock
+from core.models import Entity
+
+
+RETRY = {"DEADLINE": 1.0, "BUSY_TIMEOUT": 50, "BASE_DELAY": 0.01, "MAX_DELAY": 0.05, "RETRY_AFTER": 7}
+
+
+def locked_view(failures):
+    """Widok, który pierwsze `failures` prób kończy "database is locked" (None = zawsze)."""
+    calls = []
+
+    @retry_on_lock
+    def view(request):
+        calls.append(1)
+        if failures is None or len(calls) <= failures:
+            raise OperationalError("database is locked")
+        return HttpResponse("ok")
+
+    return view, calls
+
+
+@override_settings(DB_WRITE_RETRY=RETRY)
+class RetryOnLockTests(TransactionTestCase):
+    def setUp(self):
+        self.request = RequestFactory().post("/api/pwa/")
+
+    def recovered(self, name):
+        return contention_stats()["by_view"].get(name, {}).get("recovered", 0)
+
+    def test_recovers_after_single_lock(self):
+        view, calls = locked_view(1)
+        before = self.recovered("view")
+
+        response = view(self.request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.recovered("view"), before + 1)
+
+    def test_permanent_lock_returns_503(self):
+        view, calls = locked_view(None)
+
+        response = view(self.request)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "7")
+        body = json.loads(response.content)
+        self.assertEqual((body["ok"], body["error"], body["retry_after"]), (False, "db_busy", 7))
+        self.assertGreater(len(calls), 1)
+
+    def test_lock_inside_outer_atomic_is_not_retried(self):
+        view, calls = locked_view(1)
+
+        with self.assertRaises(OperationalError):
+            with transaction.atomic():
+                view(self.request)
+        self.assertEqual(len(calls), 1)
+
+    @unittest.skipUnless(connection.vendor == "sqlite", "blokada zapisu SQLite")
+    def test_retries_real_lock_within_deadline(self):
+        if connection.is_in_memory_db():
+            self.skipTest("baza testowa w pamięci")
+        # drugie połączenie trzyma blokadę zapisu dłużej niż BUSY_TIMEOUT, ale krócej niż DEADLINE
+        holder = sqlite3.connect(connection.settings_dict["NAME"], isolation_level=None, check_same_thread=False)
+        holder.execute("BEGIN IMMEDIATE")
+        release = threading.Timer(0.3, lambda: holder.execute("COMMIT"))
+        release.start()
+
+        @retry_on_lock
+        def write(request):
+            Entity.objects.create(name="Wspólnota")
+            return HttpResponse("ok")
+
+        before = self.recovered("write")
+        try:
+            response = write(self.request)
+        finally:
+            release.join()
+            holder.close()
+
+        self.assertEqual(response.status_code, 200)
+        # z busy_timeout z SQLITE_PRAGMAS pierwsza próba po prostu by poczekała
+        self.assertEqual(self.recovered("write"), before + 1)
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            # po widoku wraca busy_timeout połączenia
+            self.assertNotEqual(cursor.fetchone()[0], RETRY["BUSY_TIMEOUT"])
@@ -0,0 +1,100 @@
+import csv
+import io
+import warnings
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from unittest import skipUnless
+from xml.etree import ElementTree
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import exports
+from core.models import Entity, Site, WorkOrder
+
+try:
+    import openpyxl
+except ImportError:  # openpyxl nie jest zależnością aplikacji – tylko do sprawdzenia plików
+    openpyxl = None
+
+
+HEADER = ("Tekst", "Liczba", "Kwota", "Data", "Data i czas", "Tak/nie", "Puste")
+ROWS = [
+    ("Łódź & <Kraków>", 7, Decimal("1234.50"), date(2025, 3, 1), datetime(2025, 3, 1, 14, 30), True, None),
+    ("=SUMA(A1)", -3, Decimal("0.01"), date(1999, 12, 31), datetime(2000, 1, 1, 0, 0), False, ""),
+    ("znak\x01 sterujący", 0, Decimal("-5"), None, None, None, None),
+]
+
+SPREADSHEET_NS = {"x": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+
+
+def _xlsx(rows, **kwargs):
+    return b"".join(exports.stream_xlsx(HEADER, rows, **kwargs))
+
+
+class XlsxExportTests(SimpleTestCase):
+    def test_zip_and_sheet_xml_are_valid(self):
+        with zipfile.ZipFile(io.BytesIO(_xlsx(ROWS))) as zf:
+            self.assertIsNone(zf.testzip())
+            names = set(zf.namelist())
+            for name in ("[Content_Types].xml", "xl/workbook.xml", "xl/worksheets/sheet1.xml"):
+                self.assertIn(name, names)
+            sheet = ElementTree.fromstring(zf.read("xl/worksheets/sheet1.xml"))
+
+        rows = sheet.findall("x:sheetData/x:row", SPREADSHEET_NS)
+        self.assertEqual(len(rows), 1 + len(ROWS))
+        self.assertEqual(
+            [c.findtext("x:is/x:t", namespaces=SPREADSHEET_NS) for c in rows[0]], list(HEADER)
+        )
+
+    @override_settings(CORE_EXPORTS={"CHUNK_SIZE": 7})
+    def test_many_rows_across_chunks(self):
+        rows = [(f"wiersz {i}", i) for i in range(100)]
+        with zipfile.ZipFile(io.BytesIO(b"".join(exports.stream_xlsx(("Nazwa", "Nr"), rows)))) as zf:
+            sheet = ElementTree.fromstring(zf.read("xl/worksheets/sheet1.xml"))
+        self.assertEqual(len(sheet.findall("x:sheetData/x:row", SPREADSHEET_NS)), 101)
+
+    @skipUnless(openpyxl, "openpyxl niezainstalowany")
+    def test_openpyxl_reads_values(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")  # np. "Workbook contains no default style"
+            wb = openpyxl.load_workbook(io.BytesIO(_xlsx(ROWS, sheet_name="zlecenia/2025")), read_only=True)
+        self.assertEqual(wb.sheetnames, ["zlecenia-2025"])
+        values = list(wb.active.iter_rows(values_only=True))
+
+        self.assertEqual(values[0], HEADER)
+        self.assertEqual(
+            values[1],
+            ("Łódź & <Kraków>", 7, 1234.5, datetime(2025, 3, 1), datetime(2025, 3, 1, 14, 30), True, None),
+        )
+        # tekst zaczynający się od "=" zostaje tekstem, nie formułą
+        self.assertEqual(values[2][:3], ("=SUMA(A1)", -3, 0.01))
+        self.assertEqual(values[2][3:6], (datetime(1999, 12, 31), datetime(2000, 1, 1), False))
+        self.assertEqual(values[3], ("znak sterujący", 0, -5, None, None, None, None))
+
+
+class CsvExportTests(SimpleTestCase):
+    def test_polish_excel_dialect(self):
+        body = b"".join(exports.stream_csv(HEADER, ROWS)).decode("utf-8")
+        self.assertTrue(body.startswith("﻿"))
+
+        rows = list(csv.reader(io.StringIO(body[1:]), delimiter=";"))
+        self.assertEqual(rows[0], list(HEADER))
+        self.assertEqual(rows[1], ["Łódź & <Kraków>", "7", "1234,50", "2025-03-01", "2025-03-01 14:30", "True", ""])
+        self.assertEqual(rows[2][0], "'=SUMA(A1)")
+
+
+class WorkOrderExportTests(TestCase):
+    def test_filters_from_plain_mapping(self):
+        site = Site.objects.create(entity=Entity.objects.create(name="Wspólnota"), name="Kamienica")
+        for status in (WorkOrder.Status.IN_PROGRESS, WorkOrder.Status.COMPLETED):
+            WorkOrder.objects.create(site=site, work_type=WorkOrder.WorkOrderType.SERVICE, title=status, status=status)
+
+        titles = lambda params: [row[4] for row in exports.export_rows("workorders", params)]
+        # jak na liście: bez hide_completed zakończone są ukryte
+        self.assertEqual(titles({}), [WorkOrder.Status.IN_PROGRESS])
+        self.assertEqual(
+            sorted(titles({"hide_completed": "0"})),
+            sorted([WorkOrder.Status.IN_PROGRESS, WorkOrder.Status.COMPLETED]),
+        )
+        self.assertEqual(titles({"hide_completed": "0", "status": "COMPLETED", "type": "MAINTENANCE"}), [])
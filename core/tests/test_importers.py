@@ -0,0 +1,75 @@
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+
+from core import importers
+from core.models import Contact, Entity, Site, SiteContact, System
+
+
+SYSTEMS_CSV = """site;system_type;name;manufacturer
+Kamienica (Łódź);CCTV;Klatka A;Hikvision
+Kamienica (Łódź);System SSP;;Bosch
+Kamienica (Łódź);CCTV;klatka  a;Dahua
+"""
+
+CONTACTS_CSV = """first_name;last_name;phone;site;role
+Anna;Nowak;600 100 200;Kamienica;ADMINISTRATOR
+Anna;Nowak;600100200;Kamienica;Kontakt ds. awarii
+Jan;Kowalski;601 000 000;;
+"""
+
+
+def _files(encoding="utf-8", **texts):
+    return {kind: io.BytesIO(text.encode(encoding)) for kind, text in texts.items()}
+
+
+class ImporterTests(TestCase):
+    def setUp(self):
+        entity = Entity.objects.create(name="Wspólnota")
+        self.site = Site.objects.create(entity=entity, name="Kamienica", city="Łódź")
+
+    def test_reimport_does_not_duplicate(self):
+        first = importers.run_import(_files(systems=SYSTEMS_CSV, contacts=CONTACTS_CSV))
+        self.assertTrue(first.committed, first.errors)
+        # "klatka  a" to ten sam system co "Klatka A"; drugi wiersz Anny to ten sam kontakt z inną rolą
+        self.assertEqual((first.created["systems"], first.skipped["systems"]), (2, 1))
+        self.assertEqual((first.created["contacts"], first.skipped["contacts"]), (2, 1))
+        self.assertEqual(first.created["site_contacts"], 2)
+
+        second = importers.run_import(_files(systems=SYSTEMS_CSV, contacts=CONTACTS_CSV))
+        self.assertTrue(second.committed, second.errors)
+        self.assertEqual(second.created["systems"] + second.created["contacts"] + second.created["site_contacts"], 0)
+        self.assertEqual(second.skipped["site_contacts"], 2)
+
+        self.assertEqual(System.objects.filter(site=self.site).count(), 2)
+        self.assertEqual(Contact.objects.count(), 2)
+        self.assertEqual(
+            set(SiteContact.objects.values_list("contact__last_name", "role")),
+            {("Nowak", "ADMINISTRATOR"), ("Nowak", "KONTAKT_AWARIE")},
+        )
+
+    def test_wrong_encoding_is_a_file_error(self):
+        files = _files("cp1250", systems=SYSTEMS_CSV)
+        result = importers.run_import(files, skip_invalid=True)
+
+        self.assertFalse(result.committed)
+        self.assertEqual(result.failed_files, ["systems"])
+        self.assertEqual([(e.kind, e.line) for e in result.errors], [("systems", 0)])
+        self.assertFalse(System.objects.exists())
+
+        result = importers.run_import(_files("cp1250", systems=SYSTEMS_CSV), encoding="cp1250")
+        self.assertTrue(result.committed, result.errors)
+        self.assertEqual(result.created["systems"], 2)
+
+    def test_upload_with_wrong_encoding_shows_report(self):
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "admin@example.com", "x"))
+        upload = SimpleUploadedFile("systemy.csv", SYSTEMS_CSV.encode("cp1250"), content_type="text/csv")
+        response = self.client.post(
+            reverse("core:site_import"), {"systems": upload, "encoding": "utf-8-sig", "dry_run": "on"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "cały plik")
+        self.assertContains(response, "utf-8")
@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import (
+    Entity, MaintenanceCheckItem, MaintenanceProtocol, MaintenanceSection, Site, System, WorkOrder,
+)
+
+
+class SystemMaintenanceHistoryTests(TestCase):
+    def setUp(self):
+        site = Site.objects.create(entity=Entity.objects.create(name="Wspólnota"), name="Kamienica")
+        self.system = System.objects.create(site=site, system_type=System.SystemType.choices[0][0])
+        self.protocols = []
+        for month in (1, 2, 3):
+            order = WorkOrder.objects.create(
+                site=site, work_type=WorkOrder.WorkOrderType.MAINTENANCE, title="Przegląd"
+            )
+            protocol = MaintenanceProtocol.objects.create(
+                work_order=order, site=site, period_year=2025, period_month=month
+            )
+            # dwie sekcje tego samego systemu w jednym protokole
+            for _ in range(2):
+                section = MaintenanceSection.objects.create(protocol=protocol, system=self.system)
+                MaintenanceCheckItem.objects.create(section=section, order=1, label="Zasilanie")
+            self.protocols.append(protocol)
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "admin@example.com", "x"))
+
+    def test_limit_counts_protocols_not_sections(self):
+        response = self.client.get(
+            reverse("core:system_maintenance_history", args=[self.system.pk]), {"n": 2}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [col["id"] for col in response.context["columns"]],
+            [self.protocols[2].pk, self.protocols[1].pk],
+        )
@@ -0,0 +1,47 @@
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.profiling import get_store
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.user = get_user_model().objects.create_superuser("admin", "admin@example.com", "x")
+        self.client.force_login(self.user)
+
+    def profiling(self, **extra):
+        return override_settings(PROFILING={"DIR": self.tmp.name, "VIEWS": ["core:dashboard"], **extra})
+
+    def test_flag_profiles_matching_view(self):
+        with self.profiling():
+            response = self.client.get(reverse("core:dashboard"), HTTP_X_PROFILE="1")
+            profiles = get_store().list()
+
+        self.assertEqual(response.status_code, 200)
+        # widok wywołany przez Django – resolver_match ustawiony jak zwykle
+        self.assertEqual(response.resolver_match.view_name, "core:dashboard")
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual(profiles[0]["view_name"], "core:dashboard")
+        self.assertEqual(profiles[0]["trigger"], "flag")
+        self.assertEqual(profiles[0]["status_code"], 200)
+
+    def test_other_views_and_requests_without_flag_are_not_profiled(self):
+        with self.profiling():
+            self.client.get(reverse("core:dashboard"))
+            self.client.get(reverse("core:workorder_list"), HTTP_X_PROFILE="1")
+            self.client.get("/nie-ma-takiej-strony/", HTTP_X_PROFILE="1")
+            self.assertEqual(get_store().list(), [])
+
+    def test_view_exception_goes_through_django_handling(self):
+        with self.profiling(VIEWS=["core:workorder_detail"]):
+            response = self.client.get(reverse("core:workorder_detail", args=[999999]), HTTP_X_PROFILE="1")
+            profiles = get_store().list()
+
+        # Http404 z widoku zamieniony na odpowiedź przez handler Django, profil zapisany
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(profiles[0]["status_code"], 404)
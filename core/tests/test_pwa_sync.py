@@ -0,0 +1,42 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from django.test import TestCase
+from django.urls import reverse
+
+from core.columnar import decode_columnar
+from core.models import Entity, Site, System
+
+
+class PwaSyncFormatTests(TestCase):
+    def setUp(self):
+        entity = Entity.objects.create(name="Wspólnota")
+        for i, city in enumerate(["Kraków", "Wieliczka", "Kraków"]):
+            site = Site.objects.create(entity=entity, name=f"Obiekt {i}", city=city)
+            System.objects.create(site=site, system_type=System.SystemType.choices[i][0], manufacturer="Satel")
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "admin@example.com", "x"))
+
+    def dump(self, **params):
+        response = self.client.get(reverse("core:api_pwa_catalog_dump"), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_rows_are_streamed_by_default(self):
+        response = self.dump()
+        self.assertIsInstance(response, StreamingHttpResponse)
+        data = json.loads(b"".join(response.streaming_content))
+        self.assertNotIn("format", data)
+        self.assertEqual([s["name"] for s in data["sites"]], ["Obiekt 0", "Obiekt 1", "Obiekt 2"])
+
+    def test_columnar_matches_rows(self):
+        rows = json.loads(b"".join(self.dump().streaming_content))
+        table = json.loads(b"".join(self.dump(format="columnar").streaming_content))
+
+        self.assertEqual(table["format"], "columnar")
+        self.assertEqual(table["sites"]["dicts"]["city"], ["Kraków", "Wieliczka"])
+        sites = decode_columnar(table["sites"])
+        # kolumna partial jest wspólna dla pełnych wierszy i skrótów – w pełnych null
+        self.assertEqual([site.pop("partial") for site in sites], [None, None, None])
+        self.assertEqual(sites, rows["sites"])
+        self.assertEqual(decode_columnar(table["systems"]), rows["systems"])
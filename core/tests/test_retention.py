@@ -0,0 +1,90 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core import analytics, retention
+from core.models import (
+    ArchivedWorkOrder, Entity, MonthlySummary, MonthlySummaryDirty, RetentionMark, ServiceReport,
+    ServiceReportItem, Site, WorkOrder, WorkOrderEvent,
+)
+
+
+def aware(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class RetentionMarkTests(TestCase):
+    def setUp(self):
+        self.site = Site.objects.create(entity=Entity.objects.create(name="Wspólnota"), name="Kamienica")
+
+    def completed_order(self, closed_at):
+        order = WorkOrder.objects.create(site=self.site, work_type=WorkOrder.WorkOrderType.SERVICE, title="Serwis")
+        WorkOrder.objects.filter(pk=order.pk).update(status=WorkOrder.Status.COMPLETED, closed_at=closed_at)
+        # zdarzenie utworzenia ma bieżącą datę – testy ustawiają własne
+        order.events.all().delete()
+        return order
+
+    def event(self, order, created_at):
+        return WorkOrderEvent.objects.create(
+            work_order=order,
+            kind=WorkOrderEvent.Kind.STATUS_CHANGE,
+            old_status=WorkOrder.Status.WAITING_FOR_PARTS,
+            new_status=WorkOrder.Status.IN_PROGRESS,
+            duration_seconds=3600,
+            created_at=created_at,
+        )
+
+    def test_rebuild_keeps_old_months_until_retention_deletes(self):
+        self.completed_order(aware(2022, 5, 10, 12))
+        self.assertIsNone(retention.frozen_before())
+
+        analytics.rebuild()
+        self.assertTrue(MonthlySummary.objects.filter(month=date(2022, 5, 1), closed_count=1).exists())
+
+    def test_prune_events_advances_mark_without_per_row_work(self):
+        order = self.completed_order(aware(2025, 1, 10, 12))
+        for day in (1, 2, 3):
+            self.event(order, aware(2023, 3, day, 9))
+        kept = self.event(order, aware(2024, 6, 1, 9))
+        MonthlySummaryDirty.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as queries:
+            deleted = retention.prune_events(aware(2024, 1, 1), batch_size=2)
+
+        self.assertEqual(deleted, 3)
+        self.assertEqual(list(WorkOrderEvent.objects.values_list("pk", flat=True)), [kept.pk])
+        self.assertEqual(RetentionMark.objects.get(kind=RetentionMark.Kind.EVENTS).month, date(2023, 4, 1))
+        self.assertEqual(retention.frozen_before(), date(2023, 4, 1))
+        self.assertFalse(MonthlySummaryDirty.objects.exists())
+        self.assertFalse(any("core_monthlysummarydirty" in q["sql"] for q in queries))
+
+        # znacznik nie cofa się przy późniejszym przebiegu z wcześniejszym progiem
+        self.event(order, aware(2022, 1, 1, 9))
+        retention.prune_events(aware(2022, 6, 1), batch_size=10)
+        self.assertEqual(retention.frozen_before(), date(2023, 4, 1))
+
+    def test_archive_deletes_tree_in_bulk_and_marks_last_source_month(self):
+        order = self.completed_order(aware(2020, 2, 20, 12))
+        self.event(order, aware(2020, 2, 1, 9))
+        report = ServiceReport.objects.create(
+            work_order=order, status=ServiceReport.Status.FINAL, report_date=date(2020, 3, 2)
+        )
+        for price in ("10.00", "20.00", "30.00"):
+            ServiceReportItem.objects.create(report=report, description="Czujka", unit_price=Decimal(price))
+
+        with CaptureQueriesContext(connection) as queries:
+            archived = retention.archive_work_orders(aware(2020, 4, 1), batch_size=10)
+
+        self.assertEqual(archived, 1)
+        self.assertTrue(ArchivedWorkOrder.objects.filter(original_id=order.pk).exists())
+        self.assertFalse(WorkOrder.objects.filter(pk=order.pk).exists())
+        self.assertFalse(ServiceReportItem.objects.exists())
+        self.assertFalse(WorkOrderEvent.objects.exists())
+        # report_date po closed_at – granica za miesiącem protokołu
+        self.assertEqual(retention.frozen_before(), date(2020, 4, 1))
+        # bez sygnałów per pozycja: żadnego przeliczania sum protokołu
+        self.assertFalse(any(q["sql"].startswith('UPDATE "core_servicereport"') for q in queries))
@@ -0,0 +1,55 @@
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.models import (
+    Entity, MonthlySummaryDirty, ServiceReport, ServiceReportItem, Site, WorkOrder,
+)
+from core.signals import deferred_report_totals
+
+
+class ServiceReportTotalsTests(TestCase):
+    def setUp(self):
+        site = Site.objects.create(entity=Entity.objects.create(name="Wspólnota"), name="Kamienica")
+        order = WorkOrder.objects.create(site=site, work_type=WorkOrder.WorkOrderType.SERVICE, title="Serwis")
+        self.report = ServiceReport.objects.create(
+            work_order=order, status=ServiceReport.Status.FINAL, report_date=date(2025, 3, 14)
+        )
+        MonthlySummaryDirty.objects.all().delete()
+
+    def add_item(self, price):
+        return ServiceReportItem.objects.create(report=self.report, description="Czujka", unit_price=Decimal(price))
+
+    def totals(self):
+        self.report.refresh_from_db()
+        return self.report.items_net_total, self.report.items_count
+
+    def test_each_item_change_updates_totals(self):
+        item = self.add_item("100.00")
+        self.add_item("20.50")
+        self.assertEqual(self.totals(), (Decimal("120.50"), 2))
+        item.delete()
+        self.assertEqual(self.totals(), (Decimal("20.50"), 1))
+
+    def test_deferred_block_recomputes_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            with deferred_report_totals():
+                items = [self.add_item(price) for price in ("10.00", "20.00", "30.00")]
+                items[0].delete()
+                # w trakcie bloku sumy jeszcze stare
+                self.assertEqual(self.totals(), (Decimal("0.00"), 0))
+
+        updates = [q["sql"] for q in queries if q["sql"].startswith('UPDATE "core_servicereport"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.totals(), (Decimal("50.00"), 2))
+        self.assertEqual(list(MonthlySummaryDirty.objects.values_list("month", flat=True)), [date(2025, 3, 1)])
+
+    def test_deferred_block_skips_recompute_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with deferred_report_totals():
+                self.add_item("10.00")
+                raise RuntimeError
+        self.assertEqual(self.totals(), (Decimal("0.00"), 0))
@@ -0,0 +1,93 @@
+import threading
+import time
+import unittest
+
+from django.db import OperationalError, connection, connections, transaction
+from django.test import TransactionTestCase
+
+from core.db import get_sqlite_pragmas
+from core.models import Entity
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "test blokad SQLite")
+class SqliteConcurrencyTests(TransactionTestCase):
+    """
+    Równoległe zapisy i odczyty przez połączenia Django (każdy wątek ma własne):
+    PRAGMA z configure_sqlite_connection + transakcje BEGIN IMMEDIATE nie mogą
+    kończyć się "database is locked".
+    """
+
+    WRITERS = 4
+    READERS = 4
+    SECONDS = 2.0
+
+    def setUp(self):
+        if connection.is_in_memory_db():
+            self.skipTest("baza testowa w pamięci – wątki dzielą jedno połączenie")
+        Entity.objects.bulk_create([Entity(name=f"Wspólnota {i}") for i in range(50)])
+
+    def run_threads(self, target, count):
+        errors = []
+        stop_at = time.monotonic() + self.SECONDS
+
+        def wrapped(n):
+            try:
+                target(n, stop_at)
+            except Exception as exc:  # noqa: BLE001 – zbieramy wszystko, asercja w wątku głównym
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        return errors, [threading.Thread(target=wrapped, args=(n,)) for n in range(count)]
+
+    def test_connection_settings(self):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            journal_mode = cursor.fetchone()[0]
+            cursor.execute("PRAGMA busy_timeout")
+            busy_timeout = cursor.fetchone()[0]
+
+        pragmas = get_sqlite_pragmas()
+        self.assertEqual(journal_mode, str(pragmas["journal_mode"]).lower())
+        self.assertEqual(busy_timeout, pragmas["busy_timeout"])
+        self.assertEqual(connection.transaction_mode, "IMMEDIATE")
+
+    def test_parallel_writers_and_readers(self):
+        counts = {"writes": 0, "reads": 0}
+        lock = threading.Lock()
+
+        def writer(n, stop_at):
+            i = 0
+            while time.monotonic() < stop_at:
+                i += 1
+                # odczyt przed zapisem w jednej transakcji – bez BEGIN IMMEDIATE
+                # eskalacja blokady kończy się od razu "database is locked"
+                with transaction.atomic():
+                    total = Entity.objects.count()
+                    Entity.objects.create(name=f"w{n}-{i}", notes=str(total))
+                    Entity.objects.filter(name=f"Wspólnota {i % 50}").update(notes=f"w{n}")
+                with lock:
+                    counts["writes"] += 1
+
+        def reader(n, stop_at):
+            while time.monotonic() < stop_at:
+                list(Entity.objects.order_by("-id").values_list("name", flat=True)[:20])
+                with lock:
+                    counts["reads"] += 1
+
+        write_errors, writers = self.run_threads(writer, self.WRITERS)
+        read_errors, readers = self.run_threads(reader, self.READERS)
+        for t in writers + readers:
+            t.start()
+        for t in writers + readers:
+            t.join()
+
+        errors = write_errors + read_errors
+        self.assertFalse(
+            [e for e in errors if isinstance(e, OperationalError)],
+            f"błędy blokady: {errors[:3]}",
+        )
+        self.assertEqual(errors, [])
+        self.assertGreater(counts["writes"], 0)
+        self.assertGreater(counts["reads"], 0)
+        self.assertEqual(Entity.objects.count(), 50 + counts["writes"])
@@ -0,0 +1,102 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Entity, Site, WorkOrder, WorkOrderEvent
+
+
+Status = WorkOrder.Status
+
+
+class WorkOrderStatusTests(TestCase):
+    def setUp(self):
+        self.site = Site.objects.create(entity=Entity.objects.create(name="Wspólnota"), name="Kamienica")
+        self.tech = get_user_model().objects.create_user("serwisant", password="x")
+
+    def order(self, **kwargs):
+        return WorkOrder.objects.create(
+            site=self.site, work_type=WorkOrder.WorkOrderType.SERVICE, title="Serwis", **kwargs
+        )
+
+    def transitions(self, order):
+        return list(WorkOrderEvent.objects.timeline(order).values_list("old_status", "new_status"))
+
+    def test_one_event_per_transition_including_creation(self):
+        order = self.order()
+        order.status = Status.IN_PROGRESS
+        order.save()
+        order.title = "Serwis centrali"
+        order.save()  # bez zmiany statusu – bez zdarzenia
+
+        self.assertEqual(self.transitions(order), [("", Status.NEW), (Status.NEW, Status.IN_PROGRESS)])
+
+    def test_update_fields_without_status_writes_no_event(self):
+        order = self.order()
+        order.status = Status.IN_PROGRESS
+        order.title = "Nowy tytuł"
+        order.save(update_fields=["title"])
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, Status.NEW)
+        self.assertEqual(order.title, "Nowy tytuł")
+        self.assertEqual(self.transitions(order), [("", Status.NEW)])
+
+    def test_closed_at_follows_closed_statuses(self):
+        order = self.order()
+        self.assertIsNone(order.closed_at)
+
+        for closed in (Status.COMPLETED, Status.CANCELLED):
+            order.status = closed
+            order.save()
+            order.refresh_from_db()
+            self.assertIsNotNone(order.closed_at)
+            self.assertEqual(order.closed_at, order.status_changed_at)
+
+            order.status = Status.IN_PROGRESS
+            order.save(update_fields=["status"])
+            order.refresh_from_db()
+            self.assertIsNone(order.closed_at)
+
+    def test_duration_is_time_in_previous_status(self):
+        order = self.order()
+        WorkOrder.objects.filter(pk=order.pk).update(status_changed_at=timezone.now() - timedelta(hours=2))
+        order.refresh_from_db()
+
+        order.status = Status.SCHEDULED
+        order.save()
+
+        event = WorkOrderEvent.objects.timeline(order).last()
+        self.assertAlmostEqual(event.duration_seconds, 7200, delta=5)
+        self.assertIsNone(WorkOrderEvent.objects.timeline(order).first().duration_seconds)
+
+    def test_set_status_writes_one_event_per_changed_order(self):
+        orders = [self.order() for _ in range(3)]
+        done = orders[0]
+        done.status = Status.COMPLETED
+        done.save()
+        before = WorkOrderEvent.objects.count()
+
+        changed = WorkOrder.objects.filter(pk__in=[o.pk for o in orders]).set_status(Status.COMPLETED, actor=self.tech)
+
+        self.assertEqual(changed, 2)
+        self.assertEqual(WorkOrderEvent.objects.count(), before + 2)
+        for order in orders[1:]:
+            order.refresh_from_db()
+            self.assertIsNotNone(order.closed_at)
+            self.assertEqual(self.transitions(order)[-1], (Status.NEW, Status.COMPLETED))
+
+    def test_only_pwa_changes_by_assigned_technician_notify(self):
+        order = self.order(assigned_to=self.tech)
+        changes = ((WorkOrderEvent.Source.PORTAL, Status.IN_PROGRESS), (WorkOrderEvent.Source.PWA, Status.REALIZED))
+        for source, status in changes:
+            order.status = status
+            order.status_actor = self.tech
+            order.status_source = source
+            order.save()
+
+        self.assertEqual(
+            list(WorkOrderEvent.objects.notifications().values_list("work_order", "new_status")),
+            [(order.pk, Status.REALIZED)],
+        )
@@ -7,12 +7,17 @@ app_name = "core"
 
 urlpatterns = [
     path("", views.dashboard, name="dashboard"),
+    path("analityka/", views.analytics_dashboard, name="analytics"),
+    path("analityka/przelicz/", views.analytics_refresh, name="analytics_refresh"),
 
     path("pwa/", views_pwa.pwa_home, name="pwa_home"),
     path("api/pwa/catalog/dump/", views_pwa.api_pwa_catalog_dump, name="api_pwa_catalog_dump"),
+    path("api/pwa/catalog/sites/<int:pk>/", views_pwa.api_pwa_catalog_site, name="api_pwa_catalog_site"),
     path("pwa/obiekty/", views_pwa.pwa_objects, name="pwa_objects"),
     path("pwa/zlecenia/", views_pwa.pwa_workorder_list, name="pwa_workorder_list"),
     path("pwa/zlecenia/<int:pk>/", views_pwa.pwa_workorder_detail, name="pwa_workorder_detail"),
+    path("zlecenia/archiwum/", views.archive_list, name="archive_list"),
+    path("zlecenia/archiwum/<int:pk>/", views.archive_detail, name="archive_detail"),
     path("zlecenia/<int:pk>/toggle-realized/", views.workorder_toggle_realized, name="workorder_toggle_realized"),
     path("powiadomienia/zlecenia/", views.workorder_events, name="workorder_events"),
     path("powiadomienia/zlecenia/mark-all-read/", views.workorder_events_mark_all_read, name="workorder_events_mark_all_read"),
@@ -42,12 +47,27 @@ urlpatterns = [
     path("pwa/protokoly/konserwacja/<int:pk>/", views_pwa.pwa_maintenanceprotocol_edit, name="pwa_maintenanceprotocol_edit"),
 
     path("api/pwa/maintenanceprotocol/save/", views_pwa.api_pwa_maintenanceprotocol_save, name="api_pwa_maintenanceprotocol_save"),
+    path("api/pwa/maintenanceprotocol/<int:pk>/patch/", views_pwa.api_pwa_maintenanceprotocol_patch, name="api_pwa_maintenanceprotocol_patch"),
 
     path("pwa/sw.js", views_pwa.pwa_sw, name="pwa_sw"),
     
 
     path("zlecenia/", views.workorder_list, name="workorder_list"),
     path("zlecenia/nowe/", views.workorder_create, name="workorder_create"),
+    path("zlecenia/eksport.<str:fmt>", views.data_export, {"dataset": "workorders"}, name="workorder_export"),
+    path("protokoly/eksport.<str:fmt>", views.data_export, {"dataset": "servicereports"}, name="service_report_export"),
+    path(
+        "protokoly/pozycje/eksport.<str:fmt>",
+        views.data_export,
+        {"dataset": "servicereport-items"},
+        name="service_report_items_export",
+    ),
+    path(
+        "protokoly-przegladow/eksport.<str:fmt>",
+        views.data_export,
+        {"dataset": "maintenance"},
+        name="maintenance_protocol_export",
+    ),
     path("zlecenia/<int:pk>/", views.workorder_detail, name="workorder_detail"),
     path("zlecenia/<int:pk>/edytuj/", views.workorder_edit, name="workorder_edit"),
     path(
@@ -74,6 +94,7 @@ urlpatterns = [
     # Obiekty
     path("obiekty/", views.site_list, name="site_list"),
     path("obiekty/nowy/", views.site_create, name="site_create"),
+    path("obiekty/import/", views.site_import, name="site_import"),
     path("obiekty/<int:pk>/", views.site_detail, name="site_detail"),
     path("obiekty/<int:pk>/edytuj/", views.site_edit, name="site_edit"),
 
@@ -121,6 +142,11 @@ urlpatterns = [
         views.system_detail,
         name="system_detail",
     ),
+    path(
+        "systemy/<int:pk>/historia/",
+        views.system_maintenance_history,
+        name="system_maintenance_history",
+    ),
     path(
         "systemy/<int:pk>/edytuj/",
         views.system_edit,
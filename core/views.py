@@ -5,9 +5,12 @@ from django.contrib import messages
 from django.contrib.auth.views import LoginView
 from django.core.paginator import Paginator
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from datetime import date, timedelta
-from django.http import HttpResponseForbidden, JsonResponse
-from django.db.models import Sum, Q, Case, When, Value, IntegerField
+from decimal import Decimal, InvalidOperation
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.template.loader import render_to_string
+from django.db.models import Sum, Q, Case, When, Value, IntegerField, F, Count, Max
 from django.db import transaction
 
 from django.core.exceptions import FieldDoesNotExist
@@ -33,9 +36,21 @@ from .models import (
     SiteContact,
     Entity,
     MaintenanceProtocol,
-    WorkOrderEvent
+    MaintenanceSection,
+    MaintenanceCheckItem,
+    WorkOrderEvent,
+    ArchivedWorkOrder,
 )
 
+from .cache import bump_on_commit, fragment_version, get_or_set as cache_get_or_set
+from . import analytics
+from . import exports
+from .filters import TIME_CHOICES, filter_workorders
+from .signals import deferred_report_totals
+from . import importers
+from . import retention
+from .protocol_editor import ProtocolEditor
+
 from .forms import (
     WorkOrderForm,
     ServiceReportForm,
@@ -46,8 +61,7 @@ from .forms import (
     SiteContactForm,
     ServiceReportItemFormSet,
     EntityForm,
-    MaintenanceProtocolForm,
-    MaintenanceCheckItemFormSet,
+    ImportUploadForm,
 )
 
 
@@ -72,6 +86,52 @@ def is_technician(user):
     return user.groups.filter(name="technician").exists()
 
 
+# --- Listy do selectów (cache-aside, unieważniane sygnałami – core/cache.py) ---
+
+def _assignee_options():
+    """Serwisanci występujący w zleceniach: [(id, etykieta)]."""
+    def build():
+        User = get_user_model()
+        users = (
+            User.objects.filter(assigned_work_orders__isnull=False)
+            .distinct()
+            .order_by("first_name", "last_name", "username")
+        )
+        return [(u.id, (u.get_full_name() or "").strip() or u.username) for u in users]
+
+    return cache_get_or_set("choices:assignees", build, namespaces=("workorders", "users"))
+
+
+def _site_options():
+    """Wszystkie obiekty: [(id, "nazwa (miasto)")]."""
+    def build():
+        rows = Site.objects.order_by("name").values_list("id", "name", "city")
+        return [(pk, f"{name} ({city})" if city else name) for pk, name, city in rows]
+
+    return cache_get_or_set("choices:sites", build, namespaces=("sites",))
+
+
+def _city_options(model, namespace):
+    """Niepuste miasta z danej tabeli (Site/Manager/Entity), alfabetycznie."""
+    def build():
+        return list(
+            model.objects.exclude(city__isnull=True)
+            .exclude(city__exact="")
+            .order_by("city")
+            .values_list("city", flat=True)
+            .distinct()
+        )
+
+    return cache_get_or_set("choices:cities", build, model._meta.model_name, namespaces=(namespace,))
+
+
+def _manager_options():
+    def build():
+        return list(Manager.objects.order_by("short_name", "full_name"))
+
+    return cache_get_or_set("choices:managers", build, namespaces=("managers",))
+
+
 @login_required
 def dashboard(request):
     user = request.user
@@ -189,15 +249,8 @@ def dashboard(request):
         orders = orders.exclude(status=WorkOrder.Status.COMPLETED)
 
     # Sortowanie – na koniec po dacie i dacie utworzenia
-    orders = orders.order_by("planned_date", "created_at")
-
-    # Dane do dropdownów filtrów
-    User = get_user_model()
-    assignee_qs = (
-        User.objects.filter(assigned_work_orders__isnull=False)
-        .distinct()
-        .order_by("first_name", "last_name", "username")
-    )
+    # (puste daty jawnie na początku – jak w SQLite, także na PostgreSQL)
+    orders = orders.order_by(F("planned_date").asc(nulls_first=True), "created_at")
 
     # Listy opcji z informacją, który element jest zaznaczony
     type_choices = [
@@ -236,11 +289,11 @@ def dashboard(request):
 
     assignee_choices = [
         {
-            "id": u.id,
-            "label": u.get_full_name() or u.username,
-            "selected": (str(u.id) == assignee_param),
+            "id": user_id,
+            "label": label,
+            "selected": (str(user_id) == assignee_param),
         }
-        for u in assignee_qs
+        for user_id, label in _assignee_options()
     ]
 
 
@@ -283,57 +336,59 @@ def dashboard(request):
         maintenance_frequency=Site.MaintenanceFrequency.NONE
     ).select_related("entity")
 
-    maintenance_items = []
+    def build_maintenance_items():
+        maintenance_items = []
 
-    for site in sites_qs:
-        # Miesiące wykonania konserwacji:
-        # - preferujemy execution_months (jeśli używasz), fallback do maintenance_months
-        exec_months = []
-        try:
-            if site.execution_months:
-                exec_months = [int(x) for x in site.execution_months]
-        except (TypeError, ValueError):
+        for site in sites_qs:
+            # Miesiące wykonania konserwacji:
+            # - preferujemy execution_months (jeśli używasz), fallback do maintenance_months
             exec_months = []
+            try:
+                if site.execution_months:
+                    exec_months = [int(x) for x in site.execution_months]
+            except (TypeError, ValueError):
+                exec_months = []
+
+            if not exec_months:
+                exec_months = site.maintenance_months
+
+            if selected_month not in exec_months:
+                continue
+
+            # Zlecenia konserwacji na ten okres
+            period_orders = WorkOrder.objects.filter(
+                site=site,
+                work_type=WorkOrder.WorkOrderType.MAINTENANCE,
+                planned_date__year=selected_year,
+                planned_date__month=selected_month,
+            )
 
-        if not exec_months:
-            exec_months = site.maintenance_months
-
-        if selected_month not in exec_months:
-            continue
-
-        # Zlecenia konserwacji na ten okres
-        period_orders = WorkOrder.objects.filter(
-            site=site,
-            work_type=WorkOrder.WorkOrderType.MAINTENANCE,
-            planned_date__year=selected_year,
-            planned_date__month=selected_month,
-        )
-
-        # Jeśli jest zlecenie ZAKOŃCZONE → obiekt znika z listy
-        if period_orders.filter(status=WorkOrder.Status.COMPLETED).exists():
-            continue
+            # Jeśli jest zlecenie ZAKOŃCZONE → obiekt znika z listy
+            if period_orders.filter(status=WorkOrder.Status.COMPLETED).exists():
+                continue
 
-        # Jeśli jest zlecenie w innym statusie → pokażemy "W trakcie"
-        ongoing_order = (
-            period_orders.exclude(status=WorkOrder.Status.COMPLETED)
-            .order_by("planned_date", "created_at")
-            .first()
-        )
+            # Jeśli jest zlecenie w innym statusie → pokażemy "W trakcie"
+            ongoing_order = (
+                period_orders.exclude(status=WorkOrder.Status.COMPLETED)
+                .order_by(F("planned_date").asc(nulls_first=True), "created_at")
+                .first()
+            )
 
-        maintenance_items.append(
-            {
-                "site": site,
-                "ongoing_order": ongoing_order,  # None → pokaż "Utwórz"
-            }
-        )
+            maintenance_items.append(
+                {
+                    "site": site,
+                    "ongoing_order": ongoing_order,  # None → pokaż "Utwórz"
+                }
+            )
 
-    # Sortowanie: entity.name, site.name
-    maintenance_items.sort(
-        key=lambda item: (
-            item["site"].entity.name if item["site"].entity_id else "",
-            item["site"].name,
+        # Sortowanie: entity.name, site.name
+        maintenance_items.sort(
+            key=lambda item: (
+                item["site"].entity.name if item["site"].entity_id else "",
+                item["site"].name,
+            )
         )
-    )
+        return maintenance_items
 
     maintenance_module = {
         "selected_year": selected_year,
@@ -342,7 +397,18 @@ def dashboard(request):
         "selected_period_param": f"{selected_year}-{selected_month:02d}",  # np. 2025-12
         "month_offset": month_offset,
         "month_choices": month_choices,
-        "items": maintenance_items,
+        # lista liczona dopiero przy renderze – przy trafieniu w cache fragmentu wcale
+        "items": SimpleLazyObject(build_maintenance_items),
+        "version": fragment_version(
+            sites_qs.order_by().aggregate(
+                n=Count("id"), last=Max("updated_at"), entities_last=Max("entity__updated_at")
+            ),
+            WorkOrder.objects.filter(
+                work_type=WorkOrder.WorkOrderType.MAINTENANCE,
+                planned_date__year=selected_year,
+                planned_date__month=selected_month,
+            ),
+        ),
     }
 
 
@@ -386,136 +452,37 @@ def _apply_workorder_filters(
     default_time="all",
 ):
     """
-    Wspólna logika filtrów (Dashboard-style).
-
-    Parametry GET:
-      - type (opcjonalnie)
-      - site (opcjonalnie)
-      - assignee
-      - status
-      - time: all|week|month|year|range
-      - date_from/date_to (ISO: YYYY-MM-DD) dla range
-      - hide_completed: 1 (jeśli brak parametru => domyślnie TRUE)
+    Filtry listy zleceń z request.GET (core/filters.py) + choices do selectów.
     Zwraca: (przefiltrowany_qs, order_filters_dict)
     """
-    User = get_user_model()
-    today = timezone.localdate()
-
-    # --- pobranie parametrów ---
-    type_param = request.GET.get("type", "").strip() if include_type else ""
-    site_param = request.GET.get("site", "").strip() if include_site else ""
-
-    assignee_param = request.GET.get("assignee", "").strip()
-    status_param = request.GET.get("status", "").strip()
-
-    time_param = (request.GET.get("time", "") or "").strip() or default_time
-    date_from_str = (request.GET.get("date_from", "") or "").strip()
-    date_to_str = (request.GET.get("date_to", "") or "").strip()
-
-    # checkbox (jak brak w URL -> domyślnie ukrywamy zakończone/odwołane)
-    if "hide_completed" in request.GET:
-        hide_completed = request.GET.get("hide_completed") in ("1", "true", "on", "yes")
-    else:
-        hide_completed = True
-
-    # --- walidacja: type/status ---
-    valid_work_types = {c[0] for c in WorkOrder.WorkOrderType.choices}
-    valid_statuses = {c[0] for c in WorkOrder.Status.choices}
-
-    # --- filtry: type / site / assignee / status ---
-    if include_type and type_param in valid_work_types:
-        qs = qs.filter(work_type=type_param)
-    elif include_type:
-        type_param = ""
-
-    if include_site and site_param:
-        try:
-            qs = qs.filter(site_id=int(site_param))
-        except (TypeError, ValueError):
-            site_param = ""
-
-    if assignee_param:
-        try:
-            qs = qs.filter(assigned_to_id=int(assignee_param))
-        except (TypeError, ValueError):
-            assignee_param = ""
-
-    if status_param in valid_statuses:
-        qs = qs.filter(status=status_param)
-    else:
-        status_param = ""
-
-    # --- filtr czasu (tak jak dashboard: tydzień/miesiąc/rok lub range) ---
-    if time_param == "week":
-        start_of_week = today - timedelta(days=today.weekday())
-        end_of_week = start_of_week + timedelta(days=6)
-        qs = qs.filter(planned_date__range=(start_of_week, end_of_week))
-
-    elif time_param == "month":
-        qs = qs.filter(planned_date__year=today.year, planned_date__month=today.month)
-
-    elif time_param == "year":
-        qs = qs.filter(planned_date__year=today.year)
-
-    elif time_param == "range":
-        try:
-            df = date.fromisoformat(date_from_str) if date_from_str else None
-        except ValueError:
-            df = None
-            date_from_str = ""
-        try:
-            dt = date.fromisoformat(date_to_str) if date_to_str else None
-        except ValueError:
-            dt = None
-            date_to_str = ""
-
-        if df and dt:
-            qs = qs.filter(planned_date__range=(df, dt))
-        elif df:
-            qs = qs.filter(planned_date__gte=df)
-        elif dt:
-            qs = qs.filter(planned_date__lte=dt)
-
-    elif time_param == "all":
-        pass
-    else:
-        time_param = default_time
-
-    # --- ukrywanie zakończonych/odwołanych na liście (COMPLETED + CANCELLED) ---
-    if hide_completed:
-        qs = qs.exclude(status__in=[WorkOrder.Status.COMPLETED, WorkOrder.Status.CANCELLED])
+    qs, active = filter_workorders(
+        request.GET, qs, include_type=include_type, include_site=include_site, default_time=default_time
+    )
+    type_param = active["type"]
+    site_param = active["site"]
+    assignee_param = active["assignee"]
+    status_param = active["status"]
+    time_param = active["time"]
 
     # --- choices do selectów ---
 
     # Obiekty
     site_choices = []
     if include_site:
-        sites_qs = Site.objects.order_by("name")
-        for s in sites_qs:
-            label = s.name
-            if getattr(s, "city", None):
-                label = f"{label} ({s.city})"
+        for site_id, label in _site_options():
             site_choices.append({
-                "id": str(s.id),
+                "id": str(site_id),
                 "label": label,
-                "selected": (str(s.id) == site_param),
+                "selected": (str(site_id) == site_param),
             })
 
     # Serwisanci (tylko ci, którzy występują w zleceniach)
-    assignee_ids = (
-        WorkOrder.objects
-        .exclude(assigned_to__isnull=True)
-        .values_list("assigned_to_id", flat=True)
-        .distinct()
-    )
-    assignee_qs = User.objects.filter(id__in=assignee_ids).order_by("first_name", "last_name", "username")
     assignee_choices = []
-    for u in assignee_qs:
-        label = (u.get_full_name() or "").strip() or u.username
+    for user_id, label in _assignee_options():
         assignee_choices.append({
-            "id": str(u.id),
+            "id": str(user_id),
             "label": label,
-            "selected": (str(u.id) == assignee_param),
+            "selected": (str(user_id) == assignee_param),
         })
 
     # Status
@@ -528,15 +495,8 @@ def _apply_workorder_filters(
         })
 
     # Time
-    time_raw_choices = [
-        ("all", "Wszystkie"),
-        ("week", "Tydzień"),
-        ("month", "Miesiąc"),
-        ("year", "Rok"),
-        ("range", "Zakres dat"),
-    ]
     time_choices = []
-    for value, label in time_raw_choices:
+    for value, label in TIME_CHOICES:
         time_choices.append({
             "value": value,
             "label": label,
@@ -548,9 +508,9 @@ def _apply_workorder_filters(
         "assignee": assignee_param,
         "status": status_param,
         "time": time_param,
-        "date_from": date_from_str,
-        "date_to": date_to_str,
-        "hide_completed": hide_completed,
+        "date_from": active["date_from"],
+        "date_to": active["date_to"],
+        "hide_completed": active["hide_completed"],
 
         "site_choices": site_choices,
         "assignee_choices": assignee_choices,
@@ -603,9 +563,9 @@ def workorder_list(request):
     unread_events_count = 0
     recent_events = []
     if is_office(request.user):
-        unread_events_count = WorkOrderEvent.objects.filter(is_read=False).count()
+        unread_events_count = WorkOrderEvent.objects.notifications().filter(is_read=False).count()
         recent_events = list(
-            WorkOrderEvent.objects.select_related("work_order", "actor").order_by("-created_at")[:10]
+            WorkOrderEvent.objects.notifications().select_related("work_order", "actor").order_by("-created_at")[:10]
         )
 
     context = {
@@ -627,12 +587,30 @@ def workorder_list(request):
 
 
 
+SERVICE_REPORT_SORTS = {
+    "value_desc": ("-items_net_total", "-id"),
+    "value_asc": ("items_net_total", "-id"),
+}
+
+
+def _decimal_param(value):
+    """Kwota z GET ("1 200,50" / "1200.5") albo None."""
+    value = (value or "").replace(" ", "").replace(",", ".")
+    if not value:
+        return None
+    try:
+        amount = Decimal(value)
+    except InvalidOperation:
+        return None
+    return amount if amount.is_finite() else None
+
+
 @login_required
 def service_report_list(request):
     qs = (
         ServiceReport.objects
         .select_related("work_order__site", "work_order")
-        .order_by("-report_date", "-id")
+        .order_by(F("report_date").desc(nulls_last=True), "-id")
     )
 
     status = request.GET.get("status", "")
@@ -643,15 +621,41 @@ def service_report_list(request):
     if only_final:
         qs = qs.filter(status=ServiceReport.Status.FINAL)
 
+    # wartość netto (items_net_total – kolumna zdenormalizowana, indeks core_sr_net_total_idx)
+    value_min = _decimal_param(request.GET.get("value_min"))
+    value_max = _decimal_param(request.GET.get("value_max"))
+    if value_min is not None:
+        qs = qs.filter(items_net_total__gte=value_min)
+    if value_max is not None:
+        qs = qs.filter(items_net_total__lte=value_max)
+
+    sort = request.GET.get("sort", "")
+    if sort in SERVICE_REPORT_SORTS:
+        qs = qs.order_by(*SERVICE_REPORT_SORTS[sort])
+    else:
+        sort = ""
+
+    totals = qs.order_by().aggregate(net=Sum("items_net_total"), n=Count("pk"))
+
     paginator = Paginator(qs, 20)
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
 
+    # querystring do paginacji (bez page)
+    params = request.GET.copy()
+    params.pop("page", None)
+
     context = {
         "page_obj": page_obj,
+        "querystring": params.urlencode(),
         "filter_status": status,
         "only_final": only_final,
+        "value_min": request.GET.get("value_min", "") if value_min is not None else "",
+        "value_max": request.GET.get("value_max", "") if value_max is not None else "",
+        "sort": sort,
+        "totals": totals,
         "status_choices": ServiceReport.Status.choices,
+        "can_export": is_office(request.user),
     }
     return render(request, "core/servicereport_list.html", context)
 
@@ -660,7 +664,7 @@ def maintenance_protocol_list(request):
     qs = (
         MaintenanceProtocol.objects
         .select_related("site", "work_order")
-        .order_by("-period_year", "-period_month", "-id")
+        .order_by(F("period_year").desc(nulls_last=True), F("period_month").desc(nulls_last=True), "-id")
     )
 
     status = request.GET.get("status", "")
@@ -687,10 +691,143 @@ def maintenance_protocol_list(request):
         "status_choices": getattr(MaintenanceProtocol, "Status", None).choices
         if hasattr(MaintenanceProtocol, "Status")
         else [],
+        "can_export": is_office(request.user),
     }
     return render(request, "core/maintenance_protocol_list.html", context)
 
 
+EXPORT_CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+@login_required
+def data_export(request, dataset, fmt):
+    """
+    Eksport listy (z jej filtrami z GET) do CSV/XLSX – strumieniowo,
+    stała pamięć niezależnie od liczby wierszy (core/exports.py).
+    """
+    if not is_office(request.user):
+        return HttpResponseForbidden("Brak uprawnień do eksportu danych.")
+    if dataset not in exports.DATASETS or fmt not in exports.FORMATS:
+        raise Http404
+
+    response = StreamingHttpResponse(
+        exports.stream_export(dataset, fmt, request.GET),
+        content_type=EXPORT_CONTENT_TYPES[fmt],
+    )
+    response["Content-Disposition"] = f'attachment; filename="{exports.export_filename(dataset, fmt)}"'
+    # nginx: bez buforowania – plik ma lecieć od pierwszego wiersza
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@login_required
+def analytics_dashboard(request):
+    """
+    Analityka miesięczna: zakończone zlecenia, oczekiwanie na materiał,
+    przychód per zarządca – tylko z tabel MonthlySummary (core/analytics.py).
+    """
+    if not is_office(request.user):
+        return HttpResponseForbidden("Brak uprawnień.")
+
+    conf = analytics.get_analytics_settings()
+    try:
+        months = int(request.GET.get("months", ""))
+    except ValueError:
+        months = conf["MONTHS"]
+    if months not in analytics.MONTH_CHOICES:
+        months = conf["MONTHS"]
+    try:
+        manager_id = int(request.GET.get("manager", ""))
+    except ValueError:
+        manager_id = None
+
+    start = analytics.add_months(analytics.month_start(timezone.localdate()), -(months - 1))
+    context = analytics.dashboard(start, manager_id=manager_id)
+    context.update({
+        "months_count": months,
+        "month_choices": analytics.MONTH_CHOICES,
+        "manager_id": manager_id,
+        "managers": Manager.objects.order_by("short_name").values("id", "short_name"),
+    })
+    return render(request, "core/analytics.html", context)
+
+
+@login_required
+@require_POST
+def analytics_refresh(request):
+    """Przelicza oznaczone miesiące od razu (zamiast czekać na crona)."""
+    if not is_office(request.user):
+        return HttpResponseForbidden("Brak uprawnień.")
+
+    done = analytics.refresh_dirty()
+    messages.success(request, f"Przeliczono miesięcy: {len(done)}.")
+    return redirect(f"{reverse('core:analytics')}?{request.GET.urlencode()}")
+
+
+
+@login_required
+def archive_list(request):
+    """
+    Wyszukiwarka zleceń zarchiwizowanych przez apply_retention – numer,
+    tytuł, obiekt, numery protokołów; filtr po roku zamknięcia.
+    """
+    if not is_office(request.user):
+        return HttpResponseForbidden("Brak uprawnień.")
+
+    qs = ArchivedWorkOrder.objects.defer("payload")
+
+    q = (request.GET.get("q") or "").strip()
+    if q:
+        qs = qs.filter(
+            Q(number__icontains=q)
+            | Q(title__icontains=q)
+            | Q(site_name__icontains=q)
+            | Q(site_city__icontains=q)
+            | Q(service_report_number__icontains=q)
+            | Q(maintenance_protocol_number__icontains=q)
+        )
+
+    site_id = request.GET.get("site")
+    if site_id and site_id.isdigit():
+        qs = qs.filter(site_id=int(site_id))
+
+    year = request.GET.get("year")
+    if year and year.isdigit():
+        qs = qs.filter(closed_at__year=int(year))
+
+    paginator = Paginator(qs, 25)
+    page_obj = paginator.get_page(request.GET.get("page"))
+
+    params = request.GET.copy()
+    params.pop("page", None)
+
+    years = ArchivedWorkOrder.objects.datetimes("closed_at", "year", order="DESC")
+    context = {
+        "orders": page_obj.object_list,
+        "page_obj": page_obj,
+        "paginator": paginator,
+        "querystring": params.urlencode(),
+        "q": q,
+        "year": year or "",
+        "years": [d.year for d in years],
+    }
+    return render(request, "core/archive_list.html", context)
+
+
+@login_required
+def archive_detail(request, pk):
+    if not is_office(request.user):
+        return HttpResponseForbidden("Brak uprawnień.")
+
+    archived = get_object_or_404(ArchivedWorkOrder.objects.select_related("site"), pk=pk)
+    context = {"archived": archived, **retention.archive_detail(archived)}
+    for ev in context["events"]:
+        ev["duration"] = _format_duration(ev["duration_seconds"])
+    return render(request, "core/archive_detail.html", context)
+
 
 @login_required
 def workorder_detail(request, pk):
@@ -706,16 +843,43 @@ def workorder_detail(request, pk):
     service_report = getattr(order, "service_report", None)
     can_edit = is_office(request.user)
 
+    # historia statusów: jeden skan po indeksie (work_order, created_at)
+    status_labels = dict(WorkOrder.Status.choices)
+    timeline = [
+        {
+            "event": ev,
+            "old_label": status_labels.get(ev.old_status, ev.old_status),
+            "new_label": status_labels.get(ev.new_status, ev.new_status),
+            "duration": _format_duration(ev.duration_seconds),
+        }
+        for ev in WorkOrderEvent.objects.timeline(order).select_related("actor")
+    ]
+
     context = {
         "order": order,
         "systems": systems,   # ✅ NOWE
         "service_report": service_report,
         "can_edit": can_edit,
         "maintenance_protocol": protocol,
+        "timeline": timeline,
     }
     return render(request, "core/workorder_detail.html", context)
 
 
+def _format_duration(seconds):
+    """Czas w statusie do wyświetlenia: '2 d 3 h', '5 h 10 min', '12 min'."""
+    if seconds is None:
+        return ""
+    minutes = seconds // 60
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    if days:
+        return f"{days} d {hours} h"
+    if hours:
+        return f"{hours} h {minutes} min"
+    return f"{minutes} min"
+
+
 @login_required
 def workorder_create(request):
     # tylko biuro może dodawać zlecenia
@@ -725,6 +889,7 @@ def workorder_create(request):
     if request.method == "POST":
         form = WorkOrderForm(request.POST)
         if form.is_valid():
+            form.instance.status_actor = request.user
             order = form.save()
 
             # HOTFIX: Konserwacja -> brak wyboru systemów = wszystkie z umowy (fallback: wszystkie na obiekcie)
@@ -830,6 +995,7 @@ def workorder_edit(request, pk):
     if request.method == "POST":
         form = WorkOrderForm(request.POST, instance=order)
         if form.is_valid():
+            form.instance.status_actor = request.user
             order = form.save()
 
             
@@ -925,15 +1091,9 @@ def site_list(request):
         qs = qs.filter(manager_id=manager)
 
     # --- wybory do selectów ---
-    city_choices = (
-        Site.objects.exclude(city__isnull=True)
-        .exclude(city__exact="")
-        .order_by("city")
-        .values_list("city", flat=True)
-        .distinct()
-    )
+    city_choices = _city_options(Site, "sites")
 
-    manager_choices = Manager.objects.order_by("short_name", "full_name")
+    manager_choices = _manager_options()
 
     # --- paginacja + zachowanie filtrów w linkach paginacji ---
     paginator = Paginator(qs, 25)
@@ -970,12 +1130,11 @@ def site_list(request):
 @login_required
 def site_detail(request, pk):
     site = get_object_or_404(
-        Site.objects.select_related("entity", "manager").prefetch_related(
-            "systems", "site_contacts__contact"
-        ),
+        Site.objects.select_related("entity", "manager").prefetch_related("site_contacts__contact"),
         pk=pk,
     )
 
+    # leniwy queryset – przy trafieniu w cache fragmentu nie jest wykonywany
     systems = System.objects.filter(site=site).order_by("sort_order", "id")
 
     site_contacts = site.site_contacts.select_related("contact").all().order_by("role")
@@ -983,6 +1142,7 @@ def site_detail(request, pk):
     context = {
         "site": site,
         "systems": systems,
+        "systems_version": fragment_version(systems),
         "site_contacts": site_contacts,
         "can_edit": is_office(request.user),
     }
@@ -1032,6 +1192,101 @@ def system_detail(request, pk):
     return render(request, "core/system_detail.html", context)
 
 
+HISTORY_DEFAULT_PROTOCOLS = 6
+HISTORY_MAX_PROTOCOLS = 24
+# skrót wyniku w komórce siatki (pełna etykieta w title)
+HISTORY_RESULT_SYMBOLS = {
+    MaintenanceSection.CheckResult.OK: "✓",
+    MaintenanceSection.CheckResult.FAIL: "X",
+    MaintenanceSection.CheckResult.NOT_DONE: "O",
+}
+
+
+@login_required
+def system_maintenance_history(request, pk):
+    """
+    Historia konserwacji systemu: punkty kontrolne (wiersze) × ostatnie N
+    protokołów (kolumny, od najnowszego). Dane jednym zapytaniem – ostatnie
+    protokoły wybiera podzapytanie (indeks core_ms_system_protocol_idx).
+    """
+    system = get_object_or_404(System.objects.select_related("site"), pk=pk)
+
+    try:
+        limit = int(request.GET.get("n", HISTORY_DEFAULT_PROTOCOLS))
+    except (TypeError, ValueError):
+        limit = HISTORY_DEFAULT_PROTOCOLS
+    limit = max(1, min(HISTORY_MAX_PROTOCOLS, limit))
+
+    # ostatnie N protokołów, nie sekcji – system może mieć kilka sekcji w jednym protokole
+    last_protocol_ids = (
+        MaintenanceProtocol.objects
+        .filter(sections__system=system)
+        .distinct()
+        .order_by(F("period_year").desc(nulls_last=True), F("period_month").desc(nulls_last=True), "-id")
+        .values("id")[:limit]
+    )
+    rows = (
+        MaintenanceCheckItem.objects
+        .filter(section__system=system, section__protocol_id__in=last_protocol_ids, active=True)
+        .order_by(
+            F("section__protocol__period_year").desc(nulls_last=True),
+            F("section__protocol__period_month").desc(nulls_last=True),
+            "-section__protocol_id",
+            "order",
+            "id",
+        )
+        .values(
+            "label",
+            "order",
+            "result",
+            "note",
+            "section__protocol_id",
+            "section__protocol__number",
+            "section__protocol__period_year",
+            "section__protocol__period_month",
+        )
+    )
+
+    result_labels = dict(MaintenanceSection.CheckResult.choices)
+    columns = []
+    seen_protocols = set()
+    grid = {}
+    for row in rows:
+        protocol_id = row["section__protocol_id"]
+        if protocol_id not in seen_protocols:
+            seen_protocols.add(protocol_id)
+            year, month = row["section__protocol__period_year"], row["section__protocol__period_month"]
+            columns.append({
+                "id": protocol_id,
+                "number": row["section__protocol__number"] or f"KS {protocol_id}",
+                "period": f"{month:02d}/{year}" if year and month else "",
+            })
+
+        # ten sam punkt w kolejnych protokołach = ta sama treść (kopiowana z poprzedniego)
+        line = grid.setdefault(row["label"], {"label": row["label"], "order": row["order"], "cells": {}})
+        line["cells"].setdefault(protocol_id, {
+            "result": row["result"],
+            "symbol": HISTORY_RESULT_SYMBOLS.get(row["result"], "—"),
+            "title": result_labels.get(row["result"], ""),
+            "note": row["note"],
+        })
+
+    # kolejność wierszy wg najnowszego protokołu, w którym punkt wystąpił
+    lines = list(grid.values())
+    for line in lines:
+        line["cells"] = [line["cells"].get(col["id"]) for col in columns]
+
+    context = {
+        "system": system,
+        "site": system.site,
+        "columns": columns,
+        "lines": lines,
+        "limit": limit,
+        "limit_choices": (3, 6, 12, 24),
+    }
+    return render(request, "core/system_maintenance_history.html", context)
+
+
 @login_required
 def system_edit(request, pk):
     system = get_object_or_404(System, pk=pk)
@@ -1183,6 +1438,50 @@ def site_create(request):
     })
 
 
+@login_required
+def site_import(request):
+    """Import CSV (dane FV, obiekty, systemy, kontakty) – core/importers.py."""
+    if not is_office(request.user):
+        return HttpResponseForbidden("Brak uprawnień.")
+
+    result = None
+    if request.method == "POST":
+        form = ImportUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            files = {
+                kind: form.cleaned_data[kind].file
+                for kind in importers.IMPORT_KINDS
+                if form.cleaned_data.get(kind)
+            }
+            result = importers.run_import(
+                files,
+                dry_run=form.cleaned_data["dry_run"],
+                skip_invalid=form.cleaned_data["skip_invalid"],
+                encoding=form.cleaned_data["encoding"],
+            )
+            if result.committed:
+                messages.success(request, f"Zaimportowano: {sum(result.created.values())} rekordów.")
+    else:
+        form = ImportUploadForm()
+
+    summary = []
+    if result is not None:
+        for kind in importers.IMPORT_KINDS:
+            if result.rows[kind]:
+                summary.append({
+                    "label": importers.IMPORT_LABELS[kind],
+                    "rows": result.rows[kind],
+                    "created": result.created[kind],
+                    "skipped": result.skipped[kind],
+                })
+
+    return render(request, "core/site_import.html", {
+        "form": form,
+        "result": result,
+        "summary": summary,
+    })
+
+
 @login_required
 def site_edit(request, pk):
     if not is_office(request.user):
@@ -1257,14 +1556,7 @@ def manager_list(request):
     qs = qs.order_by("short_name", "full_name")
 
     # lista miast do selecta
-    city_choices = (
-        Manager.objects
-        .exclude(city__isnull=True)
-        .exclude(city__exact="")
-        .values_list("city", flat=True)
-        .distinct()
-        .order_by("city")
-    )
+    city_choices = _city_options(Manager, "managers")
 
     # qs_base do paginacji (bez page=)
     qd = request.GET.copy()
@@ -1397,7 +1689,7 @@ def contact_list(request):
         "page_obj": page_obj,
         "paginator": paginator,
         "filters": filters,
-        "manager_choices": Manager.objects.order_by("short_name", "full_name"),
+        "manager_choices": _manager_options(),
         "qs_base": qs_base,
         "can_create": request.user.has_perm("core.add_contact"),
         "can_edit": request.user.has_perm("core.change_contact"),
@@ -1571,16 +1863,21 @@ def ajax_site_systems_reorder(request, site_id):
     to_update = []
     pos = 1
     id_to_obj = {s.id: s for s in qs}
+    now = timezone.now()
     for sid in order_ids:
         obj = id_to_obj.get(sid)
         if not obj:
             continue
         obj.sort_order = pos
+        # bulk_update pomija auto_now – a updated_at wersjonuje cache fragmentów
+        obj.updated_at = now
         pos += 1
         to_update.append(obj)
 
     with transaction.atomic():
-        System.objects.bulk_update(to_update, ["sort_order"])
+        System.objects.bulk_update(to_update, ["sort_order", "updated_at"])
+        # bulk_update nie wysyła post_save
+        bump_on_commit("systems")
 
     return JsonResponse({"ok": True})
 
@@ -1610,19 +1907,22 @@ def service_report_edit(request, pk):
                 report_obj.status = ServiceReport.Status.FINAL
             # jeśli nie finalize – zostawiamy status taki, jak był (np. DRAFT)
 
-            # to wywoła logikę w modelu (data protokołu + automatyczny numer)
-            report_obj.save()
+            # protokół + pozycje + ich sumy razem albo wcale; sumy raz po całym formsecie
+            with transaction.atomic():
+                # to wywoła logikę w modelu (data protokołu + automatyczny numer)
+                report_obj.save()
 
-            # upewniamy się, że formset zapisuje się do tego samego protokołu
-            item_formset.instance = report_obj
-            item_formset.save()
+                # upewniamy się, że formset zapisuje się do tego samego protokołu
+                item_formset.instance = report_obj
+                with deferred_report_totals():
+                    item_formset.save()
 
             return redirect("core:service_report_detail", pk=report_obj.pk)
     else:
         form = ServiceReportForm(instance=report)
         item_formset = ServiceReportItemFormSet(instance=report)
 
-    items_total = report.items.aggregate(total=Sum("total_price"))["total"] or 0
+    items_total = report.items_net_total
 
     context = {
         "report": report,
@@ -1733,9 +2033,9 @@ def service_report_detail(request, pk):
     order = report.work_order
     site = order.site if order else None
 
-    # wszystkie pozycje + suma netto
+    # wszystkie pozycje + suma netto (kolumna utrzymywana przez sygnały pozycji)
     items = report.items.all()
-    items_total = items.aggregate(total=Sum("total_price"))["total"] or 0
+    items_total = report.items_net_total
 
     context = {
         "report": report,
@@ -1751,30 +2051,41 @@ def service_report_detail(request, pk):
 @xframe_options_sameorigin
 @login_required
 def service_report_pdf(request, pk):
-    report = get_object_or_404(ServiceReport, pk=pk)
-    order = report.work_order
-
-    items = report.items.all()
-    items_total = items.aggregate(total=Sum("total_price"))["total"] or 0
+    # Wydruk nie zależy od użytkownika – gotowy HTML trzymamy w cache do zmiany
+    # protokołu/pozycji (albo zlecenia/obiektu/danych fakturowych, które pokazuje).
+    def build():
+        report = get_object_or_404(ServiceReport, pk=pk)
+        order = report.work_order
+
+        items = report.items.all()
+        items_total = report.items_net_total
+
+        # baza nazwy pliku: numer protokołu albo fallback
+        base_name = report.number or f"protokol_{report.pk}"
+
+        # proste "oczyszczenie" – usuwamy spacje i ukośniki itp.
+        safe_name = (
+            base_name
+            .replace("/", "_")
+            .replace("\\", "_")
+        )
 
-    # baza nazwy pliku: numer protokołu albo fallback
-    base_name = report.number or f"protokol_{report.pk}"
+        context = {
+            "report": report,
+            "order": order,
+            "items": items,
+            "items_total": items_total,
+            "download_filename": safe_name,
+        }
+        return render_to_string("core/servicereport_pdf.html", context)
 
-    # proste "oczyszczenie" – usuwamy spacje i ukośniki itp.
-    safe_name = (
-        base_name
-        .replace("/", "_")
-        .replace("\\", "_")
+    html = cache_get_or_set(
+        "pdf:servicereport",
+        build,
+        pk,
+        namespaces=(f"servicereport:{pk}", "workorders", "sites", "systems", "entities", "managers"),
     )
-
-    context = {
-        "report": report,
-        "order": order,
-        "items": items,
-        "items_total": items_total,
-        "download_filename": safe_name,
-    }
-    return render(request, "core/servicereport_pdf.html", context)
+    return HttpResponse(html)
 # =========================
 # DANE FAKTUROWE (Entity)
 # =========================
@@ -1817,13 +2128,7 @@ def entity_list(request):
 
     # --- Listy do selectów (TomSelect)
     type_choices = [{"value": v, "label": l} for v, l in Entity.EntityType.choices]
-    city_choices = list(
-        Entity.objects.exclude(city="")
-        .exclude(city__isnull=True)
-        .values_list("city", flat=True)
-        .order_by("city")
-        .distinct()
-    )
+    city_choices = _city_options(Entity, "entities")
 
     # --- querystring do paginacji (zachowaj filtry)
     qs_params = request.GET.copy()
@@ -1992,74 +2297,42 @@ def maintenance_protocol_edit(request, pk):
     site = protocol.site
     work_order = protocol.work_order
 
-    # Wszystkie sekcje z punktami
-    sections_qs = (
-        protocol.sections
-        .select_related("system")
-        .prefetch_related("check_items")
-        .order_by("system__sort_order", "system__id", "order", "id")
+    # formularz protokołu + punkty wszystkich sekcji (core/protocol_editor.py)
+    editor = ProtocolEditor(
+        protocol,
+        request.POST if request.method == "POST" else None,
+        sections_order=("system__sort_order", "system__id", "order", "id"),
     )
 
-    if request.method == "POST":
-        form = MaintenanceProtocolForm(request.POST, instance=protocol)
-
-        section_formsets = []
-        is_valid = form.is_valid()
-
-        # 1) Zbuduj wszystkie formsety i sprawdź walidację
-        for section in sections_qs:
-            formset = MaintenanceCheckItemFormSet(
-                request.POST,
-                queryset=section.check_items.all(),
-                prefix=f"section-{section.pk}",
-            )
-            section_formsets.append({"section": section, "formset": formset})
-
-            if not formset.is_valid():
-                is_valid = False
-
-        # 2) Jeśli WSZYSTKO valid -> zapis + redirect
-        if is_valid:
-            form.save()
-
-            # Uwagi sekcji + zapis checklisty
-            for bundle in section_formsets:
-                section = bundle["section"]
-                remarks_field = f"section_{section.pk}_remarks"
-                new_remarks = (request.POST.get(remarks_field) or "").strip()
-
-                if new_remarks != (section.section_remarks or ""):
-                    section.section_remarks = new_remarks
-                    section.save(update_fields=["section_remarks"])
-
-                bundle["formset"].save()
-
-            return redirect("core:maintenance_protocol_detail", pk=protocol.pk)
-
-        # jeśli nie valid -> spadamy na render z błędami (200)
-    else:
-        form = MaintenanceProtocolForm(instance=protocol)
-
-        section_formsets = []
-        for section in sections_qs:
-            formset = MaintenanceCheckItemFormSet(
-                queryset=section.check_items.all(),
-                prefix=f"section-{section.pk}",
-            )
-            section_formsets.append({"section": section, "formset": formset})
+    if request.method == "POST" and editor.is_valid():
+        editor.save()
+        return redirect("core:maintenance_protocol_detail", pk=protocol.pk)
+    # jeśli nie valid -> spadamy na render z błędami (200)
 
     context = {
         "protocol": protocol,
         "site": site,
         "work_order": work_order,
-        "form": form,
-        "section_formsets": section_formsets,
+        "form": editor.form,
+        "section_formsets": editor.section_formsets,
     }
     return render(request, "core/maintenance_protocol_form.html", context)
 
 
 
 
+def _protocol_sections_version(protocol):
+    # jedno zapytanie: sekcje + ich punkty + systemy (kolejność sekcji = system__sort_order)
+    agg = protocol.sections.order_by().aggregate(
+        n=Count("id", distinct=True),
+        last=Max("updated_at"),
+        items=Count("check_items", distinct=True),
+        items_last=Max("check_items__updated_at"),
+        systems_last=Max("system__updated_at"),
+    )
+    return fragment_version(protocol, agg)
+
+
 @login_required
 def maintenance_protocol_detail(request, pk):
     protocol = get_object_or_404(
@@ -2079,6 +2352,7 @@ def maintenance_protocol_detail(request, pk):
         "site": protocol.site,
         "work_order": protocol.work_order,
         "sections": sections,
+        "sections_version": _protocol_sections_version(protocol),
         "can_edit": True,  # na razie prosto – każdy zalogowany; później możemy ograniczyć do biura
         # "can_edit": is_office(request.user),  # jeśli chcesz od razu tylko biuro
     }
@@ -2088,29 +2362,40 @@ def maintenance_protocol_detail(request, pk):
 @xframe_options_sameorigin
 @login_required
 def maintenance_protocol_pdf(request, pk):
-    protocol = get_object_or_404(
-        MaintenanceProtocol.objects.select_related("site", "work_order"),
-        pk=pk,
-    )
+    # jak service_report_pdf: gotowy HTML w cache do zmiany protokołu/sekcji/punktów
+    def build():
+        protocol = get_object_or_404(
+            MaintenanceProtocol.objects.select_related("site", "work_order"),
+            pk=pk,
+        )
 
-    sections = (
-    protocol.sections
-    .select_related("system")
-    .prefetch_related("check_items")
-    .order_by("system__sort_order", "system__id", "order", "id")
-)
+        sections = (
+            protocol.sections
+            .select_related("system")
+            .prefetch_related("check_items")
+            .order_by("system__sort_order", "system__id", "order", "id")
+        )
 
-    base_name = protocol.number or f"KS_{protocol.pk}"
-    safe_name = base_name.replace("/", "_").replace("\\", "_")
+        base_name = protocol.number or f"KS_{protocol.pk}"
+        safe_name = base_name.replace("/", "_").replace("\\", "_")
 
-    context = {
-        "protocol": protocol,
-        "site": protocol.site,
-        "work_order": protocol.work_order,
-        "sections": sections,
-        "download_filename": safe_name,
-    }
-    return render(request, "core/maintenance_protocol_pdf.html", context)
+        context = {
+            "protocol": protocol,
+            "site": protocol.site,
+            "work_order": protocol.work_order,
+            "sections": sections,
+            "sections_version": _protocol_sections_version(protocol),
+            "download_filename": safe_name,
+        }
+        return render_to_string("core/maintenance_protocol_pdf.html", context)
+
+    html = cache_get_or_set(
+        "pdf:maintenanceprotocol",
+        build,
+        pk,
+        namespaces=(f"maintenanceprotocol:{pk}", "workorders", "sites", "systems", "entities", "managers"),
+    )
+    return HttpResponse(html)
 
 
 @login_required
@@ -2152,12 +2437,14 @@ def workorder_toggle_realized(request, pk):
     # Toggle: Realizacja <-> Zrealizowane
     if wo.status == WorkOrder.Status.REALIZED:
         wo.status = WorkOrder.Status.IN_PROGRESS
+        wo.status_actor = request.user
         wo.save(update_fields=["status"])
         messages.success(request, "Status zmieniony na: Realizacja")
         new_label = "Realizacja"
         new_code = WorkOrder.Status.IN_PROGRESS
     else:
         wo.status = WorkOrder.Status.REALIZED
+        wo.status_actor = request.user
         wo.save(update_fields=["status"])
         messages.success(request, "Status zmieniony na: Zrealizowane")
         new_label = "Zrealizowane"
@@ -2183,6 +2470,7 @@ def workorder_set_completed(request, pk):
 
     if wo.status != WorkOrder.Status.COMPLETED:
         wo.status = WorkOrder.Status.COMPLETED
+        wo.status_actor = request.user
         wo.save(update_fields=["status"])
         messages.success(request, "Status zmieniony na: Zakończone")
 
@@ -2199,7 +2487,7 @@ def workorder_events(request):
     if not is_office(request.user):
         return HttpResponseForbidden("Tylko biuro")
 
-    qs = WorkOrderEvent.objects.select_related("work_order", "actor")
+    qs = WorkOrderEvent.objects.notifications().select_related("work_order", "actor")
     return render(request, "core/workorder_events.html", {"events": qs[:200]})
 
 @login_required
@@ -2208,7 +2496,7 @@ def api_workorder_events_unread_count(request):
     if not is_office(request.user):
         return JsonResponse({"count": 0})
 
-    count = WorkOrderEvent.objects.filter(is_read=False).count()
+    count = WorkOrderEvent.objects.notifications().filter(is_read=False).count()
     return JsonResponse({"count": count})
 
 @login_required
@@ -2217,7 +2505,7 @@ def api_workorder_events_unread_latest(request):
         return JsonResponse({"items": []})
 
     qs = (
-        WorkOrderEvent.objects
+        WorkOrderEvent.objects.notifications()
         .filter(is_read=False)
         .select_related("work_order", "actor")
         .order_by("-created_at")[:5]
@@ -2246,7 +2534,7 @@ def workorder_events_mark_all_read(request):
     if not is_office(request.user):
         return HttpResponseForbidden("Tylko biuro")
 
-    WorkOrderEvent.objects.filter(is_read=False).update(is_read=True)
+    WorkOrderEvent.objects.notifications().filter(is_read=False).update(is_read=True)
     messages.success(request, "Oznaczono wszystkie powiadomienia jako przeczytane.")
     return redirect("core:workorder_events")
 
@@ -0,0 +1,85 @@
+from django.contrib import admin
+from django.http import Http404, HttpResponseForbidden
+from django.shortcuts import render
+
+from .db import contention_stats
+from .profiling import get_profiling_settings, get_store
+
+
+def _admin_context(request, title):
+    return {
+        **admin.site.each_context(request),
+        "title": title,
+    }
+
+
+def profile_list(request):
+    """Lista zapisanych profili (tylko superuser), z filtrem po widoku."""
+    if not request.user.is_superuser:
+        return HttpResponseForbidden("Tylko superuser.")
+
+    view_name = (request.GET.get("view") or "").strip()
+    store = get_store()
+
+    all_profiles = store.list()
+    view_choices = sorted({p.get("view_name", "") for p in all_profiles if p.get("view_name")})
+    profiles = [p for p in all_profiles if not view_name or p.get("view_name") == view_name]
+
+    context = {
+        **_admin_context(request, "Profile requestów"),
+        "profiles": profiles,
+        "view_name": view_name,
+        "view_choices": view_choices,
+        "conf": get_profiling_settings(),
+        "contention": contention_stats(),
+    }
+    return render(request, "admin/profiling/profile_list.html", context)
+
+
+def profile_detail(request, profile_id):
+    if not request.user.is_superuser:
+        return HttpResponseForbidden("Tylko superuser.")
+
+    record = get_store().load(profile_id)
+    if record is None:
+        raise Http404("Brak profilu.")
+
+    context = {
+        **_admin_context(request, f"Profil: {record.get('view_name', '')}"),
+        "profile": record,
+    }
+    return render(request, "admin/profiling/profile_detail.html", context)
+
+
+def profile_compare(request):
+    """Porównanie dwóch profili: czasy skumulowane funkcji + liczba/czas SQL."""
+    if not request.user.is_superuser:
+        return HttpResponseForbidden("Tylko superuser.")
+
+    store = get_store()
+    a = store.load(request.GET.get("a", ""))
+    b = store.load(request.GET.get("b", ""))
+    if a is None or b is None:
+        raise Http404("Wybierz dwa istniejące profile (a, b).")
+
+    a_stats = {row["func"]: row for row in a.get("stats", [])}
+    b_stats = {row["func"]: row for row in b.get("stats", [])}
+
+    rows = []
+    for func in set(a_stats) | set(b_stats):
+        a_ms = a_stats.get(func, {}).get("cumtime_ms")
+        b_ms = b_stats.get(func, {}).get("cumtime_ms")
+        delta = None
+        if a_ms is not None and b_ms is not None:
+            delta = round(b_ms - a_ms, 3)
+        rows.append({"func": func, "a_ms": a_ms, "b_ms": b_ms, "delta_ms": delta})
+
+    rows.sort(key=lambda r: max(r["a_ms"] or 0, r["b_ms"] or 0), reverse=True)
+
+    context = {
+        **_admin_context(request, "Porównanie profili"),
+        "a": a,
+        "b": b,
+        "rows": rows,
+    }
+    return render(request, "admin/profiling/profile_compare.html", context)
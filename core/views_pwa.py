@@ -1,22 +1,37 @@
+import functools
+import hashlib
 import json
 
 
-from datetime import date
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
 
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, get_object_or_404, redirect
 
 from django.contrib import messages
 
-from django.http import JsonResponse, HttpRequest, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden
+from django.http import (
+    JsonResponse, HttpRequest, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, HttpResponseNotModified,
+)
+from django.utils.cache import patch_vary_headers
 from django.utils import timezone
-from django.views.decorators.http import require_GET, require_POST
-
+from django.views.decorators.http import condition, require_GET, require_POST
+
+from .cache import get_or_set as cache_get_or_set, namespace_versions
+from .columnar import encode_columnar
+from .compression import choose_encoding, compressed_blob, get_compression_settings
+from .db import retry_on_lock
+from .protocol_editor import ProtocolEditor, apply_patch
+from .pwa_assets import service_worker_context
+from .streaming import JsonArray, chunked, iter_json_object, streaming_json_response
 from .models import Site, System, WorkOrder, ServiceReport, MaintenanceProtocol, WorkOrderEvent
-from .forms import ServiceReportForm, ServiceReportPwaForm, MaintenanceProtocolForm, MaintenanceCheckItemFormSet
+from .forms import ServiceReportForm, ServiceReportPwaForm, MaintenanceProtocolForm
 from django.forms.models import model_to_dict
 
-from django.db.models import Case, When, Value, IntegerField 
+from django.db.models import Case, When, Value, IntegerField, F, Q, Count, Max
 
 from django.urls import reverse
 from django.utils.http import url_has_allowed_host_and_scheme
@@ -44,7 +59,7 @@ def pwa_home(request):
             planned_date=today,
             status__in=[WorkOrder.Status.IN_PROGRESS, WorkOrder.Status.REALIZED],
         )
-        .order_by("planned_time_from", "planned_time_to", "id")
+        .order_by(F("planned_time_from").asc(nulls_first=True), F("planned_time_to").asc(nulls_first=True), "id")
     )
 
     workorders_today = _attach_workorder_system_badges(list(workorders_today))
@@ -60,37 +75,38 @@ def pwa_home(request):
 
 
 
+# pola katalogu PWA – te same dla obiektów modelu i dla projekcji .values()
+SITE_FIELDS = (
+    "id", "name", "street", "postal_code", "city", "google_maps_url",
+    "access_info", "technical_notes", "updated_at",
+)
+SYSTEM_FIELDS = (
+    "id", "site_id", "system_type", "name", "manufacturer", "model", "in_service_contract",
+    "commissioning_date", "last_modernization_date", "location_info", "access_data",
+    "procedures", "notes", "updated_at",
+)
+# kolumny kodowane słownikowo w formacie kolumnowym (mało różnych wartości)
+SITE_DICT_COLUMNS = ("city", "partial")
+SYSTEM_DICT_COLUMNS = ("system_type", "manufacturer", "in_service_contract")
+WORKORDER_DICT_COLUMNS = (
+    "status_code", "status_label", "work_type_code", "work_type_label",
+    "site.city", "site.name", "site.street", "site_id", "site.id",
+)
+
+
+def _isoformat_row(row: dict) -> dict:
+    for key, value in row.items():
+        if hasattr(value, "isoformat"):
+            row[key] = value.isoformat()
+    return row
+
+
 def _serialize_site(site: Site) -> dict:
-    return {
-        "id": site.id,
-        "name": site.name,
-        "street": site.street,
-        "postal_code": site.postal_code,
-        "city": site.city,
-        "google_maps_url": site.google_maps_url,
-        "access_info": site.access_info,
-        "technical_notes": site.technical_notes,
-        "updated_at": site.updated_at.isoformat() if site.updated_at else None,
-    }
+    return _isoformat_row({f: getattr(site, f) for f in SITE_FIELDS})
 
 
 def _serialize_system(system: System) -> dict:
-    return {
-        "id": system.id,
-        "site_id": system.site_id,
-        "system_type": system.system_type,
-        "name": system.name,
-        "manufacturer": system.manufacturer,
-        "model": system.model,
-        "in_service_contract": system.in_service_contract,
-        "commissioning_date": system.commissioning_date.isoformat() if system.commissioning_date else None,
-        "last_modernization_date": system.last_modernization_date.isoformat() if system.last_modernization_date else None,
-        "location_info": system.location_info,
-        "access_data": system.access_data,
-        "procedures": system.procedures,
-        "notes": system.notes,
-        "updated_at": system.updated_at.isoformat() if system.updated_at else None,
-    }
+    return _isoformat_row({f: getattr(system, f) for f in SYSTEM_FIELDS})
 
 def _attach_workorder_system_badges(workorders):
     # mapowanie wartości choices -> label (np. "CCTV", "SSP"...)
@@ -122,7 +138,7 @@ def pwa_workorder_list(request):
             assigned_to=request.user,
             status__in=[WorkOrder.Status.IN_PROGRESS, WorkOrder.Status.REALIZED],
         )
-        .order_by("planned_date", "planned_time_from", "id")
+        .order_by(F("planned_date").asc(nulls_first=True), F("planned_time_from").asc(nulls_first=True), "id")
     )
 
     workorders = _attach_workorder_system_badges(list(qs))
@@ -136,16 +152,168 @@ def pwa_workorder_list(request):
     )
 
 
+# ile wierszy naraz pobieramy z bazy przy strumieniowaniu zrzutów
+STREAM_CHUNK_SIZE = 500
+
+PWA_CATALOG_DEFAULTS = {
+    "SCOPE": "assigned",
+    "DAYS_AHEAD": 30,
+    "DAYS_BACK": 30,
+    "CACHE_TIMEOUT": 3600,
+}
+
+
+def get_pwa_catalog_settings() -> dict:
+    conf = dict(PWA_CATALOG_DEFAULTS)
+    conf.update(getattr(settings, "PWA_CATALOG", {}) or {})
+    return conf
+
+
+def _site_stub(row: dict) -> dict:
+    # skrót do listy/wyszukiwarki – bez danych dostępowych i notatek
+    return {
+        "id": row["id"],
+        "name": row["name"],
+        "street": row["street"],
+        "city": row["city"],
+        "partial": True,
+    }
+
+
+def _catalog_site_ids(user):
+    """
+    Id obiektów, które technik dostaje w pełnej wersji (None = wszystkie):
+    obiekty z otwartych zleceń technika + zleceń z terminem w oknie czasowym.
+    """
+    conf = get_pwa_catalog_settings()
+    if conf["SCOPE"] != "assigned" or is_office(user):
+        return None
+
+    today = timezone.localdate()
+    horizon = Q(
+        planned_date__gte=today - timedelta(days=conf["DAYS_BACK"]),
+        planned_date__lte=today + timedelta(days=conf["DAYS_AHEAD"]),
+    )
+    open_orders = ~Q(status__in=[WorkOrder.Status.COMPLETED, WorkOrder.Status.CANCELLED])
+
+    return set(
+        WorkOrder.objects
+        .filter(assigned_to=user)
+        .filter(open_orders | horizon)
+        .values_list("site_id", flat=True)
+        .order_by()
+        .distinct()
+    )
+
+
+def _catalog_scope_key(site_ids) -> str:
+    if site_ids is None:
+        return "all"
+    digest = hashlib.sha1(",".join(map(str, sorted(site_ids))).encode()).hexdigest()
+    return f"assigned-{digest[:16]}"
+
+
+# zapis/usunięcie Site lub System podbija wersję (core/cache.py)
+CATALOG_NAMESPACES = ("sites", "systems")
+
+
+def _catalog_fingerprint() -> str:
+    """Odcisk wersji katalogu z wersji przestrzeni nazw cache – bez zapytań do bazy."""
+    versions = ".".join(str(v) for v in namespace_versions(CATALOG_NAMESPACES))
+    return hashlib.sha1(versions.encode()).hexdigest()[:16]
+
+
+def _catalog_fields(site_ids, columnar: bool = False) -> dict:
+    sites_qs = Site.objects.order_by("name", "id").values(*SITE_FIELDS)
+    systems_qs = System.objects.order_by("site_id", "system_type", "id").values(*SYSTEM_FIELDS)
+    if site_ids is not None:
+        systems_qs = systems_qs.filter(site_id__in=site_ids)
+
+    def site_rows():
+        for row in sites_qs.iterator(chunk_size=STREAM_CHUNK_SIZE):
+            if site_ids is None or row["id"] in site_ids:
+                yield _isoformat_row(row)
+            else:
+                yield _site_stub(row)
+
+    def system_rows():
+        for row in systems_qs.iterator(chunk_size=STREAM_CHUNK_SIZE):
+            yield _isoformat_row(row)
+
+    if columnar:
+        return {
+            "format": "columnar",
+            "server_time": timezone.now().isoformat(),
+            "scope": "all" if site_ids is None else "assigned",
+            "sites": encode_columnar(
+                site_rows(), dict_columns=SITE_DICT_COLUMNS, columns=SITE_FIELDS + ("partial",)
+            ),
+            "systems": encode_columnar(system_rows(), dict_columns=SYSTEM_DICT_COLUMNS, columns=SYSTEM_FIELDS),
+        }
+
+    return {
+        "server_time": timezone.now().isoformat(),
+        "scope": "all" if site_ids is None else "assigned",
+        "sites": JsonArray(site_rows()),
+        "systems": JsonArray(system_rows()),
+    }
+
+
 @require_GET
 @login_required
-def api_pwa_catalog_dump(request: HttpRequest) -> JsonResponse:
-    sites_qs = Site.objects.all().order_by("name", "id")
-    systems_qs = System.objects.all().order_by("site_id", "system_type", "id")
+def api_pwa_catalog_dump(request: HttpRequest) -> HttpResponse:
+    """
+    Katalog obiektów i systemów dla PWA.
+
+    ?format=columnar – tabele kolumnowe (core/columnar.py) zamiast listy obiektów;
+    składane w pamięci, więc tylko na żądanie – domyślnie strumień wierszy.
+    Klient z Accept-Encoding dostaje skompresowany blob z cache – wspólny dla
+    wszystkich techników o tym samym zakresie i tej samej wersji katalogu
+    (server_time = moment zbudowania bloba). Bez kompresji – zwykły strumień.
+    """
+    site_ids = _catalog_site_ids(request.user)
+    columnar = request.GET.get("format") == "columnar"
+    encoding = choose_encoding(request)
+    if not encoding or not get_compression_settings()["ENABLED"]:
+        return streaming_json_response(_catalog_fields(site_ids, columnar))
+
+    fmt = "col" if columnar else "rows"
+    scope = _catalog_scope_key(site_ids)
+    etag = f'"{scope}-{_catalog_fingerprint()}-{fmt}-{encoding}"'
+
+    if etag in request.headers.get("If-None-Match", ""):
+        response = HttpResponseNotModified()
+    else:
+        blob = cache_get_or_set(
+            "pwa_catalog",
+            lambda: compressed_blob(iter_json_object(_catalog_fields(site_ids, columnar)), encoding),
+            scope,
+            fmt,
+            encoding,
+            namespaces=CATALOG_NAMESPACES,
+            timeout=get_pwa_catalog_settings()["CACHE_TIMEOUT"],
+        )
+
+        response = HttpResponse(blob, content_type="application/json")
+        response["Content-Encoding"] = encoding
+        response["Content-Length"] = str(len(blob))
+
+    response["ETag"] = etag
+    patch_vary_headers(response, ("Accept-Encoding", "Cookie"))
+    return response
+
+
+@require_GET
+@login_required
+def api_pwa_catalog_site(request: HttpRequest, pk: int) -> JsonResponse:
+    """Pełne dane jednego obiektu + jego systemy (PWA dociąga obiekty spoza zakresu)."""
+    site = get_object_or_404(Site, pk=pk)
+    systems_qs = System.objects.filter(site=site).order_by("system_type", "id")
 
     return JsonResponse(
         {
             "server_time": timezone.now().isoformat(),
-            "sites": [_serialize_site(s) for s in sites_qs],
+            "site": _serialize_site(site),
             "systems": [_serialize_system(x) for x in systems_qs],
         }
     )
@@ -168,64 +336,16 @@ def pwa_objects(request):
 
 @require_GET
 def pwa_sw(request):
-    js = r"""
-const CACHE_NAME = "allsec-pwa-shell-v5";
-const SHELL_URLS = [
-  "/pwa/",
-  "/pwa/zlecenia/",
-  "/pwa/obiekty/",
-  "/static/css/main.css",
-  "/static/pwa/pwa.js",
-  "/static/pwa/idb.js",
-  "/static/pwa/objects.js",
-];
-
-self.addEventListener("install", (event) => {
-  event.waitUntil(caches.open(CACHE_NAME).then((cache) => cache.addAll(SHELL_URLS)));
-  self.skipWaiting();
-});
-
-self.addEventListener("activate", (event) => {
-  event.waitUntil(
-    caches.keys().then((keys) => Promise.all(keys.map((k) => (k === CACHE_NAME ? null : caches.delete(k)))))
-  );
-  self.clients.claim();
-});
-
-self.addEventListener("fetch", (event) => {
-  const req = event.request;
-  const url = new URL(req.url);
-
-  if (url.origin !== self.location.origin) return;
-  if (req.method !== "GET") return;
-  if (url.pathname.startsWith("/api/")) return; // dane są w IndexedDB
-
-  // NAWIGACJA (HTML) -> offline fallback na /pwa/
-  if (req.mode === "navigate") {
-    event.respondWith(
-      fetch(req).catch(async () => {
-        const cached = await caches.match(url.pathname, { ignoreSearch: true });
-        return cached || caches.match("/pwa/", { ignoreSearch: true });
-      })
-    );
-    return;
-  }
-
-  // STATYKI / PWA -> cache-first
-  event.respondWith(
-    caches.match(req, { ignoreSearch: true }).then((cached) => {
-      if (cached) return cached;
-      return fetch(req).then((resp) => {
-        if (url.pathname.startsWith("/static/") || url.pathname.startsWith("/pwa/")) {
-          caches.open(CACHE_NAME).then((cache) => cache.put(req, resp.clone()));
-        }
-        return resp;
-      });
-    })
-  );
-});
-"""
-    return HttpResponse(js, content_type="application/javascript")
+    """Service Worker z listą precache z manifestu statyk (core/pwa_assets.py)."""
+    response = render(
+        request,
+        "pwa/sw.js",
+        service_worker_context(),
+        content_type="application/javascript",
+    )
+    # przeglądarka i tak sprawdza SW co 24h, ale bez cache od razu widzi nową wersję
+    response["Cache-Control"] = "no-cache"
+    return response
 
 @require_GET
 @login_required
@@ -238,76 +358,211 @@ def api_pwa_workorders_dump(request):
     user = request.user
 
     qs = (
-        WorkOrder.objects.select_related("site", "assigned_to")
-        .prefetch_related("systems")
-        .filter(assigned_to=request.user)
+        WorkOrder.objects
+        .filter(assigned_to=user)
         .filter(status__in=[WorkOrder.Status.IN_PROGRESS, WorkOrder.Status.REALIZED])
-        .order_by("planned_date", "planned_time_from", "id")
-)
+    )
+
+    # protokoły serwisowe tworzymy z góry tylko dla zleceń, które ich jeszcze nie mają
+    # (zapis przed strumieniowaniem – generator nie powinien pisać do bazy)
+    missing_sr = qs.filter(work_type=WorkOrder.WorkOrderType.SERVICE, service_report__isnull=True)
+    for wo_id in missing_sr.values_list("id", flat=True):
+        ServiceReport.objects.get_or_create(work_order_id=wo_id)
+
+    rows_qs = (
+        qs.order_by(F("planned_date").asc(nulls_first=True), F("planned_time_from").asc(nulls_first=True), "id")
+        .values(
+            "id", "title", "status", "work_type", "planned_date", "planned_time_from", "planned_time_to",
+            "updated_at", "number", "description", "site_id",
+            "site__name", "site__street", "site__city",
+        )
+    )
 
     type_labels = dict(System._meta.get_field("system_type").choices)
+    status_labels = dict(WorkOrder.Status.choices)
+    work_type_labels = dict(WorkOrder.WorkOrderType.choices)
+    WorkOrderSystem = WorkOrder.systems.through
+
+    def workorder_rows():
+        for chunk in chunked(rows_qs.iterator(chunk_size=STREAM_CHUNK_SIZE), STREAM_CHUNK_SIZE):
+            ids = [row["id"] for row in chunk]
+
+            # systemy i protokoły dla całej paczki – po jednym zapytaniu
+            systems_by_wo = {}
+            for wo_id, system_id, system_type in (
+                WorkOrderSystem.objects
+                .filter(workorder_id__in=ids)
+                .order_by("system__sort_order", "system_id")
+                .values_list("workorder_id", "system_id", "system__system_type")
+            ):
+                systems_by_wo.setdefault(wo_id, []).append((system_id, system_type))
+
+            sr_by_wo = {
+                wo_id: (sr_id, sr_number)
+                for wo_id, sr_id, sr_number in ServiceReport.objects
+                .filter(work_order_id__in=ids)
+                .values_list("work_order_id", "id", "number")
+            }
+            mp_by_wo = dict(
+                MaintenanceProtocol.objects
+                .filter(work_order_id__in=ids)
+                .values_list("work_order_id", "id")
+            )
 
-    workorders = []
-    for wo in qs:
-        site = wo.site
+            for row in chunk:
+                systems = systems_by_wo.get(row["id"], [])
+
+                seen = set()
+                labels = []
+                for _system_id, k in systems:
+                    if k in seen:
+                        continue
+                    seen.add(k)
+                    labels.append(type_labels.get(k, k))
+
+                sr_id = sr_number = None
+                if row["work_type"] == WorkOrder.WorkOrderType.SERVICE:
+                    sr_id, sr_number = sr_by_wo.get(row["id"], (None, None))
+
+                site_id = row["site_id"]
+                yield {
+                    "id": row["id"],
+                    "title": row["title"],
+
+                    "status_code": row["status"],
+                    "status_label": status_labels.get(row["status"], row["status"]),
+
+                    "work_type_label": work_type_labels.get(row["work_type"], row["work_type"]),
+                    "work_type_code": row["work_type"],
+                    "planned_date": row["planned_date"].isoformat() if row["planned_date"] else None,
+                    "planned_time_from": row["planned_time_from"].strftime("%H:%M") if row["planned_time_from"] else None,
+                    "planned_time_to": row["planned_time_to"].strftime("%H:%M") if row["planned_time_to"] else None,
+
+                    "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
+
+                    "site": {
+                        "id": site_id,
+                        "name": row["site__name"],
+                        "street": row["site__street"],
+                        "city": row["site__city"],
+                    },
+
+                    "system_badges": labels[:4],
+                    "system_badges_more": max(0, len(labels) - 4),
+
+                    "number": row["number"],
+                    "description": row["description"],
+                    "site_id": site_id,
+
+                    "system_ids": [system_id for system_id, _k in systems],
+
+                    "service_report_id": sr_id,
+                    "service_report_number": sr_number,
+
+                    "maintenance_protocol_id": (
+                        mp_by_wo.get(row["id"])
+                        if row["work_type"] == WorkOrder.WorkOrderType.MAINTENANCE else None
+                    ),
+                }
+
+    if request.GET.get("format") == "columnar":
+        return streaming_json_response({
+            "format": "columnar",
+            "workorders": encode_columnar(workorder_rows(), dict_columns=WORKORDER_DICT_COLUMNS),
+        })
 
-        seen = set()
-        labels = []
+    return streaming_json_response({"workorders": JsonArray(workorder_rows())})
 
-        sr_id = None
-        sr_number = None
-        if wo.work_type == WorkOrder.WorkOrderType.SERVICE:
-            sr, _created = ServiceReport.objects.get_or_create(work_order=wo)
-            sr_id = sr.id
-            sr_number = sr.number
 
-        for s in wo.systems.all():
-            k = s.system_type
-            if k in seen:
-                continue
-            seen.add(k)
-            labels.append(type_labels.get(k, k))
 
-        workorders.append({
-            "id": wo.id,
-            "title": wo.title,
+# ==========================
+#  WARUNKOWE GET STRON PWA (ETag / Last-Modified -> 304)
+# ==========================
 
-            "status_code": wo.status,
-            "status_label": wo.get_status_display(),
+@functools.lru_cache(maxsize=1)
+def _pwa_templates_stamp() -> float:
+    # po wdrożeniu nowych szablonów stare kopie stron w telefonach muszą się unieważnić
+    stamps = [p.stat().st_mtime for p in (Path(settings.BASE_DIR) / "templates" / "pwa").glob("*.html")]
+    return max(stamps, default=0.0)
 
-            "work_type_label": wo.get_work_type_display(),
-            "work_type_code": wo.work_type,
-            "planned_date": wo.planned_date.isoformat() if wo.planned_date else None,
-            "planned_time_from": wo.planned_time_from.strftime("%H:%M") if wo.planned_time_from else None,
-            "planned_time_to": wo.planned_time_to.strftime("%H:%M") if wo.planned_time_to else None,
 
-            "updated_at": wo.updated_at.isoformat() if getattr(wo, "updated_at", None) else None,
+def pwa_page_condition(state_func):
+    """
+    Dekorator strony PWA: state_func(request, pk) zwraca listę znaczników
+    zmian (np. updated_at) albo None (brak obiektu – widok sam zwróci 404/403).
 
-            "site": {
-                "id": site.id if site else None,
-                "name": site.name if site else None,
-                "street": site.street if site else None,
-                "city": site.city if site else None,
-            },
+    ETag = skrót ze znaczników + użytkownik + token CSRF (strona ma formularz,
+    po ponownym logowaniu token się zmienia) + pełny URL + wersja szablonów.
+    Przy zgodnym If-None-Match / If-Modified-Since widok w ogóle się nie wykonuje.
+    """
 
-            "system_badges": labels[:4],
-            "system_badges_more": max(0, len(labels) - 4),
+    def _state(request, *args, **kwargs):
+        cached = getattr(request, "_pwa_page_state", None)
+        if cached is None:
+            stamps = state_func(request, *args, **kwargs)
+            if stamps is None:
+                cached = (None, None)
+            else:
+                parts = [
+                    *(s.isoformat() if hasattr(s, "isoformat") else str(s) for s in stamps),
+                    str(request.user.pk),
+                    request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+                    request.get_full_path(),
+                    str(_pwa_templates_stamp()),
+                ]
+                etag = hashlib.sha1("|".join(parts).encode()).hexdigest()[:24]
+                moments = [s for s in stamps if isinstance(s, datetime)]
+                moments.append(
+                    datetime.fromtimestamp(_pwa_templates_stamp(), tz=dt_timezone.utc)
+                )
+                cached = (etag, max(moments))
+            request._pwa_page_state = cached
+        return cached
+
+    return condition(
+        etag_func=lambda request, *a, **kw: _state(request, *a, **kw)[0],
+        last_modified_func=lambda request, *a, **kw: _state(request, *a, **kw)[1],
+    )
 
-            "number": wo.number,
-            "description": wo.description,
-            "site_id": site.id if site else None,
 
-            "system_ids": [s.id for s in wo.systems.all()],
+def _workorder_detail_state(request, pk):
+    row = (
+        WorkOrder.objects
+        .filter(pk=pk, assigned_to=request.user)
+        .annotate(systems_last=Max("systems__updated_at"), systems_count=Count("systems"))
+        .values(
+            "updated_at", "site__updated_at", "systems_last", "systems_count",
+            "service_report__updated_at", "maintenance_protocol__updated_at",
+        )
+        .first()
+    )
+    return None if row is None else list(row.values())
 
-            "service_report_id": sr_id,
-            "service_report_number": sr_number,
-        })
 
-    return JsonResponse({"workorders": workorders})
+def _servicereport_edit_state(request, pk):
+    row = (
+        ServiceReport.objects
+        .filter(pk=pk)
+        .values("updated_at", "work_order__updated_at", "work_order__site__updated_at")
+        .first()
+    )
+    return None if row is None else list(row.values())
 
 
+def _maintenanceprotocol_edit_state(request, pk):
+    # każdy zapis punktów/sekcji (ProtocolEditor.save, apply_patch) podbija też
+    # updated_at protokołu, więc jego znacznik wystarcza
+    row = (
+        MaintenanceProtocol.objects
+        .filter(pk=pk)
+        .values("updated_at", "work_order__updated_at", "site__updated_at")
+        .first()
+    )
+    return None if row is None else list(row.values())
+
 
 @login_required
+@pwa_page_condition(_workorder_detail_state)
 def pwa_workorder_detail(request, pk: int):
     wo = get_object_or_404(
         WorkOrder.objects.select_related("site").prefetch_related("systems"),
@@ -327,10 +582,7 @@ def pwa_workorder_detail(request, pk: int):
     sr = None
     sr_id = None
     if wo.work_type == WorkOrder.WorkOrderType.SERVICE:
-        sr, _created = ServiceReport.objects.get_or_create(
-            work_order=wo,
-            defaults={"created_by": request.user},
-        )
+        sr, _created = ServiceReport.objects.get_or_create(work_order=wo)
         sr_id = sr.pk
 
     mp = None
@@ -361,10 +613,7 @@ def pwa_servicereport_entry(request, pk):
     # TODO: tu wstaw swoje zasady dostępu (np. assigned_to albo biuro)
     # if not can_access_workorder(request.user, wo): ...
 
-    sr, created = ServiceReport.objects.get_or_create(
-        work_order=wo,
-        defaults={"created_by": request.user},
-    )
+    sr, created = ServiceReport.objects.get_or_create(work_order=wo)
     back = request.GET.get("back", "")
     edit_url = reverse("core:pwa_servicereport_edit", args=[sr.pk])
 
@@ -379,6 +628,7 @@ def pwa_servicereport_entry(request, pk):
 
 
 @login_required
+@pwa_page_condition(_servicereport_edit_state)
 def pwa_servicereport_edit(request, pk):
     sr = get_object_or_404(ServiceReport, pk=pk)
     wo = sr.work_order
@@ -412,6 +662,7 @@ def pwa_servicereport_edit(request, pk):
 
 @require_POST
 @login_required
+@retry_on_lock
 def api_pwa_servicereport_save(request):
     try:
         payload = json.loads(request.body.decode("utf-8") or "{}")
@@ -508,6 +759,7 @@ def pwa_maintenanceprotocol_entry(request, pk):
     return redirect(edit_url)
 
 @login_required
+@pwa_page_condition(_maintenanceprotocol_edit_state)
 def pwa_maintenanceprotocol_edit(request, pk):
     protocol = get_object_or_404(
         MaintenanceProtocol.objects.select_related("site", "work_order"),
@@ -520,8 +772,6 @@ def pwa_maintenanceprotocol_edit(request, pk):
     if not (request.user.is_superuser or request.user.is_staff or assigned_id == request.user.id):
         return HttpResponseForbidden("Not allowed")
 
-    sections_qs = protocol.sections.all().prefetch_related("check_items")
-
     back = request.GET.get("back", "")
     back_url = reverse("core:pwa_workorder_detail", args=[work_order.pk])
 
@@ -532,49 +782,12 @@ def pwa_maintenanceprotocol_edit(request, pk):
     ):
         back_url = back
 
-    if request.method == "POST":
-        form = MaintenanceProtocolForm(request.POST, instance=protocol)
-
-        section_formsets = []
-        is_valid = form.is_valid()
-
-        for section in sections_qs:
-            formset = MaintenanceCheckItemFormSet(
-                request.POST,
-                queryset=section.check_items.all(),
-                prefix=f"section-{section.pk}",
-            )
-            section_formsets.append({"section": section, "formset": formset})
-            if not formset.is_valid():
-                is_valid = False
-
-        if is_valid:
-            form.save()
-
-            for bundle in section_formsets:
-                section = bundle["section"]
-                remarks_field = f"section_{section.pk}_remarks"
-                new_remarks = (request.POST.get(remarks_field) or "").strip()
-
-                if new_remarks != (section.section_remarks or ""):
-                    section.section_remarks = new_remarks
-                    section.save(update_fields=["section_remarks"])
-
-                bundle["formset"].save()
-
-            messages.success(request, "Zapisano protokół konserwacji.")
-            return redirect(back_url)
+    editor = ProtocolEditor(protocol, request.POST if request.method == "POST" else None)
 
-    else:
-        form = MaintenanceProtocolForm(instance=protocol)
-
-        section_formsets = []
-        for section in sections_qs:
-            formset = MaintenanceCheckItemFormSet(
-                queryset=section.check_items.all(),
-                prefix=f"section-{section.pk}",
-            )
-            section_formsets.append({"section": section, "formset": formset})
+    if request.method == "POST" and editor.is_valid():
+        editor.save()
+        messages.success(request, "Zapisano protokół konserwacji.")
+        return redirect(back_url)
 
     return render(
         request,
@@ -583,14 +796,15 @@ def pwa_maintenanceprotocol_edit(request, pk):
             "protocol": protocol,
             "site": site,
             "work_order": work_order,
-            "form": form,
-            "section_formsets": section_formsets,
+            "form": editor.form,
+            "section_formsets": editor.section_formsets,
             "back_url": back_url,
         },
     )
 
 @require_POST
 @login_required
+@retry_on_lock
 def api_pwa_maintenanceprotocol_save(request):
     try:
         payload = json.loads(request.body.decode("utf-8") or "{}")
@@ -625,44 +839,18 @@ def api_pwa_maintenanceprotocol_save(request):
         if k not in data:
             data[k] = base.get(k)
 
-    form = MaintenanceProtocolForm(data=data, instance=protocol)
-
-    sections_qs = protocol.sections.all().prefetch_related("check_items")
-    bundles = []
-    is_valid = form.is_valid()
-
-    for section in sections_qs:
-        fs = MaintenanceCheckItemFormSet(
-            data=data,
-            queryset=section.check_items.all(),
-            prefix=f"section-{section.pk}",
-        )
-        bundles.append((section, fs))
-        if not fs.is_valid():
-            is_valid = False
-
-    if not is_valid:
+    editor = ProtocolEditor(protocol, data)
+    if not editor.is_valid():
         return JsonResponse(
             {
                 "ok": False,
-                "form_errors": form.errors,
-                "section_errors": [
-                    {"section_id": s.pk, "errors": fs.errors, "non_form_errors": fs.non_form_errors()}
-                    for (s, fs) in bundles
-                    if (fs.errors or fs.non_form_errors())
-                ],
+                "form_errors": editor.form.errors,
+                "section_errors": editor.section_errors(),
             },
             status=400,
         )
 
-    saved = form.save()
-
-    for (section, fs) in bundles:
-        remarks = (data.get(f"section_{section.pk}_remarks") or "").strip()
-        if remarks != (section.section_remarks or ""):
-            section.section_remarks = remarks
-            section.save(update_fields=["section_remarks"])
-        fs.save()
+    saved = editor.save()
 
     updated_at = getattr(saved, "updated_at", None)
     return JsonResponse(
@@ -675,6 +863,41 @@ def api_pwa_maintenanceprotocol_save(request):
 
 @require_POST
 @login_required
+@retry_on_lock
+def api_pwa_maintenanceprotocol_patch(request, pk: int):
+    """
+    Zapis zmian protokołu z PWA w JSON – tylko to, co technik zmienił:
+    {"wo_id": 7, "protocol": {...}, "items": [{"id", "result", "note"}], "sections": [{"id", "remarks"}]}
+    (szczegóły: core/protocol_editor.py: apply_patch). Zastępuje wysyłanie całego formsetu
+    do api_pwa_maintenanceprotocol_save (zostaje dla starych wpisów outboxa).
+    """
+    try:
+        payload = json.loads(request.body.decode("utf-8") or "{}")
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return HttpResponseBadRequest("Bad JSON")
+    if not isinstance(payload, dict):
+        return HttpResponseBadRequest("Bad JSON")
+
+    protocol = get_object_or_404(MaintenanceProtocol.objects.select_related("work_order"), pk=pk)
+
+    wo_id = payload.get("wo_id")
+    if wo_id and str(protocol.work_order_id) != str(wo_id):
+        return HttpResponseBadRequest("WorkOrder mismatch")
+
+    assigned_id = getattr(protocol.work_order, "assigned_to_id", None)
+    if not (request.user.is_superuser or request.user.is_staff or assigned_id == request.user.id):
+        return HttpResponseForbidden("Not allowed")
+
+    saved, errors = apply_patch(protocol, payload)
+    if errors:
+        return JsonResponse({"ok": False, "errors": errors}, status=400)
+
+    return JsonResponse({"ok": True, "mp_id": saved.pk, "updated_at": saved.updated_at.isoformat()})
+
+
+@require_POST
+@login_required
+@retry_on_lock
 def api_pwa_workorder_set_status(request, pk: int):
     wo = get_object_or_404(WorkOrder, pk=pk)
 
@@ -692,24 +915,13 @@ def api_pwa_workorder_set_status(request, pk: int):
     if new_status not in allowed:
         return HttpResponseBadRequest("Niedozwolony status")
 
-    old_status = wo.status
-    if old_status != new_status:
+    if wo.status != new_status:
+        # zdarzenie (i powiadomienie dla biura, gdy zmienia przypisany serwisant) zapisuje WorkOrder.save()
         wo.status = new_status
+        wo.status_actor = request.user
+        wo.status_source = WorkOrderEvent.Source.PWA
         wo.save(update_fields=["status", "updated_at"])
 
-        # powiadomienie dla biura: gdy zmiana jest wykonana przez przypisanego serwisanta
-        if request.user.id == wo.assigned_to_id:
-            WorkOrderEvent.objects.create(
-                work_order=wo,
-                actor=request.user,
-                kind=WorkOrderEvent.Kind.STATUS_CHANGE,
-                old_status=old_status,
-                new_status=new_status,
-                source="PWA",
-                is_read=False,
-            )
-
-
     return JsonResponse({
         "id": wo.id,
         "status_code": wo.status,
@@ -2,7 +2,7 @@
 // Minimalny helper IndexedDB bez bibliotek zewnętrznych.
 
 const DB_NAME = "allsec_pwa";
-const DB_VERSION = 4;
+const DB_VERSION = 5;
 
 function openDb() {
   return new Promise((resolve, reject) => {
@@ -45,6 +45,13 @@ function openDb() {
           db.createObjectStore("mp_drafts", { keyPath: "mp_id" });
         }
       }
+
+      if (oldVersion < 5) {
+        // indeks wyszukiwarki obiektów (search.js) – wpis na obiekt, aktualizowany przy SYNC
+        if (!db.objectStoreNames.contains("site_search")) {
+          db.createObjectStore("site_search", { keyPath: "id" });
+        }
+      }
     };
 
     req.onsuccess = () => resolve(req.result);
@@ -61,6 +68,39 @@ function txDone(tx) {
   });
 }
 
+// Dekoder formatu kolumnowego z /api/pwa/...?format=columnar (core/columnar.py):
+// { columns, dicts, count, data } -> lista obiektów; "site.city" -> { site: { city } }.
+export function decodeColumnar(table) {
+  if (!table) return [];
+  if (Array.isArray(table)) return table; // stary format (lista obiektów)
+
+  const columns = table.columns || [];
+  const data = table.data || {};
+  const dicts = table.dicts || {};
+  const count = table.count || 0;
+
+  const paths = columns.map((name) => name.split("."));
+  const rows = new Array(count);
+
+  for (let i = 0; i < count; i++) {
+    const row = {};
+    for (let c = 0; c < columns.length; c++) {
+      const name = columns[c];
+      const dict = dicts[name];
+      const value = dict ? dict[data[name][i]] : data[name][i];
+
+      const path = paths[c];
+      let target = row;
+      for (let p = 0; p < path.length - 1; p++) {
+        target = target[path[p]] || (target[path[p]] = {});
+      }
+      target[path[path.length - 1]] = value;
+    }
+    rows[i] = row;
+  }
+  return rows;
+}
+
 export async function putMany(storeName, items) {
   const db = await openDb();
   const tx = db.transaction([storeName], "readwrite");
@@ -70,6 +110,15 @@ export async function putMany(storeName, items) {
   db.close();
 }
 
+export async function deleteMany(storeName, keys) {
+  const db = await openDb();
+  const tx = db.transaction([storeName], "readwrite");
+  const store = tx.objectStore(storeName);
+  for (const key of keys) store.delete(key);
+  await txDone(tx);
+  db.close();
+}
+
 export async function clearStore(storeName) {
   const db = await openDb();
   const tx = db.transaction([storeName], "readwrite");
@@ -113,6 +162,19 @@ export async function getAll(storeName) {
   return result;
 }
 
+export async function countStore(storeName) {
+  const db = await openDb();
+  const tx = db.transaction([storeName], "readonly");
+  const req = tx.objectStore(storeName).count();
+  const result = await new Promise((resolve, reject) => {
+    req.onsuccess = () => resolve(req.result);
+    req.onerror = () => reject(req.error);
+  });
+
+  db.close();
+  return result;
+}
+
 export async function getByKey(storeName, key) {
   const db = await openDb();
   const tx = db.transaction([storeName], "readonly");
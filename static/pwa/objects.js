@@ -1,4 +1,5 @@
-import { getAll, getByKey, getAllByIndex } from "./idb.js";
+import { getByKey, getAllByIndex, putMany } from "./idb.js";
+import { loadSiteIndex, searchSites, syncSiteIndex } from "./search.js";
 
 function esc(s) {
   return String(s ?? "")
@@ -18,6 +19,29 @@ function qs() {
   return new URLSearchParams(window.location.search);
 }
 
+// Katalog w trybie "assigned" ma pełne dane tylko obiektów ze zleceń technika,
+// pozostałe są skrótem (partial: true) – szczegóły dociągamy przy otwarciu.
+async function fetchFullSite(siteId) {
+  try {
+    const resp = await fetch(`/api/pwa/catalog/sites/${siteId}/`, {
+      method: "GET",
+      headers: { "Accept": "application/json" },
+      credentials: "same-origin",
+      cache: "no-store",
+    });
+    if (!resp.ok) return null;
+    const data = await resp.json();
+    if (!data.site) return null;
+
+    await putMany("sites", [data.site]);
+    await putMany("systems", data.systems || []);
+    await syncSiteIndex([data.site], { prune: false });
+    return data.site;
+  } catch (e) {
+    return null;
+  }
+}
+
 function setQuerySiteId(siteId) {
   const url = new URL(window.location.href);
   if (siteId) url.searchParams.set("site", String(siteId));
@@ -26,52 +50,86 @@ function setQuerySiteId(siteId) {
 }
 
 
+// Lista wirtualna: stała wysokość wiersza, w DOM tylko karty widoczne w oknie
+// (+ zapas), przewijanie strony – przy kilku tysiącach obiektów DOM zostaje mały.
+const ROW_HEIGHT = 92; // px, karta + odstęp
+const OVERSCAN = 6;
+const SEARCH_DEBOUNCE_MS = 120;
+
+let detachList = null;
+
+function siteRow(s, i) {
+  return `
+    <button class="card pwa-card text-start border-0 position-absolute start-0 end-0" data-site="${esc(s.id)}"
+            style="top:${i * ROW_HEIGHT}px;height:${ROW_HEIGHT - 8}px;cursor:pointer;">
+      <div class="card-body py-2 w-100 overflow-hidden">
+        <div class="fw-semibold text-truncate">${esc(s.name)}</div>
+        <div class="small pwa-muted text-truncate">${esc(s.street)}${s.street && s.city ? ", " : ""}${esc(s.city)}</div>
+        ${s.partial ? `<div class="small pwa-muted">Szczegóły tylko online</div>` : ""}
+      </div>
+    </button>
+  `;
+}
+
+function mountVirtualList(list, sites) {
+  let first = -1;
+  let last = -1;
+  let frame = 0;
+
+  const paint = () => {
+    frame = 0;
+    const top = list.getBoundingClientRect().top;
+    const from = Math.max(0, Math.floor(-top / ROW_HEIGHT) - OVERSCAN);
+    const to = Math.min(sites.length, Math.ceil((window.innerHeight - top) / ROW_HEIGHT) + OVERSCAN);
+    if (from === first && to === last) return;
+    first = from;
+    last = to;
+
+    let html = "";
+    for (let i = from; i < to; i++) html += siteRow(sites[i], i);
+    list.innerHTML = html;
+  };
+  const schedule = () => {
+    if (!frame) frame = requestAnimationFrame(paint);
+  };
+
+  window.addEventListener("scroll", schedule, { passive: true });
+  window.addEventListener("resize", schedule);
+  paint();
+
+  return () => {
+    window.removeEventListener("scroll", schedule);
+    window.removeEventListener("resize", schedule);
+    if (frame) cancelAnimationFrame(frame);
+  };
+}
+
+function unmountList() {
+  if (detachList) detachList();
+  detachList = null;
+}
+
 async function renderList() {
   const root = document.getElementById("viewRoot");
   const searchBox = document.getElementById("searchBox");
   if (!root) return;
 
-  const allSites = await getAll("sites");
-  const q = (searchBox?.value || "").trim().toLowerCase();
-
-  const filtered = !q
-    ? allSites
-    : allSites.filter((s) => {
-        const hay = `${s.name ?? ""} ${s.street ?? ""} ${s.city ?? ""}`.toLowerCase();
-        return hay.includes(q);
-      });
-
-  filtered.sort((a, b) => String(a.name || "").localeCompare(String(b.name || ""), "pl"));
+  const index = await loadSiteIndex();
+  // w międzyczasie (pierwsze ładowanie indeksu) mógł się otworzyć obiekt
+  if (qs().get("site")) return;
+  const filtered = searchSites(index, searchBox?.value || "");
 
+  unmountList();
   if (!filtered.length) {
     root.innerHTML = `<div class="alert alert-light border">Brak wyników.</div>`;
     return;
   }
 
   root.innerHTML = `
-    <div class="d-grid gap-2">
-      ${filtered
-        .map(
-          (s) => `
-        <button class="card pwa-card text-start border-0" data-site="${esc(s.id)}" style="cursor:pointer;">
-          <div class="card-body">
-            <div class="fw-semibold">${esc(s.name)}</div>
-            <div class="small pwa-muted">${esc(s.street)}${s.street && s.city ? ", " : ""}${esc(s.city)}</div>
-          </div>
-        </button>
-      `
-        )
-        .join("")}
-    </div>
+    <div class="small pwa-muted mb-2">Obiektów: ${filtered.length}</div>
+    <div id="siteList" class="position-relative" style="height:${filtered.length * ROW_HEIGHT}px;"></div>
   `;
-
-  root.querySelectorAll("[data-site]").forEach((btn) => {
-    btn.addEventListener("click", async () => {
-      const siteId = Number(btn.getAttribute("data-site"));
-      setQuerySiteId(siteId);
-      await render();
-    });
-  });
+  detachList = mountVirtualList(document.getElementById("siteList"), filtered);
 }
 
 async function renderDetail(siteId) {
@@ -79,11 +137,31 @@ async function renderDetail(siteId) {
   const searchBox = document.getElementById("searchBox");
   if (!root) return;
 
-  const site = await getByKey("sites", siteId);
+  unmountList();
+
+  let site = await getByKey("sites", siteId);
+  if (!site || site.partial) {
+    root.innerHTML = `<div class="alert alert-light border">Pobieranie danych obiektu…</div>`;
+    site = (await fetchFullSite(siteId)) || site;
+  }
   if (!site) {
     root.innerHTML = `<div class="alert alert-warning border">Nie znaleziono obiektu w offline cache. Zrób SYNC.</div>`;
     return;
   }
+  if (site.partial) {
+    root.innerHTML = `
+      <div class="alert alert-warning border">
+        <div class="fw-semibold">${esc(site.name)}</div>
+        Szczegóły tego obiektu nie są zapisane offline. Otwórz go ponownie, gdy będzie połączenie.
+      </div>
+      <button class="btn btn-outline-secondary pwa-btn" id="backToList">Lista</button>
+    `;
+    document.getElementById("backToList")?.addEventListener("click", async () => {
+      setQuerySiteId(null);
+      await render();
+    });
+    return;
+  }
 
   const systems = await getAllByIndex("systems", "by_site_id", siteId);
   systems.sort((a, b) => String(a.system_type || "").localeCompare(String(b.system_type || ""), "pl"));
@@ -196,10 +274,23 @@ export async function initPwaObjects() {
 
   window.addEventListener("popstate", render);
 
+  // jeden listener na liście – wiersze wirtualnej listy są co chwilę podmieniane
+  document.getElementById("viewRoot")?.addEventListener("click", async (e) => {
+    const btn = e.target.closest("[data-site]");
+    if (!btn) return;
+    setQuerySiteId(Number(btn.getAttribute("data-site")));
+    window.scrollTo(0, 0);
+    await render();
+  });
+
   const searchBox = document.getElementById("searchBox");
   if (searchBox) {
+    let timer = 0;
     searchBox.addEventListener("input", () => {
-      if (!qs().get("site")) render();
+      clearTimeout(timer);
+      timer = setTimeout(() => {
+        if (!qs().get("site")) render();
+      }, SEARCH_DEBOUNCE_MS);
     });
   }
 }
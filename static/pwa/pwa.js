@@ -1,24 +1,26 @@
 // core/static/pwa/pwa.js
 import {
-  clearStore, putMany, setMeta, getMeta, getAll, getByKey,
+  clearStore, putMany, setMeta, getMeta, getAll, getByKey, decodeColumnar,
   putSrDraft, getSrDraft,
   putMpDraft, getMpDraft,
   enqueueOutbox, listOutbox, deleteOutbox
 } from "./idb.js";
+import { syncSiteIndex } from "./search.js";
 
 function $(id) {
   return document.getElementById(id);
 }
 
+// "czy serwer odpowiada" – endpoint bez sesji i bazy (core.middleware.HealthCheckMiddleware)
 async function pingServer(timeoutMs = 1500) {
   const ctrl = new AbortController();
   const t = setTimeout(() => ctrl.abort(), timeoutMs);
 
   try {
-    const resp = await fetch("/api/pwa/ping/", {
+    const resp = await fetch("/api/pwa/health/", {
       method: "GET",
       headers: { "Accept": "application/json" },
-      credentials: "same-origin",
+      credentials: "omit",
       cache: "no-store",
       signal: ctrl.signal,
     });
@@ -30,11 +32,49 @@ async function pingServer(timeoutMs = 1500) {
   }
 }
 
+// czy sesja jest ważna: true / false (wygasła – login_required przekierowuje) / null (brak sieci)
+async function checkSession(timeoutMs = 3000) {
+  const ctrl = new AbortController();
+  const t = setTimeout(() => ctrl.abort(), timeoutMs);
+
+  try {
+    const resp = await fetch("/api/pwa/ping/", {
+      method: "GET",
+      headers: { "Accept": "application/json" },
+      credentials: "same-origin",
+      cache: "no-store",
+      redirect: "manual",
+      signal: ctrl.signal,
+    });
+    if (resp.type === "opaqueredirect" || resp.status === 401 || resp.status === 403) return false;
+    return resp.ok ? true : null;
+  } catch (e) {
+    return null;
+  } finally {
+    clearTimeout(t);
+  }
+}
+
+// sesję sprawdzamy rzadziej niż łączność (to już zapytania do bazy po stronie serwera)
+const SESSION_CHECK_EVERY_MS = 5 * 60 * 1000;
+let lastSessionCheck = 0;
+let sessionValid = true;
+
 async function updateOnlineUI() {
   const ok = await pingServer();
 
-  if ($("netDot")) $("netDot").textContent = ok ? "🟢" : "🔴";
-  if ($("netText")) $("netText").textContent = ok ? "online" : "offline";
+  if (ok && Date.now() - lastSessionCheck > SESSION_CHECK_EVERY_MS) {
+    const session = await checkSession();
+    if (session !== null) {
+      sessionValid = session;
+      lastSessionCheck = Date.now();
+    }
+  }
+
+  if ($("netDot")) $("netDot").textContent = ok ? (sessionValid ? "🟢" : "🟠") : "🔴";
+  if ($("netText")) {
+    $("netText").textContent = !ok ? "offline" : (sessionValid ? "online" : "online – zaloguj się ponownie");
+  }
 }
 
 async function loadLastSync() {
@@ -49,8 +89,17 @@ function setBusy(isBusy) {
   btn.textContent = isBusy ? "SYNC…" : "SYNC";
 }
 
+// Format zrzutów przy SYNC: "" = lista obiektów strumieniowana z serwera wiersz po wierszu,
+// "columnar" = mniejszy JSON (core/columnar.py), ale serwer składa całe kolumny w pamięci.
+// decodeColumnar() przyjmuje oba formaty.
+const SYNC_FORMAT = "";
+
+function dumpUrl(path) {
+  return SYNC_FORMAT ? `${path}?format=${SYNC_FORMAT}` : path;
+}
+
 async function syncCatalog() {
-  const resp = await fetch("/api/pwa/catalog/dump/", {
+  const resp = await fetch(dumpUrl("/api/pwa/catalog/dump/"), {
     method: "GET",
     headers: { "Accept": "application/json" },
     credentials: "same-origin",
@@ -58,20 +107,24 @@ async function syncCatalog() {
   });
   if (!resp.ok) throw new Error(`CATALOG HTTP ${resp.status}`);
   const data = await resp.json();
+  const sites = decodeColumnar(data.sites);
+  const systems = decodeColumnar(data.systems);
 
   await clearStore("sites");
   await clearStore("systems");
-  await putMany("sites", data.sites || []);
-  await putMany("systems", data.systems || []);
+  await putMany("sites", sites);
+  await putMany("systems", systems);
+  // indeks wyszukiwarki – przepisywane tylko obiekty ze zmienioną nazwą/adresem
+  await syncSiteIndex(sites);
 
-  return { sites: data.sites?.length || 0, systems: data.systems?.length || 0 };
+  return { sites: sites.length, systems: systems.length };
 }
 
 async function syncWorkorders() {
   const prev = await getAll("workorders");
   const prevMap = new Map((prev || []).map(w => [w.id, w]));
 
-  const resp = await fetch("/api/pwa/workorders/dump/", {
+  const resp = await fetch(dumpUrl("/api/pwa/workorders/dump/"), {
     method: "GET",
     headers: { "Accept": "application/json" },
     credentials: "same-origin",
@@ -80,7 +133,7 @@ async function syncWorkorders() {
   if (!resp.ok) throw new Error(`WORKORDERS HTTP ${resp.status}`);
   const data = await resp.json();
 
-  const incoming = data.workorders || [];
+  const incoming = decodeColumnar(data.workorders);
 
   // policz "nowe do realizacji" (IN_PROGRESS) względem poprzedniego stanu cache
   let newOnes = 0;
@@ -103,10 +156,28 @@ async function syncWorkorders() {
 
 let syncInProgress = false;
 
+// ile stron naraz dogrywamy do cache (telefon + serwer nie dostają 50 requestów jednocześnie)
+const WARM_CONCURRENCY = 4;
+
+// strony zleceń/protokołów trzymane offline – reszta cache (shell PWA) nas tu nie dotyczy
+const WARMED_PAGE_RE = /^\/pwa\/(zlecenia\/\d+|protokoly\/(serwis|konserwacja)\/\d+)\/$/;
+
+async function runLimited(items, limit, worker) {
+  let next = 0;
+  const lanes = Array.from({ length: Math.min(limit, items.length) }, async () => {
+    while (next < items.length) {
+      const item = items[next++];
+      await worker(item);
+    }
+  });
+  await Promise.all(lanes);
+}
+
 async function warmServiceReportPagesCache() {
-  if (!("caches" in window)) return;
+  if (!("caches" in window)) return { fetched: 0, unchanged: 0, evicted: 0 };
 
-  const CACHE_NAME = "allsec-pwa-shell-v5";
+  // ten sam cache co strony PWA w Service Workerze (templates/pwa/sw.js)
+  const CACHE_NAME = "allsec-pwa-pages";
   const cache = await caches.open(CACHE_NAME);
 
   const wos = await getAll("workorders");
@@ -123,15 +194,49 @@ async function warmServiceReportPagesCache() {
     .map(w => `/pwa/zlecenia/${w.id}/`);
 
   const allUrls = [...serviceReportUrls, ...maintenanceUrls, ...workorderUrls];
+  const wanted = new Set(allUrls);
+
+  // strony zleceń, które nie są już przypisane do technika, usuwamy z cache
+  let evicted = 0;
+  for (const req of await cache.keys()) {
+    const path = new URL(req.url).pathname;
+    if (WARMED_PAGE_RE.test(path) && !wanted.has(path)) {
+      await cache.delete(req);
+      evicted += 1;
+    }
+  }
+
+  let fetched = 0;
+  let unchanged = 0;
 
-  for (const url of allUrls) {
+  await runLimited(allUrls, WARM_CONCURRENCY, async (url) => {
     try {
-      const resp = await fetch(url, { credentials: "same-origin", cache: "no-store" });
-      if (resp.ok) await cache.put(url, resp.clone());
+      // warunkowo: serwer odpowie 304 bez renderowania, jeśli strona się nie zmieniła
+      const headers = {};
+      const cached = await cache.match(url);
+      if (cached) {
+        const etag = cached.headers.get("ETag");
+        const lastModified = cached.headers.get("Last-Modified");
+        if (etag) headers["If-None-Match"] = etag;
+        if (lastModified) headers["If-Modified-Since"] = lastModified;
+      }
+
+      const resp = await fetch(url, { credentials: "same-origin", cache: "no-store", headers });
+      if (resp.status === 304) {
+        unchanged += 1;
+        return;
+      }
+      // przekierowanie (np. na logowanie) nie jest stroną zlecenia
+      if (resp.ok && !resp.redirected) {
+        await cache.put(url, resp);
+        fetched += 1;
+      }
     } catch (e) {
       console.warn("warm cache failed:", url, e);
     }
-  }
+  });
+
+  return { fetched, unchanged, evicted };
 }
 
 
@@ -144,6 +249,15 @@ async function doSyncAll({ silent = false } = {}) {
     return;
   }
 
+  const session = await checkSession();
+  if (session === false) {
+    sessionValid = false;
+    lastSessionCheck = Date.now();
+    await updateOnlineUI();
+    if (!silent) alert("Sesja wygasła — zaloguj się ponownie, żeby zsynchronizować.");
+    return;
+  }
+
   await processOutbox();
 
   syncInProgress = true;
@@ -475,9 +589,25 @@ function getCsrfToken() {
   return getCookie("csrftoken") || "";
 }
 
+// 503 + Retry-After: serwer chwilowo zajęty zapisem -> odczekaj zanim znów wyślesz outbox
+async function deferOutboxIfBusy(resp) {
+  if (resp.status !== 503) return false;
+
+  const retryAfter = parseInt(resp.headers.get("Retry-After") || "", 10);
+  const waitS = Number.isFinite(retryAfter) && retryAfter > 0 ? retryAfter : 5;
+  // jitter, żeby telefony nie wracały równo w tej samej sekundzie
+  const waitMs = waitS * 1000 + Math.floor(Math.random() * 1000);
+
+  await setMeta("outbox_retry_at", Date.now() + waitMs);
+  return true;
+}
+
 async function processOutbox() {
   if (!navigator.onLine) return;
 
+  const retryAt = Number(await getMeta("outbox_retry_at") || 0);
+  if (retryAt && Date.now() < retryAt) return;
+
   const items = await listOutbox();
   if (!items.length) return;
 
@@ -504,7 +634,10 @@ async function processOutbox() {
         credentials: "same-origin",
       });
 
-      if (!resp.ok) break;
+      if (!resp.ok) {
+        await deferOutboxIfBusy(resp);
+        break;
+      }
 
       await deleteOutbox(item.id);
       continue;
@@ -536,7 +669,36 @@ async function processOutbox() {
         credentials: "same-origin",
       });
 
-      if (!resp.ok) break;
+      if (!resp.ok) {
+        await deferOutboxIfBusy(resp);
+        break;
+      }
+
+      await deleteOutbox(item.id);
+      continue;
+    }
+
+    // =========================
+    // 2b) MaintenanceProtocol patch – tylko zmienione punkty/uwagi (JSON)
+    // =========================
+    if (item.kind === "maintenanceprotocol_patch") {
+      const { mp_id, wo_id, patch } = item.payload || {};
+
+      const resp = await fetch(`/api/pwa/maintenanceprotocol/${mp_id}/patch/`, {
+        method: "POST",
+        headers: {
+          "Accept": "application/json",
+          "Content-Type": "application/json",
+          "X-CSRFToken": getCsrfToken(),
+        },
+        body: JSON.stringify({ wo_id, ...patch }),
+        credentials: "same-origin",
+      });
+
+      if (!resp.ok) {
+        await deferOutboxIfBusy(resp);
+        break;
+      }
 
       await deleteOutbox(item.id);
       continue;
@@ -560,7 +722,10 @@ async function processOutbox() {
         credentials: "same-origin",
       });
 
-      if (!resp.ok) break;
+      if (!resp.ok) {
+        await deferOutboxIfBusy(resp);
+        break;
+      }
 
       try {
         const data = await resp.json();
@@ -767,6 +932,48 @@ export function initPwaServiceReportForm() {
 }
 
 
+// Formularz protokołu (formsety "section-<pk>-N-...") -> patch JSON dla
+// /api/pwa/maintenanceprotocol/<id>/patch/: tylko pola różne od stanu z chwili
+// otwarcia strony (baseline). Pola bez prefiksu "section" = pola protokołu.
+const MP_ITEM_FIELD_RE = /^section-(\d+)-(\d+)-(result|note)$/;
+const MP_REMARKS_FIELD_RE = /^section_(\d+)_remarks$/;
+
+function buildMpPatch(baseline, fields) {
+  const protocol = {};
+  const items = new Map();
+  const sections = [];
+
+  for (const [name, value] of Object.entries(fields)) {
+    if (baseline[name] === value) continue;
+
+    let m = MP_ITEM_FIELD_RE.exec(name);
+    if (m) {
+      const id = parseInt(fields[`section-${m[1]}-${m[2]}-id`] || "", 10);
+      if (!id) continue;
+      const row = items.get(id) || { id };
+      row[m[3]] = value;
+      items.set(id, row);
+      continue;
+    }
+
+    m = MP_REMARKS_FIELD_RE.exec(name);
+    if (m) {
+      sections.push({ id: parseInt(m[1], 10), remarks: value });
+      continue;
+    }
+
+    if (!name.startsWith("section")) {
+      protocol[name] = (name === "date" || name.endsWith("_date")) ? normalizeDateToIso(value) : value;
+    }
+  }
+
+  return { protocol, items: [...items.values()], sections };
+}
+
+function isEmptyMpPatch(patch) {
+  return !Object.keys(patch.protocol).length && !patch.items.length && !patch.sections.length;
+}
+
 export function initPwaMaintenanceProtocolForm() {
   const form = document.querySelector("form[data-pwa-mp-form]");
   if (!form) return;
@@ -784,6 +991,9 @@ export function initPwaMaintenanceProtocolForm() {
 
   if (!mpId) return;
 
+  // stan z serwera (przed nałożeniem szkicu) – względem niego liczymy zmiany
+  const baseline = serializeForm(form);
+
   // restore draft
   getMpDraft(mpId).then((draft) => {
     if (draft?.fields) applyFieldsToForm(form, draft.fields);
@@ -817,22 +1027,54 @@ export function initPwaMaintenanceProtocolForm() {
       return;
     }
 
-    const ok = await pingServer(800);
+    const fields = serializeForm(form);
+    const patch = buildMpPatch(baseline, fields);
+    await putMpDraft(mpId, { wo_id: woId, fields });
 
-    if (ok) {
+    if (isEmptyMpPatch(patch)) {
+      window.location.replace(backUrl);
+      return;
+    }
+
+    const nativeSubmit = () => {
       allowNativeSubmit = true;
       if (typeof form.requestSubmit === "function") {
         form.requestSubmit();
       } else {
         form.submit();
       }
-      return;
+    };
+
+    if (await pingServer(800)) {
+      try {
+        const resp = await fetch(`/api/pwa/maintenanceprotocol/${mpId}/patch/`, {
+          method: "POST",
+          headers: {
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+            "X-CSRFToken": getCsrfToken(),
+          },
+          body: JSON.stringify({ wo_id: woId, ...patch }),
+          credentials: "same-origin",
+        });
+
+        if (resp.ok) {
+          window.location.replace(backUrl);
+          return;
+        }
+        if (resp.status === 400) {
+          // błędy walidacji – pełny POST formularza pokaże je przy polach
+          nativeSubmit();
+          return;
+        }
+        // 503 (baza zajęta) itp. – zapis trafi do outboxa
+      } catch (err) {
+        // zerwane połączenie – jak offline
+      }
     }
 
-    // offline: draft + outbox
-    const fields = serializeForm(form);
-    await putMpDraft(mpId, { wo_id: woId, fields });
-    await enqueueOutbox("maintenanceprotocol_save", { mp_id: mpId, wo_id: woId, fields });
+    // offline: draft + outbox (tylko zmiany)
+    await enqueueOutbox("maintenanceprotocol_patch", { mp_id: mpId, wo_id: woId, patch });
 
     window.location.replace(backUrl);
   });
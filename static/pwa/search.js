@@ -0,0 +1,158 @@
+// static/pwa/search.js
+// Offline'owa wyszukiwarka obiektów: indeks w IndexedDB (store "site_search",
+// wpis na obiekt ze znormalizowanym tekstem), w pamięci – listy trafień per klucz.
+// Kluczy nie zapisujemy – odczyt tysięcy tablic z IndexedDB kosztuje więcej niż
+// ich wyliczenie z gotowego tekstu przy otwarciu widoku.
+//
+// Klucze: trigramy słów (szukanie fragmentu od 3 znaków) oraz prefiksy 1–2 znaków
+// ("^a", "^ul") dla krótkich fraz. Tekst bez polskich znaków i wielkości liter,
+// więc "lodz" znajduje "Łódź". Kilka słów w zapytaniu = wszystkie muszą pasować.
+// Dokumenty są posortowane po nazwie raz przy ładowaniu, listy trafień trzymają
+// pozycje rosnąco – wyniki wychodzą posortowane, bez sortowania per klawisz.
+
+import { countStore, getAll, putMany, deleteMany } from "./idb.js";
+
+const STORE = "site_search";
+
+// litery, których NFD nie rozkłada na literę + znak diakrytyczny
+const FOLD_EXTRA = { "ł": "l", "đ": "d", "ø": "o", "ß": "ss" };
+
+export function fold(s) {
+  return String(s ?? "")
+    .toLowerCase()
+    .normalize("NFD")
+    .replace(/[\u0300-\u036f]/g, "")
+    .replace(/[łđøß]/g, (ch) => FOLD_EXTRA[ch])
+    .replace(/[^a-z0-9]+/g, " ")
+    .trim();
+}
+
+function trigrams(word) {
+  const out = [];
+  for (let i = 0; i + 3 <= word.length; i++) out.push(word.slice(i, i + 3));
+  return out;
+}
+
+function termKeys(term) {
+  return term.length < 3 ? ["^" + term] : trigrams(term);
+}
+
+function docKeys(text) {
+  const keys = new Set();
+  for (const word of text.split(" ")) {
+    if (!word) continue;
+    keys.add("^" + word.slice(0, 1));
+    if (word.length >= 2) keys.add("^" + word.slice(0, 2));
+    for (const gram of trigrams(word)) keys.add(gram);
+  }
+  return [...keys];
+}
+
+function siteDoc(site) {
+  const name = site.name ?? "";
+  const street = site.street ?? "";
+  const city = site.city ?? "";
+  const partial = !!site.partial;
+  const text = fold(`${name} ${street} ${city}`);
+  return {
+    id: site.id,
+    sig: JSON.stringify([name, street, city, partial]),
+    name,
+    street,
+    city,
+    partial,
+    text,
+  };
+}
+
+let loaded = null; // Promise<{ docs, postings }>
+
+function buildIndex(docs) {
+  const collator = new Intl.Collator("pl");
+  docs.sort((a, b) => collator.compare(a.name, b.name));
+
+  const postings = new Map();
+  for (let i = 0; i < docs.length; i++) {
+    for (const key of docKeys(docs[i].text)) {
+      const list = postings.get(key);
+      if (list) list.push(i);
+      else postings.set(key, [i]);
+    }
+  }
+  return { docs, postings };
+}
+
+// Aktualizacja indeksu po zapisie obiektów do "sites": przepisujemy tylko wpisy,
+// których nazwa/adres/partial się zmieniły. prune: usuń obiekty spoza listy
+// (pełny SYNC katalogu); przy pojedynczym obiekcie – false.
+export async function syncSiteIndex(sites, { prune = true } = {}) {
+  const result = await writeIndex(sites, prune);
+  if (result.changed || result.removed) loaded = null;
+  return result;
+}
+
+async function writeIndex(sites, prune) {
+  const stored = await getAll(STORE);
+  const prev = new Map(stored.map((d) => [d.id, d.sig]));
+
+  const changed = [];
+  for (const site of sites) {
+    const doc = siteDoc(site);
+    if (prev.get(doc.id) !== doc.sig) changed.push(doc);
+    prev.delete(doc.id);
+  }
+  const removed = prune ? [...prev.keys()] : [];
+
+  if (changed.length) await putMany(STORE, changed);
+  if (removed.length) await deleteMany(STORE, removed);
+
+  return { changed: changed.length, removed: removed.length };
+}
+
+async function load() {
+  let docs = await getAll(STORE);
+  if (docs.length !== (await countStore("sites"))) {
+    // indeks niepełny: pierwsze uruchomienie po aktualizacji bazy (także gdy
+    // fetchFullSite zdążył dopisać pojedynczy obiekt) – uzupełniamy z "sites"
+    const sites = await getAll("sites");
+    await writeIndex(sites, true);
+    docs = sites.map(siteDoc);
+  }
+  return buildIndex(docs);
+}
+
+export function loadSiteIndex() {
+  if (!loaded) {
+    loaded = load().catch((e) => {
+      loaded = null;
+      throw e;
+    });
+  }
+  return loaded;
+}
+
+// Obiekty pasujące do zapytania, w kolejności nazw (pusty napis = wszystkie).
+export function searchSites(index, query) {
+  const terms = [...new Set(fold(query).split(" ").filter(Boolean))];
+  if (!terms.length) return index.docs;
+
+  // kandydaci = najkrótsza lista trafień; reszta warunków sprawdzana na tekście
+  let candidates = null;
+  for (const term of terms) {
+    for (const key of termKeys(term)) {
+      const list = index.postings.get(key);
+      if (!list) return [];
+      if (!candidates || list.length < candidates.length) candidates = list;
+    }
+  }
+
+  // krótkie frazy – początek słowa, dłuższe – fragment w dowolnym miejscu
+  const checks = terms.map((term) => (term.length < 3 ? " " + term : term));
+  const out = [];
+  for (const i of candidates) {
+    const doc = index.docs[i];
+    const text = " " + doc.text;
+    if (checks.every((c) => text.includes(c))) out.push(doc);
+  }
+  return out;
+}
@@ -0,0 +1,124 @@
+// Service Worker PWA – generowany przez core.views_pwa.pwa_sw z manifestu statyk
+// (core/pwa_assets.py). Nie edytuj wersji ręcznie – zmienia się sama, gdy zmieni
+// się którykolwiek plik z precache albo ten szablon.
+// Dane są w IndexedDB, więc NIE cache'ujemy /api/.
+
+const VERSION = "{{ version }}";
+
+// statyki: klucze = adresy haszowane, więc cache może być jeden na zawsze
+const STATIC_CACHE = "allsec-pwa-static";
+// strony HTML PWA (network-first, offline z cache)
+const PAGES_CACHE = "allsec-pwa-pages";
+
+// [{ url: "/static/pwa/pwa.js", cache_url: "/static/pwa/pwa.<hash>.js" }, ...]
+const PRECACHE = {{ precache_json|safe }};
+const SHELL_PAGES = {{ shell_pages_json|safe }};
+
+// strony importują moduły po adresie bez hasza – podmieniamy na aktualną wersję
+const CACHE_URL_BY_PATH = new Map(PRECACHE.map((a) => [a.url, a.cache_url]));
+const WANTED = new Set(PRECACHE.map((a) => new URL(a.cache_url, self.location.origin).href));
+
+async function precacheChanged() {
+  const cache = await caches.open(STATIC_CACHE);
+  const have = new Set((await cache.keys()).map((r) => r.url));
+
+  // pobieramy tylko pliki, których (haszowanej) wersji jeszcze nie mamy
+  const missing = PRECACHE.filter((a) => !have.has(new URL(a.cache_url, self.location.origin).href));
+  await Promise.all(
+    missing.map(async (a) => {
+      const resp = await fetch(a.cache_url, { cache: "no-cache", credentials: "same-origin" });
+      if (resp.ok) await cache.put(a.cache_url, resp);
+    })
+  );
+}
+
+async function precacheShellPages() {
+  const cache = await caches.open(PAGES_CACHE);
+  await Promise.all(
+    SHELL_PAGES.map(async (path) => {
+      try {
+        const resp = await fetch(path, { credentials: "same-origin", redirect: "manual" });
+        if (resp.ok && resp.type === "basic" && !resp.redirected) await cache.put(path, resp);
+      } catch (e) {
+        // offline / brak sesji – strona trafi do cache przy pierwszym wejściu
+      }
+    })
+  );
+}
+
+async function dropStale() {
+  const keys = await caches.keys();
+  await Promise.all(
+    keys.map((k) => (k === STATIC_CACHE || k === PAGES_CACHE ? null : caches.delete(k)))
+  );
+
+  // usuń stare wersje plików, których nie ma już w manifeście
+  const cache = await caches.open(STATIC_CACHE);
+  const entries = await cache.keys();
+  await Promise.all(entries.map((r) => (WANTED.has(r.url) ? null : cache.delete(r))));
+}
+
+self.addEventListener("install", (event) => {
+  event.waitUntil(Promise.all([precacheChanged(), precacheShellPages()]));
+  self.skipWaiting();
+});
+
+self.addEventListener("activate", (event) => {
+  event.waitUntil(dropStale().then(() => self.clients.claim()));
+});
+
+async function offlinePage(url) {
+  // najpierw strona po pathname (ignorujemy querystring)
+  const cachedExact = await caches.match(url.pathname, { ignoreSearch: true });
+  if (cachedExact) return cachedExact;
+
+  // szczegóły zlecenia / protokół bez własnej kopii -> shell listy zleceń (renderuje offline z IndexedDB)
+  if (url.pathname.startsWith("/pwa/zlecenia/") || url.pathname.startsWith("/pwa/protokoly/")) {
+    const cachedList = await caches.match("/pwa/zlecenia/", { ignoreSearch: true });
+    if (cachedList) return cachedList;
+  }
+
+  return caches.match("/pwa/", { ignoreSearch: true });
+}
+
+self.addEventListener("fetch", (event) => {
+  const req = event.request;
+  const url = new URL(req.url);
+
+  if (url.origin !== self.location.origin) return;
+  if (req.method !== "GET") return;
+  if (url.pathname.startsWith("/api/")) return;
+
+  // 1) STRONY PWA: network-first, kopia do PAGES_CACHE
+  if (req.mode === "navigate" || (url.pathname.startsWith("/pwa/") && url.pathname !== "/pwa/sw.js")) {
+    event.respondWith(
+      fetch(req)
+        .then((resp) => {
+          if (resp.ok && resp.type === "basic" && !resp.redirected && url.pathname.startsWith("/pwa/")) {
+            const copy = resp.clone();
+            caches.open(PAGES_CACHE).then((cache) => cache.put(url.pathname, copy)).catch(() => {});
+          }
+          return resp;
+        })
+        .catch(() => offlinePage(url))
+    );
+    return;
+  }
+
+  // 2) STATYKI: cache-first po adresie haszowanym
+  if (url.pathname.startsWith("/static/")) {
+    const cacheUrl = CACHE_URL_BY_PATH.get(url.pathname) || req.url;
+    event.respondWith(
+      caches.open(STATIC_CACHE).then(async (cache) => {
+        const cached = await cache.match(cacheUrl);
+        if (cached) return cached;
+
+        const resp = await fetch(cacheUrl === req.url ? req : cacheUrl);
+        if (resp.ok && WANTED.has(new URL(cacheUrl, self.location.origin).href)) {
+          cache.put(cacheUrl, resp.clone()).catch(() => {});
+        }
+        return resp;
+      })
+    );
+  }
+});